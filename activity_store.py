@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Columnar activity files for LukSpeed
+One .npz per activity: a column per channel, a ``<channel>__mask`` column for
+channels with missing samples and a JSON header (metadata, data quality,
+sensors, constant channels). Columns are stored uncompressed by default so the
+loader can memory-map them straight from the archive; the ActivityPoint JSON
+is still available as a compatibility view.
+Usage: python activity_store.py ACTIVITY.npz [OUTPUT.json|OUTPUT.ndjson]
+"""
+
+import json
+import os
+import struct
+import sys
+import zipfile
+
+import numpy as np
+
+from fit_activity import epoch_to_iso, json_default
+from fit_cache import activity_to_arrays, arrays_to_activity
+
+COLUMNAR_FORMAT = "lukspeed-columnar"
+COLUMNAR_VERSION = 1
+HEADER_KEY = "__header__"
+
+# Points per JSON chunk: bounds the memory of a streaming export
+DEFAULT_CHUNK_POINTS = 2048
+_compact_json = json.JSONEncoder(separators=(",", ":"), default=json_default).encode
+
+# Fixed part of a zip local file header; name and extra lengths are at 26/28
+LOCAL_HEADER = struct.Struct('<4s5H3I2H')
+
+
+def save_activity(path, activity, compress=False):
+    """Write an Activity as a columnar .npz (atomic)
+
+    Fully valid channels get no mask column and constant channels (e.g. zero
+    filled pedaling metrics) are kept in the header only. ``compress=True``
+    trades memory-mapped loading for a smaller file.
+    """
+    arrays, header = activity_to_arrays(activity)
+    header["format"] = COLUMNAR_FORMAT
+    header["version"] = COLUMNAR_VERSION
+    header["constants"] = {}
+    for name in activity.channel_names:
+        if arrays[f"{name}__mask"].all():
+            del arrays[f"{name}__mask"]
+        values = arrays[name]
+        if len(values) and (values == values[0]).all():
+            header["constants"][name] = [values[0].item(), values.dtype.str]
+            del arrays[name]
+
+    payload = json.dumps(header, default=json_default).encode("utf-8")
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    save = np.savez_compressed if compress else np.savez
+    save(tmp_path, **{HEADER_KEY: np.frombuffer(payload, dtype=np.uint8)}, **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _member_array(f, info):
+    """Read-only memmap of one stored .npy member (None when it cannot be mapped)"""
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+    f.seek(info.header_offset)
+    fields = LOCAL_HEADER.unpack(f.read(LOCAL_HEADER.size))
+    f.seek(info.header_offset + LOCAL_HEADER.size + fields[-2] + fields[-1])
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    else:
+        return None
+    if dtype.hasobject:
+        return None
+    if 0 in shape:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(f, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                     order='F' if fortran_order else 'C')
+
+
+def load_activity(path, mmap=True):
+    """Load a columnar .npz; channels are memory-mapped unless ``mmap=False``"""
+    if not mmap:
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+    else:
+        arrays = {}
+        with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+            for info in archive.infolist():
+                name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+                array = _member_array(f, info)
+                if array is None:
+                    # Compressed member (e.g. written by np.savez_compressed)
+                    # or an .npy header version memmap cannot follow
+                    with archive.open(info) as member:
+                        array = np.lib.format.read_array(member, allow_pickle=False)
+                arrays[name] = array
+
+    header = json.loads(np.asarray(arrays.pop(HEADER_KEY)).tobytes().decode("utf-8"))
+    if header.get("format") != COLUMNAR_FORMAT:
+        raise ValueError(f"{path} is not a LukSpeed columnar activity file")
+    n = header["n_points"]
+    for name, (value, dtype) in header["constants"].items():
+        arrays[name] = np.full(n, value, dtype=np.dtype(dtype))
+    for name in header["channels"]:
+        if f"{name}__mask" not in arrays:
+            arrays[f"{name}__mask"] = np.ones(n, dtype=bool)
+    return arrays_to_activity(arrays, header)
+
+
+def _column_texts(name, values, mask):
+    """JSON text of every value of one channel slice ("null" where missing)"""
+    if name == "timestamp":
+        texts = [f'"{text}"' for text in epoch_to_iso(values).tolist()]
+    elif values.dtype.kind == 'b':
+        texts = ["true" if value else "false" for value in values.tolist()]
+    elif values.dtype.kind == 'f':
+        # float repr is exactly what the json module writes for finite floats
+        texts = list(map(repr, values.tolist()))
+        for i in np.flatnonzero(~np.isfinite(values)).tolist():
+            texts[i] = _compact_json(float(values[i]))
+    else:
+        texts = list(map(str, values.tolist()))
+    if not mask.all():
+        for i in np.flatnonzero(~mask).tolist():
+            texts[i] = "null"
+    return texts
+
+
+def _chunk_point_texts(activity, names, drop_missing, start, stop):
+    """One compact JSON object per point, built column by column"""
+    rows = slice(start, stop)
+    if drop_missing and not all(activity.masks[name][rows].all() for name in names):
+        # Points with different keys: per-point dicts
+        return [_compact_json(point) for point in
+                activity.to_points(names, drop_missing, start, stop)]
+    columns = []
+    for name in names:
+        prefix = _compact_json(name) + ":"
+        texts = _column_texts(name, activity.channels[name][rows], activity.masks[name][rows])
+        columns.append([prefix + text for text in texts])
+    return ["{" + ",".join(fields) + "}" for fields in zip(*columns)]
+
+
+def iter_points_json(activity, channels=None, drop_missing=False, ndjson=False,
+                     chunk_points=DEFAULT_CHUNK_POINTS):
+    """ActivityPoint[] JSON text in chunks of ``chunk_points`` points
+
+    Yields one JSON array piece by piece, or one point per line with
+    ``ndjson=True``. Only one chunk of points exists at a time, so memory
+    stays flat however long the ride is, and the generator can back a
+    chunked HTTP response as is (e.g. FastAPI's StreamingResponse).
+    """
+    names = channels or activity.channel_names
+    if not ndjson:
+        yield "["
+    for start in range(0, len(activity), chunk_points):
+        points = _chunk_point_texts(activity, names, drop_missing, start, start + chunk_points)
+        if ndjson:
+            yield "\n".join(points) + "\n"
+        else:
+            yield ("," if start else "") + ",".join(points)
+    if not ndjson:
+        yield "]"
+
+
+def write_points_json(path, activity, ndjson=None, **options):
+    """Stream the ActivityPoint JSON view of an Activity to a file
+
+    NDJSON is used when ``ndjson`` is set or the path ends in .ndjson.
+    """
+    if ndjson is None:
+        ndjson = path.endswith(".ndjson")
+    with open(path, "w") as f:
+        for chunk in iter_points_json(activity, ndjson=ndjson, **options):
+            f.write(chunk)
+    return path
+
+
+def main(argv):
+    if not argv:
+        print(__doc__.strip())
+        return 1
+    path = argv[0]
+    activity = load_activity(path)
+    print(f"📦 {path}: {len(activity):,} puntos, {len(activity.channel_names)} canales")
+    if len(argv) > 1:
+        write_points_json(argv[1], activity)
+        print(f"✅ Vista JSON guardada en {argv[1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -10,6 +10,9 @@ import numpy as np
 from datetime import datetime
 import traceback
 
+from field_classifier import (AERO_COEFFICIENT, AIR_DENSITY, CDA, UNKNOWN, WIND,
+                              default_classifier)
+
 print("🚀 LUKSPEED vs. AEROSENSOR - VALIDACIÓN CIENTÍFICA")
 print("=" * 70)
 
@@ -45,20 +48,12 @@ try:
     print(f"✅ Tipos de mensajes encontrados: {len(all_messages)}")
     
     # Buscar campos aerodinámicos en TODOS los mensajes
-    aero_keywords = ['cda', 'aero', 'drag', 'coefficient', 'area', 'wind', 'air', 'density', 'frontal']
-    
     for msg_type, fields in field_catalog.items():
         print(f"\n📊 {msg_type.upper()} ({len(all_messages[msg_type])} registros)")
         print(f"   Campos: {sorted(fields)}")
         
         # Identificar campos aerodinámicos
-        aero_fields = []
-        for field in fields:
-            field_lower = field.lower()
-            for keyword in aero_keywords:
-                if keyword in field_lower:
-                    aero_fields.append(field)
-                    break
+        aero_fields = [field for field in fields if default_classifier.is_aero(msg_type, field)]
         
         if aero_fields:
             print(f"   🎯 CAMPOS AERODINÁMICOS: {aero_fields}")
@@ -86,10 +81,10 @@ try:
             # Buscar TODOS los campos que puedan ser aerodinámicos
             for field_name, field_value in message.items():
                 if field_value is not None:
-                    field_lower = field_name.lower()
+                    category = default_classifier.classify(msg_type, field_name)
                     
                     # CdA directo
-                    if 'cda' in field_lower:
+                    if category == CDA:
                         aerosensor_data["cda_measurements"].append({
                             "timestamp": timestamp,
                             "cda_value": field_value,
@@ -101,7 +96,7 @@ try:
                         total_aero_points += 1
                     
                     # Datos de viento
-                    elif 'wind' in field_lower:
+                    elif category == WIND:
                         aerosensor_data["wind_data"].append({
                             "timestamp": timestamp,
                             "wind_value": field_value,
@@ -113,7 +108,7 @@ try:
                         total_aero_points += 1
                     
                     # Coeficientes aerodinámicos
-                    elif any(keyword in field_lower for keyword in ['aero', 'drag', 'coefficient']):
+                    elif category == AERO_COEFFICIENT:
                         aerosensor_data["aero_coefficients"].append({
                             "timestamp": timestamp,
                             "coefficient_value": field_value,
@@ -125,7 +120,7 @@ try:
                         total_aero_points += 1
                     
                     # Densidad del aire
-                    elif any(keyword in field_lower for keyword in ['air', 'density']):
+                    elif category == AIR_DENSITY:
                         aerosensor_data["air_density_data"].append({
                             "timestamp": timestamp,
                             "density_value": field_value,
@@ -137,7 +132,7 @@ try:
                         total_aero_points += 1
                     
                     # Campos desconocidos que podrían ser aerodinámicos
-                    elif field_name.startswith('unknown_') and isinstance(field_value, (int, float)):
+                    elif category == UNKNOWN and isinstance(field_value, (int, float)):
                         if 0.1 < field_value < 1.0:  # Rango típico de CdA
                             aerosensor_data["unknown_aero_fields"].append({
                                 "timestamp": timestamp,
@@ -9,56 +9,183 @@ import json
 import numpy as np
 from datetime import datetime
 import traceback
+from collections import deque
+
+from field_classifier import (AERO_COEFFICIENT, AIR_DENSITY, CDA, UNKNOWN, WIND,
+                              default_classifier)
+from field_stats import FieldStats
+from fit_activity import to_epoch_seconds
+from physics import (DEFAULT_TEMPERATURE, SPEED_SMOOTHING, WHEEL_INERTIA, air_density,
+                     effective_mass)
+from resample import MAX_GAP_SECONDS
 
 print("🚀 LUKSPEED vs. AEROSENSOR - VALIDACIÓN CIENTÍFICA")
 print("=" * 70)
 
 fit_file_path = "/workspace/shadcn-ui/test_activity.fit"
 
+
+class StreamingFitFile(fitparse.FitFile):
+    """FitFile that forgets each message once it has been yielded (flat memory)"""
+
+    def _parse_message(self):
+        message = super()._parse_message()
+        self._messages.clear()
+        return message
+
+
+# Entradas guardadas (e impresas) por categoría; el resto solo suma a las estadísticas
+AERO_SAMPLE_SIZE = 10
+
+# Categoría del clasificador -> (lista de aerosensor_data, clave del valor, etiqueta)
+AERO_ENTRY_KEYS = {
+    CDA: ("cda_measurements", "cda_value", "🎯 CdA ENCONTRADO"),
+    WIND: ("wind_data", "wind_value", "🌪️ VIENTO"),
+    AERO_COEFFICIENT: ("aero_coefficients", "coefficient_value", "📊 COEFICIENTE AERO"),
+    AIR_DENSITY: ("air_density_data", "density_value", "🌡️ DENSIDAD AIRE"),
+    UNKNOWN: ("unknown_aero_fields", "unknown_value", "❓ POSIBLE CdA"),
+}
+
 try:
-    # PASO 1: ANÁLISIS EXHAUSTIVO DE TODOS LOS MENSAJES
-    print("\n🔍 PASO 1: ANÁLISIS EXHAUSTIVO DEL ARCHIVO .FIT")
+    # PASO 1: PASADA ÚNICA SOBRE TODOS LOS MENSAJES
+    # Catálogo, clasificación aerodinámica, estadísticas unknown_ y entradas de la
+    # regresión se actualizan mensaje a mensaje; no se guarda ningún mensaje crudo.
+    print("\n🔍 PASO 1: ANÁLISIS EXHAUSTIVO DEL ARCHIVO .FIT (PASADA ÚNICA)")
     print("-" * 50)
     
-    fitfile = fitparse.FitFile(fit_file_path)
+    fitfile = StreamingFitFile(fit_file_path)
     
-    all_messages = {}
+    message_counts = {}
     field_catalog = {}
     aerosensor_candidates = {}
+    classify = default_classifier.classify
+    
+    aerosensor_data = {
+        "cda_measurements": [],
+        "wind_data": [],
+        "aero_coefficients": [],
+        "air_density_data": [],
+        "drag_data": [],
+        "unknown_aero_fields": []
+    }
+    total_aero_points = 0
+    # Por categoría: número de valores y estadísticas online (memoria constante);
+    # aerosensor_data solo guarda las primeras AERO_SAMPLE_SIZE entradas
+    aero_counts = {bucket: 0 for bucket in aerosensor_data}
+    aero_stats = {bucket: FieldStats() for bucket in aerosensor_data}
     
-    # Extraer TODOS los tipos de mensajes
-    for message in fitfile.messages:
+    # Estadísticas unknown_: acumulador Welford por campo (memoria constante)
+    unknown_analysis = {}
+    
+    # Entradas de la regresión P_aero = CdA * 0.5·ρ·v³ (sumas acumuladas), con ρ
+    # por registro a partir de temperatura y altitud
+    GRAVITY = 9.81
+    TOTAL_MASS = 83  # 75kg + 8kg
+    Crr = 0.005
+    total_records = 0
+    power_records = 0
+    validation_records = 0
+    # Últimos registros (t, v) para la derivada de velocidad: P_cin = (m + I/r²)·a·v
+    EFFECTIVE_MASS = effective_mass(TOTAL_MASS, WHEEL_INERTIA)
+    recent_speeds = deque(maxlen=SPEED_SMOOTHING)
+    regression = {"n": 0, "sum_p": 0.0, "sum_p2": 0.0, "sum_px": 0.0, "sum_x2": 0.0, "sum_rho": 0.0}
+    
+    for message in fitfile.get_messages():
         msg_type = message.name
-        if msg_type not in all_messages:
-            all_messages[msg_type] = []
-            field_catalog[msg_type] = set()
+        message_index = message_counts.get(msg_type, 0)
+        message_counts[msg_type] = message_index + 1
+        catalog = field_catalog.setdefault(msg_type, set())
+        timestamp = message.get_value('timestamp')
+        values = {}
         
-        msg_data = {}
         for field in message:
             field_name = field.name
             field_value = field.value
-            field_catalog[msg_type].add(field_name)
-            msg_data[field_name] = field_value
+            catalog.add(field_name)
+            values[field_name] = field_value
+            if field_value is None:
+                continue
+            
+            category = classify(msg_type, field_name)
+            if category not in AERO_ENTRY_KEYS:
+                continue
+            
+            if category == UNKNOWN:
+                if not isinstance(field_value, (int, float)):
+                    continue
+                stats = unknown_analysis.get(field_name)
+                if stats is None:
+                    stats = unknown_analysis[field_name] = FieldStats()
+                stats.update(field_value)
+                if not 0.1 < field_value < 1.0:  # Rango típico de CdA
+                    continue
+            
+            bucket, value_key, label = AERO_ENTRY_KEYS[category]
+            aero_counts[bucket] += 1
+            total_aero_points += 1
+            if isinstance(field_value, (int, float)):
+                aero_stats[bucket].update(field_value)
+            if aero_counts[bucket] > AERO_SAMPLE_SIZE:
+                continue
+            entry = {
+                "timestamp": timestamp,
+                value_key: field_value,
+                "field_name": field_name,
+                "message_type": msg_type,
+                "message_index": message_index
+            }
+            if category == UNKNOWN:
+                entry["possible_cda"] = True
+            aerosensor_data[bucket].append(entry)
+            print(f"{label}: {field_name} = {field_value} en {msg_type}[{message_index}]")
         
-        all_messages[msg_type].append(msg_data)
-    
-    print(f"✅ Tipos de mensajes encontrados: {len(all_messages)}")
+        if msg_type == 'record':
+            total_records += 1
+            power = values.get('power') or 0
+            speed = values.get('speed') or 0
+            if power > 0:
+                power_records += 1
+            speed_ms = speed if speed < 50 else speed / 3.6
+            accel = 0.0
+            if timestamp is not None:
+                seconds = to_epoch_seconds(timestamp)
+                if recent_speeds:
+                    first_seconds, first_speed = recent_speeds[0]
+                    dt = seconds - first_seconds
+                    if 0 < dt <= MAX_GAP_SECONDS * len(recent_speeds):
+                        accel = (speed_ms - first_speed) / dt
+                recent_speeds.append((seconds, speed_ms))
+            if power > 0 and speed > 0:
+                validation_records += 1
+                if power > 50 and speed > 5:  # Filtrar datos válidos
+                    # Potencia disponible para aerodinámica (aproximación):
+                    # sin rodadura ni la parte que acelera al ciclista
+                    power_rr_est = Crr * TOTAL_MASS * GRAVITY * speed_ms
+                    power_kinetic_est = EFFECTIVE_MASS * accel * speed_ms
+                    power_available_aero = power - power_rr_est - power_kinetic_est
+                    
+                    if power_available_aero > 0:
+                        temperature = values.get('temperature')
+                        altitude = values.get('enhanced_altitude') or values.get('altitude') or 0
+                        rho = float(air_density(DEFAULT_TEMPERATURE if temperature is None else temperature,
+                                                altitude))
+                        x = 0.5 * rho * speed_ms ** 3
+                        regression["n"] += 1
+                        regression["sum_p"] += power_available_aero
+                        regression["sum_p2"] += power_available_aero ** 2
+                        regression["sum_px"] += power_available_aero * x
+                        regression["sum_x2"] += x ** 2
+                        regression["sum_rho"] += rho
+    
+    print(f"✅ Tipos de mensajes encontrados: {len(message_counts)}")
     
     # Buscar campos aerodinámicos en TODOS los mensajes
-    aero_keywords = ['cda', 'aero', 'drag', 'coefficient', 'area', 'wind', 'air', 'density', 'frontal']
-    
     for msg_type, fields in field_catalog.items():
-        print(f"\n📊 {msg_type.upper()} ({len(all_messages[msg_type])} registros)")
+        print(f"\n📊 {msg_type.upper()} ({message_counts[msg_type]} registros)")
         print(f"   Campos: {sorted(fields)}")
         
         # Identificar campos aerodinámicos
-        aero_fields = []
-        for field in fields:
-            field_lower = field.lower()
-            for keyword in aero_keywords:
-                if keyword in field_lower:
-                    aero_fields.append(field)
-                    break
+        aero_fields = [field for field in fields if default_classifier.is_aero(msg_type, field)]
         
         if aero_fields:
             print(f"   🎯 CAMPOS AERODINÁMICOS: {aero_fields}")
@@ -67,136 +194,27 @@ try:
     # PASO 2: EXTRACCIÓN ESPECÍFICA DE DATOS AEROSENSOR
     print("\n🌪️ PASO 2: EXTRACCIÓN DE DATOS AEROSENSOR")
     print("-" * 50)
-    
-    aerosensor_data = {
-        "cda_measurements": [],
-        "wind_data": [],
-        "aero_coefficients": [],
-        "air_density_data": [],
-        "drag_data": [],
-        "unknown_aero_fields": []
-    }
-    
-    total_aero_points = 0
-    
-    for msg_type, messages in all_messages.items():
-        for i, message in enumerate(messages):
-            timestamp = message.get('timestamp', None)
-            
-            # Buscar TODOS los campos que puedan ser aerodinámicos
-            for field_name, field_value in message.items():
-                if field_value is not None:
-                    field_lower = field_name.lower()
-                    
-                    # CdA directo
-                    if 'cda' in field_lower:
-                        aerosensor_data["cda_measurements"].append({
-                            "timestamp": timestamp,
-                            "cda_value": field_value,
-                            "field_name": field_name,
-                            "message_type": msg_type,
-                            "message_index": i
-                        })
-                        print(f"🎯 CdA ENCONTRADO: {field_name} = {field_value} en {msg_type}[{i}]")
-                        total_aero_points += 1
-                    
-                    # Datos de viento
-                    elif 'wind' in field_lower:
-                        aerosensor_data["wind_data"].append({
-                            "timestamp": timestamp,
-                            "wind_value": field_value,
-                            "field_name": field_name,
-                            "message_type": msg_type,
-                            "message_index": i
-                        })
-                        print(f"🌪️ VIENTO: {field_name} = {field_value} en {msg_type}[{i}]")
-                        total_aero_points += 1
-                    
-                    # Coeficientes aerodinámicos
-                    elif any(keyword in field_lower for keyword in ['aero', 'drag', 'coefficient']):
-                        aerosensor_data["aero_coefficients"].append({
-                            "timestamp": timestamp,
-                            "coefficient_value": field_value,
-                            "field_name": field_name,
-                            "message_type": msg_type,
-                            "message_index": i
-                        })
-                        print(f"📊 COEFICIENTE AERO: {field_name} = {field_value} en {msg_type}[{i}]")
-                        total_aero_points += 1
-                    
-                    # Densidad del aire
-                    elif any(keyword in field_lower for keyword in ['air', 'density']):
-                        aerosensor_data["air_density_data"].append({
-                            "timestamp": timestamp,
-                            "density_value": field_value,
-                            "field_name": field_name,
-                            "message_type": msg_type,
-                            "message_index": i
-                        })
-                        print(f"🌡️ DENSIDAD AIRE: {field_name} = {field_value} en {msg_type}[{i}]")
-                        total_aero_points += 1
-                    
-                    # Campos desconocidos que podrían ser aerodinámicos
-                    elif field_name.startswith('unknown_') and isinstance(field_value, (int, float)):
-                        if 0.1 < field_value < 1.0:  # Rango típico de CdA
-                            aerosensor_data["unknown_aero_fields"].append({
-                                "timestamp": timestamp,
-                                "unknown_value": field_value,
-                                "field_name": field_name,
-                                "message_type": msg_type,
-                                "message_index": i,
-                                "possible_cda": True
-                            })
-                            print(f"❓ POSIBLE CdA: {field_name} = {field_value} en {msg_type}[{i}]")
-                            total_aero_points += 1
-    
+    for bucket, count in aero_counts.items():
+        if count > AERO_SAMPLE_SIZE:
+            print(f"   {bucket}: {count} valores (mostrados los primeros {AERO_SAMPLE_SIZE})")
     print(f"\n✅ Total puntos aerodinámicos encontrados: {total_aero_points}")
     
     # PASO 3: ANÁLISIS DE CAMPOS UNKNOWN CON VALORES SOSPECHOSOS
     print("\n🔍 PASO 3: ANÁLISIS DE CAMPOS UNKNOWN")
     print("-" * 50)
     
-    # Analizar patrones en campos unknown
-    unknown_analysis = {}
-    
-    for msg_type, messages in all_messages.items():
-        for message in messages:
-            for field_name, field_value in message.items():
-                if field_name.startswith('unknown_') and isinstance(field_value, (int, float)):
-                    if field_name not in unknown_analysis:
-                        unknown_analysis[field_name] = []
-                    unknown_analysis[field_name].append(field_value)
-    
     # Identificar campos con rangos típicos de CdA
     potential_cda_fields = []
     
-    for field_name, values in unknown_analysis.items():
-        if len(values) > 10:  # Solo campos con suficientes datos
-            values_clean = [v for v in values if v is not None and v != 0]
-            if values_clean:
-                min_val = min(values_clean)
-                max_val = max(values_clean)
-                avg_val = sum(values_clean) / len(values_clean)
-                std_val = np.std(values_clean)
-                
-                print(f"📊 {field_name}: min={min_val:.4f}, max={max_val:.4f}, avg={avg_val:.4f}, std={std_val:.4f}")
-                
-                # Criterios para identificar posible CdA:
-                # 1. Rango típico: 0.15 - 0.6 m²
-                # 2. Variabilidad moderada (no constante)
-                # 3. Valores realistas
-                if (0.1 <= min_val <= 0.7 and 0.15 <= max_val <= 0.8 and 
-                    std_val > 0.001 and std_val < 0.1):
-                    potential_cda_fields.append({
-                        "field_name": field_name,
-                        "min": min_val,
-                        "max": max_val,
-                        "avg": avg_val,
-                        "std": std_val,
-                        "count": len(values_clean),
-                        "confidence": "HIGH" if 0.2 <= avg_val <= 0.5 else "MEDIUM"
-                    })
-                    print(f"   🎯 POSIBLE CdA DETECTADO - Confianza: {potential_cda_fields[-1]['confidence']}")
+    for field_name, stats in unknown_analysis.items():
+        if stats.total > 10 and stats.count:  # Solo campos con suficientes datos
+            print(f"📊 {field_name}: min={stats.min:.4f}, max={stats.max:.4f}, avg={stats.mean:.4f}, std={stats.std:.4f}")
+            
+            # Criterios para identificar posible CdA (ver FieldStats.cda_candidate)
+            candidate = stats.cda_candidate(field_name)
+            if candidate:
+                potential_cda_fields.append(candidate)
+                print(f"   🎯 POSIBLE CdA DETECTADO - Confianza: {candidate['confidence']}")
     
     # PASO 4: VALIDACIÓN CRUZADA SI ENCONTRAMOS CdA
     print("\n⚡ PASO 4: VALIDACIÓN CRUZADA")
@@ -206,134 +224,93 @@ try:
     
     if aerosensor_data["cda_measurements"] or potential_cda_fields:
         print("🎯 Datos CdA encontrados - Ejecutando validación cruzada...")
-        
-        # Obtener datos de actividad para comparación
-        records = []
-        for record in fitfile.get_messages('record'):
-            point = {}
-            for data in record:
-                if data.name in ['timestamp', 'power', 'speed', 'enhanced_speed', 'distance', 'altitude']:
-                    point[data.name] = data.value
-            if point.get('power', 0) > 0 and point.get('speed', 0) > 0:
-                records.append(point)
-        
-        print(f"✅ Registros válidos para validación: {len(records)}")
+        print(f"✅ Registros válidos para validación: {validation_records}")
         
         # Calcular CdA estimado por LukSpeed
-        if len(records) > 100:
-            # Constantes
-            AIR_DENSITY = 1.225
-            GRAVITY = 9.81
-            TOTAL_MASS = 83  # 75kg + 8kg
-            Crr = 0.005
+        if validation_records > 100 and regression["n"] > 50:
+            # Estimación CdA usando regresión lineal: power = CdA * 0.5·ρ·v³
+            n_points = regression["n"]
+            coef = regression["sum_px"] / regression["sum_x2"]
+            cda_lukspeed = coef
             
-            valid_points = []
-            for record in records:
-                power = record.get('power', 0)
-                speed = record.get('speed', 0) or record.get('enhanced_speed', 0)
-                
-                if power > 50 and speed > 5:  # Filtrar datos válidos
-                    speed_ms = speed if speed < 50 else speed / 3.6
-                    
-                    # Potencia disponible para aerodinámica (aproximación)
-                    power_rr_est = Crr * TOTAL_MASS * GRAVITY * speed_ms
-                    power_available_aero = power - power_rr_est
-                    
-                    if power_available_aero > 0:
-                        valid_points.append({
-                            "speed_ms": speed_ms,
-                            "power_aero": power_available_aero
-                        })
+            # Calcular R² a partir de las sumas acumuladas
+            ss_res = regression["sum_p2"] - 2 * coef * regression["sum_px"] + coef ** 2 * regression["sum_x2"]
+            ss_tot = regression["sum_p2"] - regression["sum_p"] ** 2 / n_points
+            r_squared = 1 - (ss_res / ss_tot) if ss_tot > 0 else 0
+            
+            validation_results["lukspeed_estimation"] = {
+                "cda_estimated": max(0.15, min(0.6, cda_lukspeed)),
+                "r_squared": r_squared,
+                "points_used": n_points,
+                "avg_air_density": regression["sum_rho"] / n_points,
+                "method": "Linear regression on 0.5·ρ·v³"
+            }
             
-            if len(valid_points) > 50:
-                # Estimación CdA usando regresión
-                speeds = np.array([p["speed_ms"] for p in valid_points])
-                powers = np.array([p["power_aero"] for p in valid_points])
+            print(f"🎯 CdA LukSpeed: {validation_results['lukspeed_estimation']['cda_estimated']:.4f} m²")
+            print(f"📊 R²: {r_squared:.3f}")
+            print(f"🌡️ Densidad del aire media: {regression['sum_rho'] / n_points:.3f} kg/m³")
+
+            # Comparar con datos del sensor si disponibles
+            if aerosensor_data["cda_measurements"]:
+                measured = aero_stats["cda_measurements"]
+                cda_aerosensor = measured.mean
+                
+                validation_results["aerosensor_measured"] = {
+                    "cda_measured": cda_aerosensor,
+                    "measurements_count": measured.count,
+                    "std": measured.std
+                }
                 
-                # power_aero = 0.5 * rho * CdA * v³
-                v_cubed = speeds ** 3
+                # Calcular error
+                error_abs = abs(cda_lukspeed - cda_aerosensor)
+                error_rel = error_abs / cda_aerosensor * 100
                 
-                # Regresión lineal: power = coef * v³
-                coef = np.sum(powers * v_cubed) / np.sum(v_cubed ** 2)
-                cda_lukspeed = coef / (0.5 * AIR_DENSITY)
+                validation_results["cross_validation"] = {
+                    "absolute_error": error_abs,
+                    "relative_error": error_rel,
+                    "assessment": (
+                        "EXCELENTE" if error_abs < 0.01 else
+                        "MUY BUENO" if error_abs < 0.02 else
+                        "BUENO" if error_abs < 0.03 else
+                        "NECESITA MEJORA"
+                    )
+                }
                 
-                # Calcular R²
-                predicted = coef * v_cubed
-                ss_res = np.sum((powers - predicted) ** 2)
-                ss_tot = np.sum((powers - np.mean(powers)) ** 2)
-                r_squared = 1 - (ss_res / ss_tot) if ss_tot > 0 else 0
+                print(f"🎯 CdA Aerosensor: {cda_aerosensor:.4f} m²")
+                print(f"📊 Error absoluto: {error_abs:.4f} m²")
+                print(f"📊 Error relativo: {error_rel:.1f}%")
+                print(f"🏆 Evaluación: {validation_results['cross_validation']['assessment']}")
+            
+            elif potential_cda_fields:
+                # Usar el campo unknown más prometedor
+                best_field = max(potential_cda_fields, key=lambda x: x['count'])
+                cda_suspected = best_field['avg']
                 
-                validation_results["lukspeed_estimation"] = {
-                    "cda_estimated": max(0.15, min(0.6, cda_lukspeed)),
-                    "r_squared": r_squared,
-                    "points_used": len(valid_points),
-                    "method": "Linear regression on v³"
+                validation_results["suspected_aerosensor"] = {
+                    "field_name": best_field['field_name'],
+                    "cda_suspected": cda_suspected,
+                    "confidence": best_field['confidence']
                 }
                 
-                print(f"🎯 CdA LukSpeed: {validation_results['lukspeed_estimation']['cda_estimated']:.4f} m²")
-                print(f"📊 R²: {r_squared:.3f}")
+                error_abs = abs(cda_lukspeed - cda_suspected)
+                error_rel = error_abs / cda_suspected * 100
                 
-                # Comparar con datos del sensor si disponibles
-                if aerosensor_data["cda_measurements"]:
-                    measured_values = [m["cda_value"] for m in aerosensor_data["cda_measurements"]]
-                    cda_aerosensor = np.mean(measured_values)
-                    
-                    validation_results["aerosensor_measured"] = {
-                        "cda_measured": cda_aerosensor,
-                        "measurements_count": len(measured_values),
-                        "std": np.std(measured_values)
-                    }
-                    
-                    # Calcular error
-                    error_abs = abs(cda_lukspeed - cda_aerosensor)
-                    error_rel = error_abs / cda_aerosensor * 100
-                    
-                    validation_results["cross_validation"] = {
-                        "absolute_error": error_abs,
-                        "relative_error": error_rel,
-                        "assessment": (
-                            "EXCELENTE" if error_abs < 0.01 else
-                            "MUY BUENO" if error_abs < 0.02 else
-                            "BUENO" if error_abs < 0.03 else
-                            "NECESITA MEJORA"
-                        )
-                    }
-                    
-                    print(f"🎯 CdA Aerosensor: {cda_aerosensor:.4f} m²")
-                    print(f"📊 Error absoluto: {error_abs:.4f} m²")
-                    print(f"📊 Error relativo: {error_rel:.1f}%")
-                    print(f"🏆 Evaluación: {validation_results['cross_validation']['assessment']}")
+                validation_results["suspected_validation"] = {
+                    "absolute_error": error_abs,
+                    "relative_error": error_rel,
+                    "assessment": (
+                        "EXCELENTE" if error_abs < 0.01 else
+                        "MUY BUENO" if error_abs < 0.02 else
+                        "BUENO" if error_abs < 0.03 else
+                        "NECESITA MEJORA"
+                    )
+                }
                 
-                elif potential_cda_fields:
-                    # Usar el campo unknown más prometedor
-                    best_field = max(potential_cda_fields, key=lambda x: x['count'])
-                    cda_suspected = best_field['avg']
-                    
-                    validation_results["suspected_aerosensor"] = {
-                        "field_name": best_field['field_name'],
-                        "cda_suspected": cda_suspected,
-                        "confidence": best_field['confidence']
-                    }
-                    
-                    error_abs = abs(cda_lukspeed - cda_suspected)
-                    error_rel = error_abs / cda_suspected * 100
-                    
-                    validation_results["suspected_validation"] = {
-                        "absolute_error": error_abs,
-                        "relative_error": error_rel,
-                        "assessment": (
-                            "EXCELENTE" if error_abs < 0.01 else
-                            "MUY BUENO" if error_abs < 0.02 else
-                            "BUENO" if error_abs < 0.03 else
-                            "NECESITA MEJORA"
-                        )
-                    }
-                    
-                    print(f"❓ CdA Sospechoso ({best_field['field_name']}): {cda_suspected:.4f} m²")
-                    print(f"📊 Error absoluto: {error_abs:.4f} m²")
-                    print(f"📊 Error relativo: {error_rel:.1f}%")
-                    print(f"🏆 Evaluación: {validation_results['suspected_validation']['assessment']}")
-    
+                print(f"❓ CdA Sospechoso ({best_field['field_name']}): {cda_suspected:.4f} m²")
+                print(f"📊 Error absoluto: {error_abs:.4f} m²")
+                print(f"📊 Error relativo: {error_rel:.1f}%")
+                print(f"🏆 Evaluación: {validation_results['suspected_validation']['assessment']}")
+
     # PASO 5: GENERAR REPORTE CIENTÍFICO COMPLETO
     print("\n📋 PASO 5: GENERANDO REPORTE CIENTÍFICO")
     print("-" * 50)
@@ -341,8 +318,7 @@ try:
     current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     # Estadísticas del archivo
-    total_records = len(all_messages.get('record', []))
-    power_records = len([r for r in all_messages.get('record', []) if r.get('power', 0) > 0])
+    # total_records / power_records se acumularon durante la pasada única
     
     # Construir reporte evitando problemas de f-string
     report_header = f"""# 🚀 REPORTE CIENTÍFICO: LUKSPEED vs. AEROSENSOR
@@ -363,7 +339,7 @@ try:
     report_stats = f"""
 
 - **Puntos aerodinámicos encontrados:** {total_aero_points}
-- **CdA measurements directos:** {len(aerosensor_data["cda_measurements"])}
+- **CdA measurements directos:** {aero_counts["cda_measurements"]}
 - **Campos CdA sospechosos:** {len(potential_cda_fields)}
 - **Validación cruzada:** {'EJECUTADA' if validation_results else 'NO DISPONIBLE'}
 
@@ -374,8 +350,8 @@ try:
 ### Tipos de Mensajes Encontrados
 """
     
-    for msg_type, messages in all_messages.items():
-        report_stats += f"- **{msg_type}:** {len(messages)} registros\n"
+    for msg_type, count in message_counts.items():
+        report_stats += f"- **{msg_type}:** {count} registros\n"
     
     report_stats += "\n### Campos Aerodinámicos Identificados\n"
     
@@ -391,8 +367,8 @@ try:
 """
     
     if aerosensor_data["cda_measurements"]:
-        report_aero += f"✅ **{len(aerosensor_data['cda_measurements'])} mediciones encontradas**\n\n"
-        for m in aerosensor_data["cda_measurements"][:10]:
+        report_aero += f"✅ **{aero_counts['cda_measurements']} mediciones encontradas**\n\n"
+        for m in aerosensor_data["cda_measurements"]:
             report_aero += f"- {m['field_name']}: {m['cda_value']:.4f} m² ({m['message_type']})\n"
     else:
         report_aero += "❌ **Sin mediciones CdA directas**\n"
@@ -468,7 +444,7 @@ try:
 
 ### Criterios Cumplidos
 - [{'x' if total_aero_points > 0 else ' '}] Datos aerodinámicos detectados
-- [{'x' if len(aerosensor_data["cda_measurements"]) > 0 else ' '}] CdA measurements directos
+- [{'x' if aero_counts["cda_measurements"] > 0 else ' '}] CdA measurements directos
 - [{'x' if validation_results else ' '}] Validación cruzada ejecutada
 - [{'x' if validation_results and "cross_validation" in validation_results else ' '}] Comparación ground-truth
 
@@ -507,7 +483,7 @@ try:
 ### Archivo Procesado
 - **Registros totales:** {total_records:,}
 - **Cobertura potencia:** {power_records/total_records*100:.1f}%
-- **Tipos de mensajes:** {len(all_messages)}
+- **Tipos de mensajes:** {len(message_counts)}
 - **Campos únicos:** {sum(len(fields) for fields in field_catalog.values())}
 
 ### Metodología
@@ -533,9 +509,12 @@ try:
     # Guardar datos JSON para análisis posterior
     analysis_data = {
         "aerosensor_data": aerosensor_data,
+        "aerosensor_counts": aero_counts,
+        "aerosensor_stats": {k: v.to_dict() for k, v in aero_stats.items()},
         "potential_cda_fields": potential_cda_fields,
         "validation_results": validation_results,
         "field_catalog": {k: list(v) for k, v in field_catalog.items()},
+        "unknown_field_stats": {k: v.to_dict() for k, v in unknown_analysis.items()},
         "analysis_timestamp": current_time,
         "total_aero_points": total_aero_points
     }
@@ -550,7 +529,7 @@ try:
     print("=" * 70)
     print("📊 RESUMEN FINAL:")
     print(f"   - Puntos aerodinámicos: {total_aero_points}")
-    print(f"   - CdA measurements: {len(aerosensor_data['cda_measurements'])}")
+    print(f"   - CdA measurements: {aero_counts['cda_measurements']}")
     print(f"   - Campos sospechosos: {len(potential_cda_fields)}")
     print(f"   - Validación: {'✅ EJECUTADA' if validation_results else '❌ PENDIENTE'}")
     
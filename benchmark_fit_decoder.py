@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+FIT decoding benchmark: fitparse vs. LukSpeed columnar decoder
+Usage: python benchmark_fit_decoder.py [--fields power,speed,heart_rate] FILE.fit [FILE.fit ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import fitparse
+import numpy as np
+
+from fit_decoder import FitDecoder
+from fit_tail import FitTail
+
+COMPARE_FIELDS = ['power', 'speed', 'distance', 'altitude', 'heart_rate', 'cadence']
+
+
+def parse_records_fitparse(path):
+    """Reference path used by the analysis scripts: one FieldData per field"""
+    columns = {}
+    count = 0
+    for record in fitparse.FitFile(path).get_messages('record'):
+        for data in record:
+            columns.setdefault(data.name, []).append(data.value)
+        count += 1
+    return count, columns
+
+
+def parse_records_fast(path, fields=None):
+    records = FitDecoder(path).decode(['record'], fields).get('record')
+    return (len(records) if records else 0), records
+
+
+def best_of(fn, path, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def check_agreement(reference, records):
+    """Largest absolute difference between both decoders on common fields"""
+    worst = 0.0
+    for name in COMPARE_FIELDS:
+        if name not in reference or records is None or name not in records:
+            continue
+        ref = np.array([np.nan if v is None else v for v in reference[name]], dtype=float)
+        fast = np.where(records.masks[name], records.columns[name], np.nan).astype(float)
+        if len(ref) != len(fast):
+            return float('inf')
+        both = ~np.isnan(ref) & ~np.isnan(fast)
+        if (np.isnan(ref) != np.isnan(fast)).any():
+            return float('inf')
+        if both.any():
+            worst = max(worst, float(np.max(np.abs(ref[both] - fast[both]))))
+    return worst
+
+
+def check_tail(path, chunks=8):
+    """Stream a file to FitTail as a live writer would: data_size left at 0 (header
+    CRC unset) while appending, then the header rewritten in place without growing
+
+    Returns (records decoded, finished).
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    header_size = data[0]
+    live_header = bytearray(data[:header_size])
+    live_header[4:8] = bytes(4)
+    if header_size >= 14:
+        live_header[12:14] = bytes(2)
+    fd, tmp_path = tempfile.mkstemp(suffix='.fit')
+    try:
+        with os.fdopen(fd, 'wb') as writer:
+            writer.write(live_header)
+            writer.flush()
+            tail = FitTail(tmp_path)
+            step = max((len(data) - header_size) // chunks, 1)
+            for start in range(header_size, len(data), step):
+                writer.write(data[start:start + step])
+                writer.flush()
+                tail.poll()
+            finished_early = tail.finished
+            writer.seek(0)
+            writer.write(data[:header_size])
+            writer.flush()
+            tail.poll()
+        records = len(tail.activity)
+        finished = tail.finished and not finished_early
+        tail.close()
+    finally:
+        os.remove(tmp_path)
+    return records, finished
+
+
+def main(paths, fields=None, repeat=3):
+    print("⏱️ LukSpeed FIT Decoder Benchmark")
+    print("=" * 60)
+    if fields:
+        print(f"🎯 Projection: {', '.join(fields)}")
+    total_slow = total_fast = 0.0
+    for path in paths:
+        slow_time, (slow_count, reference) = best_of(parse_records_fitparse, path, 1)
+        fast_time, (fast_count, records) = best_of(lambda p: parse_records_fast(p, fields), path, repeat)
+        total_slow += slow_time
+        total_fast += fast_time
+        worst = check_agreement(reference, records)
+
+        print(f"\n📁 {path}")
+        print(f"   fitparse: {slow_count:,} records in {slow_time*1000:.1f} ms "
+              f"({slow_count/slow_time:,.0f} records/s)")
+        print(f"   columnar: {fast_count:,} records in {fast_time*1000:.1f} ms "
+              f"({fast_count/max(fast_time, 1e-9):,.0f} records/s)")
+        print(f"   🚀 Speedup: {slow_time/max(fast_time, 1e-9):.1f}x")
+        print(f"   {'✅' if worst < 1e-6 else '❌'} Max field difference: {worst:.3g}")
+        tail_count, finished = check_tail(path)
+        print(f"   {'✅' if finished and tail_count == fast_count else '❌'} Tail: {tail_count:,} records, "
+              f"{'finished' if finished else 'not finished'} after the header rewrite")
+
+    if len(paths) > 1:
+        print(f"\n🏁 Overall speedup: {total_slow/max(total_fast, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    fields = None
+    if len(args) >= 2 and args[0] == '--fields':
+        fields = [name.strip() for name in args[1].split(',') if name.strip()]
+        args = args[2:]
+    if not args:
+        print(__doc__.strip())
+        sys.exit(1)
+    main(args, fields)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Physics benchmark: per-point Python loop vs. LukSpeed vectorized power model
+Usage: python benchmark_physics.py [POINTS]   (default: 1,000,000 synthetic samples)
+"""
+
+import math
+import sys
+import time
+
+import numpy as np
+
+import physics
+
+
+def components_loop(speeds, grades, cdas):
+    """Previous calculate_physical_power_components inner loop"""
+    aero, rr, gravity = [], [], []
+    for speed, grade, cda in zip(speeds, grades, cdas):
+        speed_ms = speed if speed < 50 else speed / 3.6
+        aero.append(0.5 * physics.AIR_DENSITY * cda * (speed_ms ** 3))
+        rr.append(physics.DEFAULT_CRR * physics.TOTAL_MASS * physics.GRAVITY * speed_ms
+                  * np.cos(np.arctan(grade)))
+        gravity.append(physics.TOTAL_MASS * physics.GRAVITY * speed_ms * np.sin(np.arctan(grade)))
+    return aero, rr, gravity
+
+
+def components_kernel(speeds, grades, cdas):
+    components = physics.power_components(physics.speed_to_ms(speeds), grades, cdas)
+    return [components[name] for name in ("power_aero", "power_rr", "power_gravity")]
+
+
+def scenario_check():
+    """validate_physical_power.py scenarios; P_rr keeps the cos(θ) of the analyzer"""
+    worst = 0.0
+    for speed_kmh, gradient, cda, crr in [(30, 0.0, 0.30, 0.005), (20, 0.05, 0.35, 0.006),
+                                          (45, 0.0, 0.25, 0.004), (20, -0.10, 0.30, 0.005)]:
+        v = speed_kmh / 3.6
+        angle = math.atan(gradient)
+        expected = [0.5 * cda * physics.AIR_DENSITY * v ** 3,
+                    crr * physics.TOTAL_MASS * physics.GRAVITY * v * math.cos(angle),
+                    physics.TOTAL_MASS * physics.GRAVITY * v * math.sin(angle)]
+        result = physics.power_components(v, gradient, cda, crr)
+        for value, name in zip(expected, ("power_aero", "power_rr", "power_gravity")):
+            worst = max(worst, abs(float(result[name]) - value) / max(abs(value), 1.0))
+    return worst
+
+
+def synthetic_ride(points, seed=0):
+    rng = np.random.default_rng(seed)
+    speeds = np.clip(rng.normal(9, 3, points), 0, None)
+    speeds[rng.random(points) < 0.01] *= 3.6       # a few samples in km/h
+    grades = np.clip(rng.normal(0, 0.04, points), -0.25, 0.25)
+    cdas = np.clip(rng.normal(0.3, 0.03, points), 0.15, None)
+    return speeds, grades, cdas
+
+
+def main(points):
+    print("⏱️ LukSpeed Physics Benchmark")
+    print("=" * 60)
+    speeds, grades, cdas = synthetic_ride(points)
+    print(f"\n📁 synthetic ride: {points:,} samples")
+
+    start = time.perf_counter()
+    expected = components_loop(speeds.tolist(), grades.tolist(), cdas.tolist())
+    slow_time = time.perf_counter() - start
+    fast_time = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        result = components_kernel(speeds, grades, cdas)
+        fast_time = min(fast_time, time.perf_counter() - start)
+
+    agree = all(np.allclose(np.asarray(e), r, rtol=1e-9, atol=1e-9) for e, r in zip(expected, result))
+    print(f"   Components  loop {slow_time*1000:9.1f} ms | kernel {fast_time*1000:7.2f} ms | "
+          f"{slow_time/max(fast_time, 1e-9):7.0f}x | {'✅' if agree else '❌'}")
+    worst = scenario_check()
+    print(f"   Scenarios (validate_physical_power.py): max rel. error {worst:.1e} "
+          f"{'✅' if worst < 1e-9 else '❌'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
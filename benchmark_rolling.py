@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Rolling-window benchmark: per-window Python loops vs. LukSpeed rolling kernels
+Usage: python benchmark_rolling.py [FILE.fit ...]   (no files: synthetic 6 h ride)
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import rolling
+from estimation_segments import CDA_SEGMENTS, find_segments, gradients
+from fit_decoder import decode_activity
+
+
+def np_loop(powers):
+    """Previous calculate_normalized_power"""
+    if len(powers) < 30:
+        return np.mean(powers)
+    rolling_avg = []
+    for i in range(len(powers) - 29):
+        rolling_avg.append(np.mean(powers[i:i+30]))
+    return np.power(np.mean(np.power(rolling_avg, 4)), 0.25)
+
+
+def xpower_loop(powers, tau=rolling.XPOWER_TAU):
+    decay = np.exp(-1.0 / tau)
+    average = 0.0
+    total = 0.0
+    for power in powers:
+        average = decay * average + (1 - decay) * power
+        total += average ** 4
+    return (total / len(powers)) ** 0.25
+
+
+def smoothing_loop(values, window=9):
+    """applySmoothingMovingAverage (MetricsCalculator.ts)"""
+    half = window // 2
+    smoothed = []
+    for i in range(len(values)):
+        start = max(0, i - half)
+        end = min(len(values) - 1, i + half)
+        smoothed.append(sum(values[start:end + 1]) / (end - start + 1))
+    return smoothed
+
+
+def segments_loop(powers, speeds, grades, window=30, step=10):
+    """Window scan of findCdAEstimationSegments (PhysicalPowerService.ts)"""
+    found = []
+    for i in range(0, len(powers) - window + 1, step):
+        power_window = powers[i:i + window]
+        speed_window = speeds[i:i + window]
+        avg_power = sum(power_window) / window
+        avg_speed = sum(speed_window) / window
+        avg_gradient = sum(abs(g) for g in grades[i:i + window]) / window
+        if avg_gradient < 0.02 and avg_speed > 30 and avg_power > 100 and \
+                all(p > 0 and s > 0 for p, s in zip(power_window, speed_window)):
+            found.append(i)
+    return found
+
+
+def segments_kernel(powers, speeds, grades):
+    return find_segments(powers, speeds, grades, **CDA_SEGMENTS)["start"].tolist()
+
+
+def synthetic_ride(seconds=6 * 3600, seed=0):
+    rng = np.random.default_rng(seed)
+    powers = np.clip(rng.normal(220, 60, seconds), 0, None)
+    powers[rng.random(seconds) < 0.05] = 0
+    speeds = np.clip(rng.normal(32, 5, seconds), 0, None)
+    grades = rng.normal(0, 0.02, seconds)
+    return powers, speeds, grades
+
+
+def boundary_ride(seed=0):
+    """Synthetic ride with windows at exactly 30 km/h (not CdA segments) and just above"""
+    powers, speeds, grades = synthetic_ride(3600, seed)
+    for start, speed in ((600, 30.0), (1200, 30.0), (1800, 30.5), (2400, 30.0)):
+        powers[start:start + 60] = 200.0
+        speeds[start:start + 60] = speed
+        grades[start:start + 60] = 0.0
+    return powers, speeds, grades
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def run(label, powers, speeds, grades):
+    print(f"\n📁 {label}: {len(powers):,} samples")
+    power_list = powers.tolist()
+    speed_list = speeds.tolist()
+    grade_list = grades.tolist()
+    cases = [
+        ("Normalized Power", lambda: np_loop(powers), lambda: rolling.normalized_power(powers)),
+        ("xPower", lambda: xpower_loop(power_list), lambda: rolling.xpower(powers)),
+        ("Smoothing (9)", lambda: smoothing_loop(power_list), lambda: rolling.centered_mean(powers, 9)),
+        ("CdA segments", lambda: segments_loop(power_list, speed_list, grade_list),
+         lambda: segments_kernel(powers, speeds, grades)),
+    ]
+    for name, slow, fast in cases:
+        slow_time, expected = timed(slow)
+        fast_time, result = min((timed(fast) for _ in range(5)), key=lambda r: r[0])
+        agree = np.allclose(np.asarray(expected, dtype=float), np.asarray(result, dtype=float),
+                            rtol=1e-9, atol=1e-9)
+        print(f"   {name:<17} loop {slow_time*1000:9.1f} ms | kernel {fast_time*1000:7.2f} ms | "
+              f"{slow_time/max(fast_time, 1e-9):7.0f}x | {'✅' if agree else '❌'}")
+
+
+def main(paths):
+    print("⏱️ LukSpeed Rolling-Window Benchmark")
+    print("=" * 60)
+    if not paths:
+        run("synthetic 6 h ride", *synthetic_ride())
+        run("synthetic ride, 30 km/h boundary", *boundary_ride())
+    for path in paths:
+        activity = decode_activity(path, fields=['power', 'speed', 'distance', 'altitude'])
+        run(path, activity.channel('power', 0).astype(np.float64),
+            activity.channel('speed', 0).astype(np.float64) * 3.6,
+            gradients(activity.channel('altitude', 0), activity.channel('distance', 0)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
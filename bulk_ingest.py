@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Bulk FIT ingest for LukSpeed
+Fans whole directories of FIT files out over a process pool and streams every
+finished ride (summary, columnar streams, physics decomposition) to an output store.
+.fit.gz files and FIT members of .zip exports are decompressed in memory by the
+workers themselves, so no scratch disk is needed and decompression overlaps parsing.
+Usage: python bulk_ingest.py [--output DIR] [--workers N] DIR|GLOB|FILE|ZIP [...]
+"""
+
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from activity_store import save_activity
+from fit_activity import json_default
+from fit_analyzer import (analyze_fit_file_complete, calculate_physical_power_components,
+                          convert_to_lukspeed_format)
+from fit_decoder import read_fit_summary
+from fit_sources import (ARCHIVE_SUFFIXES, FIT_SUFFIXES, FitSourceError, archive_members,
+                         is_archive, read_fit_bytes, split_source)
+from virtual_elevation import solve_virtual_elevation
+
+FIT_EXTENSIONS = FIT_SUFFIXES + ARCHIVE_SUFFIXES
+DEFAULT_OUTPUT = "ingest_output"
+
+
+def expand_inputs(inputs):
+    """Resolve directories (recursively), globs and plain paths to FIT sources
+
+    Zip archives are expanded to one ``archive.zip::member`` source per FIT
+    (or FIT.gz) member.
+    """
+    paths = []
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = []
+            for root, _, files in os.walk(item):
+                candidates.extend(os.path.join(root, name) for name in files)
+        elif glob.has_magic(item):
+            candidates = glob.glob(item, recursive=True)
+        else:
+            candidates = [item]
+
+        for path in sorted(candidates):
+            if not path.lower().endswith(FIT_EXTENSIONS) or not os.path.isfile(path):
+                continue
+            if is_archive(path):
+                try:
+                    sources = archive_members(path)
+                except FitSourceError as e:
+                    print(f"⚠️ Skipping archive {e}")
+                    continue
+            else:
+                sources = [path]
+            for source in sources:
+                key = source_identity(source)
+                if key not in seen:
+                    seen.add(key)
+                    paths.append(source)
+    return paths
+
+
+def source_identity(source):
+    """Real path of a source (archive real path + member for zip members)"""
+    archive, member = split_source(source)
+    if member is None:
+        return os.path.realpath(archive)
+    return f"{os.path.realpath(archive)}::{member}"
+
+
+def activity_key(path):
+    """Stable, collision-free store name for a FIT source"""
+    archive, member = split_source(path)
+    stem = os.path.basename(member or archive)
+    for suffix in ('.gz', '.fit'):
+        if stem.lower().endswith(suffix):
+            stem = stem[:-len(suffix)]
+    digest = hashlib.sha1(source_identity(path).encode('utf-8')).hexdigest()[:10]
+    return f"{stem}-{digest}"
+
+
+class OutputStore:
+    """Directory store: one .npz of streams per ride plus append-only NDJSON indexes
+
+    Rows are keyed by activity_key, so re-running a batch appends only rides
+    that are not stored yet. failures.ndjson holds the latest error per source
+    and is rewritten (tmp file + rename) on close.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.streams_dir = os.path.join(root, "streams")
+        os.makedirs(self.streams_dir, exist_ok=True)
+        self._summaries, self._summary_keys = self._open_index("summaries.ndjson")
+        self._physics, self._physics_keys = self._open_index("physics.ndjson")
+        self._failures_path = os.path.join(root, "failures.ndjson")
+        self.failures = {row["path"]: row["error"] for row in self._read_rows(self._failures_path)}
+
+    @staticmethod
+    def _read_rows(path):
+        """Rows of an NDJSON file; a line cut short by a crash is skipped"""
+        rows = []
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return rows
+
+    def _open_index(self, name):
+        path = os.path.join(self.root, name)
+        keys = {row.get("key") for row in self._read_rows(path)}
+        handle = open(path, "a+", encoding="utf-8")
+        if handle.tell() > 0:
+            handle.seek(handle.tell() - 1)
+            if handle.read(1) != "\n":
+                handle.write("\n")     # never append to a truncated last row
+        return handle, keys
+
+    def streams_path(self, key):
+        return os.path.join(self.streams_dir, f"{key}.npz")
+
+    def has(self, key):
+        return key in self._summary_keys and key in self._physics_keys
+
+    @staticmethod
+    def _append(handle, row):
+        handle.write(json.dumps(row, default=json_default) + "\n")
+        handle.flush()
+
+    def add_result(self, result):
+        key = result["key"]
+        if key not in self._summary_keys:
+            self._append(self._summaries, {"key": key, "path": result["path"],
+                                           "records": result["records"], **result["summary"]})
+            self._summary_keys.add(key)
+        if key not in self._physics_keys:
+            self._append(self._physics, {"key": key, **result["physics"]})
+            self._physics_keys.add(key)
+        self.failures.pop(result["path"], None)
+
+    def add_failure(self, path, error):
+        self.failures[path] = error
+
+    def close(self):
+        for handle in (self._summaries, self._physics):
+            handle.close()
+        tmp_path = f"{self._failures_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for path, error in self.failures.items():
+                self._append(f, {"path": path, "error": error})
+        os.replace(tmp_path, self._failures_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ingest_file(path, streams_path):
+    """Worker: full pipeline for one FIT source; never raises"""
+    start = time.perf_counter()
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            # Decompressed once, in memory, and shared by both passes
+            data = read_fit_bytes(path)
+            summary = read_fit_summary(data)
+            fit_analysis = analyze_fit_file_complete(path, data)
+            if fit_analysis is None:
+                errors = [line for line in log.getvalue().splitlines() if "❌" in line]
+                raise ValueError(errors[-1] if errors else "could not decode FIT file")
+
+            lukspeed_data = convert_to_lukspeed_format(fit_analysis)
+            physical_results = calculate_physical_power_components(lukspeed_data)
+            virtual_elevation = solve_virtual_elevation(lukspeed_data)
+            save_activity(streams_path, lukspeed_data, compress=True)
+
+        summary.setdefault("data_quality", fit_analysis.data_quality)
+        return {
+            "ok": True,
+            "path": path,
+            "key": os.path.splitext(os.path.basename(streams_path))[0],
+            "records": len(fit_analysis),
+            "summary": summary,
+            "physics": {"estimates": physical_results["estimates"],
+                        "validation": physical_results["validation"],
+                        "virtual_elevation": virtual_elevation},
+            "seconds": time.perf_counter() - start,
+        }
+    except Exception as e:
+        return {
+            "ok": False,
+            "path": path,
+            "error": f"{type(e).__name__}: {e}",
+            "traceback": traceback.format_exc(),
+            "seconds": time.perf_counter() - start,
+        }
+
+
+def _worker_died(path, error):
+    return {"ok": False, "path": path, "error": f"worker process died ({type(error).__name__})"}
+
+
+def ingest_results(paths, streams_path, workers):
+    """Yield (path, result) for every source as the workers finish them
+
+    A worker that dies (e.g. out of memory) breaks the whole pool: every
+    unfinished future fails with BrokenProcessPool. Those sources are then run
+    one at a time until one kills its worker again, which is reported as
+    failed; the rest go back to a fresh parallel pool.
+    """
+    pending = list(paths)
+    while pending:
+        unfinished = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(ingest_file, path, streams_path(path)): path for path in pending}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    unfinished.append(path)
+                    continue
+                except Exception as e:
+                    result = {"ok": False, "path": path, "error": f"{type(e).__name__}: {e}"}
+                yield path, result
+        if not unfinished:
+            return
+
+        print(f"⚠️ A worker process died; retrying {len(unfinished)} sources one at a time")
+        order = {path: k for k, path in enumerate(pending)}
+        unfinished.sort(key=order.get)
+        pending = []
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            for k, path in enumerate(unfinished):
+                try:
+                    result = pool.submit(ingest_file, path, streams_path(path)).result()
+                except BrokenProcessPool as e:
+                    yield path, _worker_died(path, e)
+                    pending = unfinished[k + 1:]
+                    break
+                except Exception as e:
+                    result = {"ok": False, "path": path, "error": f"{type(e).__name__}: {e}"}
+                yield path, result
+
+
+def bulk_ingest(inputs, output_dir=DEFAULT_OUTPUT, workers=None):
+    """Ingest every FIT file under ``inputs``; returns (ok, failed, records)"""
+    paths = expand_inputs(inputs)
+    workers = workers or os.cpu_count() or 1
+    print(f"📁 {len(paths)} FIT sources | ⚙️ {workers} workers | 💾 {output_dir}")
+    if not paths:
+        return 0, 0, 0
+
+    ok = failed = records = 0
+    start = time.perf_counter()
+    with OutputStore(output_dir) as store:
+        stored = [path for path in paths if store.has(activity_key(path))]
+        if stored:
+            print(f"⏭️ {len(stored)} already in {output_dir}, skipped")
+            paths = [path for path in paths if not store.has(activity_key(path))]
+        results = ingest_results(paths, lambda path: store.streams_path(activity_key(path)), workers)
+        for done, (path, result) in enumerate(results, 1):
+            if result["ok"]:
+                store.add_result(result)
+                ok += 1
+                records += result["records"]
+                status = f"✅ {result['records']:,} records"
+            else:
+                store.add_failure(path, result["error"])
+                failed += 1
+                status = f"❌ {result['error']}"
+
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            print(f"[{done}/{len(paths)}] {status} - {path} "
+                  f"({done/elapsed:.1f} files/s, {records/elapsed:,.0f} records/s)")
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print("=" * 60)
+    print(f"🏁 {ok} ingested, {failed} failed in {elapsed:.1f}s")
+    print(f"🚀 Throughput: {len(paths)/elapsed:.1f} files/s | {records/elapsed:,.0f} records/s")
+    return ok, failed, records
+
+
+def main(argv):
+    output_dir = DEFAULT_OUTPUT
+    workers = None
+    inputs = []
+    args = iter(argv)
+    for arg in args:
+        if arg == '--output':
+            output_dir = next(args, output_dir)
+        elif arg == '--workers':
+            workers = int(next(args, 0)) or None
+        else:
+            inputs.append(arg)
+
+    if not inputs:
+        print(__doc__.strip())
+        return 1
+
+    print("🚀 LukSpeed Bulk FIT Ingest")
+    print("=" * 60)
+    ok, failed, _ = bulk_ingest(inputs, output_dir, workers)
+    return 0 if failed == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
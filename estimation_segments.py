@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+CdA / Crr estimation segment finder for LukSpeed
+Python port of findCdAEstimationSegments / findCrrEstimationSegments
+(PhysicalPowerService.ts): every candidate window is evaluated at once with
+strided rolling sums, and the flatness, speed, power and no-zero criteria are
+boolean masks, instead of slicing and reducing one window at a time. Windows
+run on the 1 Hz grid and never span a pause. Window and stride are per-bike
+settings.
+Usage: python estimation_segments.py FILE.fit [--window 30] [--step 10]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from fit_decoder import decode_activity
+from physics import speed_to_ms
+from resample import GAP_SPLIT, resample_1hz
+from rolling import strided_all, strided_mean, window_starts
+
+# Criteria of PhysicalPowerService.ts; gradients are decimals (0.02 = 2 %).
+# CdA wants avgSpeed > 30, Crr avgSpeed >= 15 && <= 25
+CDA_SEGMENTS = {"window": 30, "step": 10, "max_gradient": 0.02,
+                "min_speed_kmh": 30, "max_speed_kmh": None, "min_power": 100, "min_inclusive": False}
+CRR_SEGMENTS = {"window": 60, "step": 15, "max_gradient": 0.01,
+                "min_speed_kmh": 15, "max_speed_kmh": 25, "min_power": 50, "min_inclusive": True}
+MAX_GRADIENT = 0.20     # calculateGradients clamps to ±20 %
+SPEED_TOLERANCE = 1e-6  # km/h; rolling-sum rounding never moves a mean across a bound
+FIELDS = ['timestamp', 'power', 'speed', 'enhanced_speed', 'distance',
+          'altitude', 'enhanced_altitude']
+
+
+def find_segments(power, speed_kmh, gradient, window, step, max_gradient,
+                  min_speed_kmh, max_speed_kmh=None, min_power=0, min_inclusive=False):
+    """Windows of ``window`` samples every ``step`` samples that meet the criteria
+
+    Mean |gradient| < max_gradient, mean speed > min_speed_kmh (>= with
+    ``min_inclusive``) and <= max_speed_kmh, mean power > min_power, and
+    power and speed > 0 on every sample. Returns arrays: start, stop (sample
+    indices), avg_power, avg_speed_kmh, avg_gradient.
+    """
+    power = np.asarray(power, dtype=np.float64)
+    speed_kmh = np.asarray(speed_kmh, dtype=np.float64)
+    starts = window_starts(len(power), window, step)
+    avg_power = strided_mean(power, window, step)
+    avg_speed = strided_mean(speed_kmh, window, step)
+    avg_gradient = strided_mean(np.abs(gradient), window, step)
+    if min_inclusive:
+        fast_enough = avg_speed >= min_speed_kmh - SPEED_TOLERANCE
+    else:
+        fast_enough = avg_speed > min_speed_kmh + SPEED_TOLERANCE
+    keep = ((avg_gradient < max_gradient) & fast_enough & (avg_power > min_power)
+            & strided_all((power > 0) & (speed_kmh > 0), window, step))
+    if max_speed_kmh is not None:
+        keep &= avg_speed <= max_speed_kmh + SPEED_TOLERANCE
+    return {
+        "start": starts[keep],
+        "stop": starts[keep] + window,
+        "avg_power": avg_power[keep],
+        "avg_speed_kmh": avg_speed[keep],
+        "avg_gradient": avg_gradient[keep],
+    }
+
+
+def gradients(elevation, distance):
+    """Rise over run between consecutive samples, clamped to ±MAX_GRADIENT (0 when not moving)"""
+    elevation = np.asarray(elevation, dtype=np.float64)
+    distance = np.asarray(distance, dtype=np.float64)
+    result = np.zeros(len(elevation))
+    run = np.diff(distance)
+    moving = run > 0
+    result[1:][moving] = np.diff(elevation)[moving] / run[moving]
+    return np.clip(result, -MAX_GRADIENT, MAX_GRADIENT)
+
+
+def _gradient_channel(block):
+    """Decimal gradient of a 1 Hz block: its grade channel (%) or elevation / distance"""
+    if block.has_data("grade"):
+        return block.channel("grade", 0) / 100
+    elevation = next((name for name in ("elevation", "enhanced_altitude", "altitude")
+                      if block.has_data(name)), None)
+    if elevation is None or not block.has_data("distance"):
+        return np.zeros(len(block))
+    return gradients(block.channel(elevation, 0), block.channel("distance", 0))
+
+
+def activity_segments(activity, criteria=CDA_SEGMENTS, **overrides):
+    """Estimation segments of an Activity; ``overrides`` replace criteria (e.g. window=40)
+
+    Same arrays as find_segments with the window bounds as epoch seconds
+    (start_time, end_time inclusive) instead of sample indices.
+    """
+    settings = dict(criteria, **overrides)
+    channels = ["power", "speed", "grade", "distance", "elevation", "enhanced_altitude", "altitude"]
+    parts = []
+    for block in resample_1hz(activity, GAP_SPLIT, channels=channels):
+        found = find_segments(block.channel("power", 0), speed_to_ms(block.channel("speed", 0)) * 3.6,
+                              _gradient_channel(block), **settings)
+        timestamps = block.channels["timestamp"]
+        found["start_time"] = timestamps[found.pop("start")]
+        found["end_time"] = timestamps[found.pop("stop") - 1]
+        parts.append(found)
+    keys = ["start_time", "end_time", "avg_power", "avg_speed_kmh", "avg_gradient"]
+    if not parts:
+        return {key: np.zeros(0) for key in keys}
+    return {key: np.concatenate([part[key] for part in parts]) for key in keys}
+
+
+def main(argv):
+    if not argv:
+        print(__doc__.strip())
+        return 1
+    overrides = {}
+    for option in ("window", "step"):
+        if f"--{option}" in argv:
+            overrides[option] = int(argv[argv.index(f"--{option}") + 1])
+    path = argv[0]
+
+    print("🔎 LukSpeed - Segmentos para estimar CdA / Crr")
+    print("=" * 60)
+    activity = decode_activity(path, fields=FIELDS)
+    for label, criteria in (("CdA", CDA_SEGMENTS), ("Crr", CRR_SEGMENTS)):
+        start = time.perf_counter()
+        segments = activity_segments(activity, criteria, **overrides)
+        elapsed = time.perf_counter() - start
+        count = len(segments["start_time"])
+        print(f"\n📊 {label}: {count} ventanas en {elapsed*1000:.1f} ms")
+        if count:
+            print(f"   Potencia media: {segments['avg_power'].mean():.1f} W | "
+                  f"velocidad media: {segments['avg_speed_kmh'].mean():.1f} km/h | "
+                  f"pendiente media: {segments['avg_gradient'].mean()*100:.2f} %")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Aerodynamic field classifier for LukSpeed
+Resolves each (message type, field name or number) to a category once, through
+one precompiled pattern plus explicit mappings, and memoizes the result so that
+per-record classification is a dict lookup.
+"""
+
+import re
+
+CDA = "cda"
+WIND = "wind"
+AERO_COEFFICIENT = "aero_coefficient"
+AIR_DENSITY = "air_density"
+FRONTAL_AREA = "frontal_area"
+UNKNOWN = "unknown"
+
+# Every category that counts as aerodynamic data (UNKNOWN only may be)
+AERO_CATEGORIES = (CDA, WIND, AERO_COEFFICIENT, AIR_DENSITY, FRONTAL_AREA)
+
+# One optional lookahead per category, in priority order: a single match()
+# reports every keyword family present anywhere in the name
+KEYWORD_PATTERN = re.compile(
+    r"(?=.*?(?P<cda>cda))?"
+    r"(?=.*?(?P<wind>wind))?"
+    r"(?=.*?(?P<aero_coefficient>aero|drag|coefficient))?"
+    r"(?=.*?(?P<air_density>air|density))?"
+    r"(?=.*?(?P<frontal_area>frontal|area))?",
+    re.IGNORECASE,
+)
+PATTERN_PRIORITY = (CDA, WIND, AERO_COEFFICIENT, AIR_DENSITY, FRONTAL_AREA)
+
+# Explicit mappings win over the keyword pattern. Keys are a field name or
+# number, or (message type, field) for a single message.
+AEROSENSOR_FIELDS = {
+    # Aerosensor Connect IQ developer fields
+    "CdA": CDA,
+    "cda": CDA,
+    "aero_cda": CDA,
+    "Wind Speed": WIND,
+    "WindSpeed": WIND,
+    "aero_wind_speed": WIND,
+    "Wind Yaw": WIND,
+    "Yaw": WIND,
+    "Air Speed": WIND,
+    "AirSpeed": WIND,
+    "Air Density": AIR_DENSITY,
+    "AirDensity": AIR_DENSITY,
+    # Channel names given to those fields by the FIT decoder
+    "aero_air_speed": WIND,
+    "aero_yaw": WIND,
+    "aero_air_density": AIR_DENSITY,
+    # Profile fields that only look aerodynamic
+    ("session", "total_anaerobic_training_effect"): None,
+    ("lap", "total_anaerobic_training_effect"): None,
+    "total_anaerobic_training_effect": None,
+    "anaerobic_training_effect": None,
+    ("dive_settings", "water_density"): None,
+}
+
+
+class FieldClassifier:
+    """Memoized (message type, field) -> category lookup"""
+
+    def __init__(self, mappings=None):
+        self.mappings = dict(AEROSENSOR_FIELDS if mappings is None else mappings)
+        self._cache = {}
+
+    def register(self, field, category, message=None):
+        """Add an explicit mapping (``category=None`` marks a field as not aero)"""
+        key = field if message is None else (message, field)
+        self.mappings[key] = category
+        self._cache.clear()
+
+    def classify(self, message, field):
+        """Category of a field, or None when it carries no aerodynamic data"""
+        key = (message, field)
+        try:
+            return self._cache[key]
+        except KeyError:
+            category = self._cache[key] = self._resolve(message, field)
+            return category
+
+    def is_aero(self, message, field, categories=AERO_CATEGORIES):
+        return self.classify(message, field) in categories
+
+    def _resolve(self, message, field):
+        if (message, field) in self.mappings:
+            return self.mappings[(message, field)]
+        if field in self.mappings:
+            return self.mappings[field]
+        if not isinstance(field, str):
+            return None
+
+        match = KEYWORD_PATTERN.match(field)
+        for category in PATTERN_PRIORITY:
+            if match.group(category) is not None:
+                return category
+        if field.startswith("unknown_"):
+            return UNKNOWN
+        return None
+
+
+default_classifier = FieldClassifier()
+
+
+def classify_field(message, field):
+    """Category of ``field`` in ``message`` using the shared default classifier"""
+    return default_classifier.classify(message, field)
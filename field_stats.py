@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Streaming per-field statistics for LukSpeed aerosensor candidate detection
+Welford accumulators (count, min, max, mean, variance, zero count, histogram)
+that are updated one value at a time and merge exactly across files.
+Usage: python field_stats.py aerosensor_analysis_data.json [...]
+"""
+
+import json
+import sys
+from bisect import bisect_right
+
+# Fixed 0.05 m² bins over the CdA range, plus underflow/overflow bins, so
+# histograms from different files always line up when merged
+HISTOGRAM_EDGES = [round(i * 0.05, 2) for i in range(21)]
+
+
+class FieldStats:
+    """Online statistics of the non-zero values of one field"""
+
+    def __init__(self):
+        self.count = 0          # non-zero values
+        self.zeros = 0
+        self.mean = 0.0
+        self.m2 = 0.0           # sum of squared deviations from the mean
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.histogram = [0] * (len(HISTOGRAM_EDGES) + 1)
+
+    def update(self, value):
+        if value == 0:
+            self.zeros += 1
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.histogram[bisect_right(HISTOGRAM_EDGES, value)] += 1
+
+    def merge(self, other):
+        """Fold another accumulator into this one (Chan et al. parallel update)"""
+        if other.count:
+            total = self.count + other.count
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta * delta * self.count * other.count / total
+            self.mean += delta * other.count / total
+            self.count = total
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        self.zeros += other.zeros
+        return self
+
+    @property
+    def total(self):
+        """All numeric values seen, zeros included"""
+        return self.count + self.zeros
+
+    @property
+    def variance(self):
+        """Population variance (same as np.var / np.std with ddof=0)"""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    def cda_candidate(self, field_name, min_values=10):
+        """CdA-candidate summary when the value range looks like a CdA, else None
+
+        Criteria: typical range 0.15 - 0.6 m², moderate (non-constant)
+        variability and enough values.
+        """
+        if self.total <= min_values or not self.count:
+            return None
+        if not (0.1 <= self.min <= 0.7 and 0.15 <= self.max <= 0.8 and 0.001 < self.std < 0.1):
+            return None
+        return {
+            "field_name": field_name,
+            "min": self.min,
+            "max": self.max,
+            "avg": self.mean,
+            "std": self.std,
+            "count": self.count,
+            "confidence": "HIGH" if 0.2 <= self.mean <= 0.5 else "MEDIUM"
+        }
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "zeros": self.zeros,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "histogram": self.histogram,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count = data["count"]
+        stats.zeros = data["zeros"]
+        stats.mean = data["mean"]
+        stats.m2 = data["m2"]
+        if stats.count:
+            stats.min = data["min"]
+            stats.max = data["max"]
+        stats.histogram = list(data["histogram"])
+        return stats
+
+
+def merge_field_stats(stats_maps):
+    """Merge several ``{field_name: FieldStats}`` maps (e.g. one per file)"""
+    merged = {}
+    for stats_map in stats_maps:
+        for field_name, stats in stats_map.items():
+            merged.setdefault(field_name, FieldStats()).merge(stats)
+    return merged
+
+
+def rank_cda_candidates(stats_by_field):
+    """CdA candidates ordered by confidence, then by number of values"""
+    candidates = [stats.cda_candidate(name) for name, stats in stats_by_field.items()]
+    candidates = [c for c in candidates if c is not None]
+    return sorted(candidates, key=lambda c: (c["confidence"] != "HIGH", -c["count"]))
+
+
+def load_field_stats(path):
+    """``unknown_field_stats`` saved by aerosensor_analysis_fixed.py"""
+    with open(path) as f:
+        data = json.load(f)
+    return {name: FieldStats.from_dict(stats)
+            for name, stats in data.get("unknown_field_stats", {}).items()}
+
+
+def main(paths):
+    print("📊 LukSpeed - Ranking de campos unknown candidatos a CdA")
+    print("=" * 60)
+    merged = merge_field_stats(load_field_stats(path) for path in paths)
+    print(f"✅ {len(paths)} archivos, {len(merged)} campos unknown")
+
+    ranking = rank_cda_candidates(merged)
+    if not ranking:
+        print("❌ Ningún campo con rango típico de CdA")
+    for position, c in enumerate(ranking, 1):
+        print(f"{position:2d}. {c['field_name']}: avg={c['avg']:.4f} ±{c['std']:.4f} "
+              f"[{c['min']:.4f}, {c['max']:.4f}] n={c['count']:,} - Confianza: {c['confidence']}")
+    return ranking
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        sys.exit(1)
+    main(sys.argv[1:])
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Columnar Activity container for the LukSpeed FIT pipeline
+Holds every channel of a ride as a typed NumPy array plus a validity mask
+"""
+
+import numpy as np
+from datetime import datetime, timezone
+
+# Typed storage for the channels the pipeline knows about. Anything else
+# (aerosensor fields, developer fields, unknown_*) is stored as float64.
+CHANNEL_DTYPES = {
+    "timestamp": np.int64,          # Unix epoch seconds (UTC)
+    "power": np.float64,
+    "speed": np.float64,
+    "enhanced_speed": np.float64,
+    "distance": np.float64,
+    "altitude": np.float64,
+    "enhanced_altitude": np.float64,
+    "elevation": np.float64,
+    "cadence": np.float64,
+    "heart_rate": np.float64,
+    "temperature": np.float64,
+    "grade": np.float64,
+    "resistance": np.float64,
+    "time_from_course": np.float64,
+    "position_lat": np.int32,       # semicircles, as written by the device
+    "position_long": np.int32,
+    "latitude": np.int32,
+    "longitude": np.int32,
+    "left_right_balance": np.float64,
+    "left_torque_effectiveness": np.float64,
+    "right_torque_effectiveness": np.float64,
+    "left_pedal_smoothness": np.float64,
+    "right_pedal_smoothness": np.float64,
+    "combined_pedal_smoothness": np.float64,
+}
+
+DEFAULT_DTYPE = np.float64
+
+
+def to_epoch_seconds(value):
+    """Convert a FIT/fitparse timestamp (datetime or number) to Unix seconds"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return int(value)
+
+
+def epoch_to_iso(timestamps):
+    """Format an int64 epoch array as naive ISO-8601 strings (fitparse style)"""
+    return np.datetime_as_string(np.asarray(timestamps, dtype='datetime64[s]'), unit='s')
+
+
+def json_default(obj):
+    """json.dump default hook that understands NumPy arrays and scalars"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, set):
+        return sorted(obj)
+    return str(obj)
+
+
+class Activity:
+    """Columnar container: one typed array + validity mask per channel"""
+
+    def __init__(self, n_points=0):
+        self.n_points = int(n_points)
+        self.channels = {}
+        self.masks = {}
+        self.metadata = {}
+        self.data_quality = {}
+        self.available_fields = set()
+        self.special_sensors = {}
+
+    def __len__(self):
+        return self.n_points
+
+    def __contains__(self, name):
+        return name in self.channels
+
+    @property
+    def channel_names(self):
+        return list(self.channels.keys())
+
+    def set_channel(self, name, values, mask=None, dtype=None):
+        """Store a channel; values outside the mask are considered missing"""
+        dtype = dtype or CHANNEL_DTYPES.get(name, DEFAULT_DTYPE)
+        values = np.asarray(values)
+        if values.shape != (self.n_points,):
+            raise ValueError(f"Channel '{name}' has shape {values.shape}, expected ({self.n_points},)")
+
+        if mask is None:
+            mask = np.ones(self.n_points, dtype=bool)
+        else:
+            mask = np.asarray(mask, dtype=bool)
+
+        if values.dtype != dtype:
+            # Missing samples may hold NaN / junk; zero them before casting
+            if np.issubdtype(values.dtype, np.floating) and not np.issubdtype(np.dtype(dtype), np.floating):
+                values = np.where(mask, values, 0)
+            values = values.astype(dtype)
+
+        self.channels[name] = values
+        self.masks[name] = mask
+
+    def channel(self, name, default=0):
+        """Channel values with missing samples replaced by ``default``"""
+        if name not in self.channels:
+            dtype = CHANNEL_DTYPES.get(name, DEFAULT_DTYPE)
+            return np.full(self.n_points, default, dtype=dtype)
+        values = self.channels[name]
+        mask = self.masks[name]
+        if mask.all():
+            return values
+        return np.where(mask, values, np.asarray(default).astype(values.dtype))
+
+    def mask(self, name):
+        """Validity mask of a channel (all False when the channel is absent)"""
+        if name not in self.masks:
+            return np.zeros(self.n_points, dtype=bool)
+        return self.masks[name]
+
+    def has_data(self, name):
+        return bool(self.mask(name).any())
+
+    def positive_count(self, name):
+        """Number of valid samples strictly greater than zero"""
+        if name not in self.channels:
+            return 0
+        return int(np.count_nonzero(self.masks[name] & (self.channels[name] > 0)))
+
+    def select(self, rows):
+        """New Activity containing only the given rows (bool mask or indices)"""
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        subset = Activity(len(rows))
+        for name, values in self.channels.items():
+            subset.channels[name] = values[rows]
+            subset.masks[name] = self.masks[name][rows]
+        subset.metadata = dict(self.metadata)
+        subset.available_fields = set(self.available_fields)
+        subset.special_sensors = dict(self.special_sensors)
+        return subset
+
+    @classmethod
+    def concat(cls, parts):
+        """Stack Activities row-wise; channels missing from a part are masked out"""
+        parts = list(parts)
+        activity = cls(sum(len(part) for part in parts))
+        names = []
+        for part in parts:
+            names.extend(name for name in part.channel_names if name not in names)
+        for name in names:
+            values = []
+            masks = []
+            for part in parts:
+                if name in part.channels:
+                    values.append(part.channels[name])
+                    masks.append(part.masks[name])
+                else:
+                    dtype = CHANNEL_DTYPES.get(name, DEFAULT_DTYPE)
+                    values.append(np.zeros(len(part), dtype=dtype))
+                    masks.append(np.zeros(len(part), dtype=bool))
+            activity.set_channel(name, np.concatenate(values), np.concatenate(masks))
+        for part in parts:
+            activity.metadata.update(part.metadata)
+            activity.available_fields |= part.available_fields
+            activity.special_sensors.update(part.special_sensors)
+        return activity
+
+    @classmethod
+    def from_columns(cls, columns, n_points=None):
+        """Build an Activity from ``{name: list}`` with ``None`` for missing values"""
+        if n_points is None:
+            n_points = max((len(v) for v in columns.values()), default=0)
+        activity = cls(n_points)
+        for name, values in columns.items():
+            if len(values) < n_points:
+                values = list(values) + [None] * (n_points - len(values))
+            mask = np.fromiter((v is not None for v in values), dtype=bool, count=n_points)
+            if name == "timestamp":
+                filled = [to_epoch_seconds(v) if v is not None else 0 for v in values]
+            else:
+                filled = [v if v is not None else 0 for v in values]
+            try:
+                activity.set_channel(name, np.asarray(filled), mask)
+            except (TypeError, ValueError):
+                # Non-numeric payloads (strings, tuples) are not channel data
+                continue
+        return activity
+
+    def to_points(self, channels=None, drop_missing=False, start=0, stop=None):
+        """Row-oriented ActivityPoint[] view for JSON consumers
+
+        Missing samples are emitted as ``None`` or, with ``drop_missing``,
+        left out of the point entirely. ``start``/``stop`` limit the view to
+        a slice of rows.
+        """
+        names = channels or self.channel_names
+        rows = slice(start, stop)
+        columns = {}
+        for name in names:
+            if name == "timestamp":
+                columns[name] = epoch_to_iso(self.channels[name][rows]).tolist()
+            else:
+                columns[name] = self.channels[name][rows].tolist()
+
+        points = []
+        masks = {name: self.masks[name][rows] for name in names}
+        all_valid = {name: bool(m.all()) for name, m in masks.items()}
+        for i in range(len(range(self.n_points)[rows])):
+            point = {}
+            for name in names:
+                if all_valid[name] or masks[name][i]:
+                    point[name] = columns[name][i]
+                elif not drop_missing:
+                    point[name] = None
+            points.append(point)
+        return points
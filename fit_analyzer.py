@@ -4,99 +4,136 @@ FIT File Analyzer for LukSpeed Validation
 Extracts cycling data including CdA from Aerosensor and performs comprehensive analysis
 """
 
-import fitparse
 import json
 import numpy as np
-import pandas as pd
 from datetime import datetime
 import sys
 import os
 
-def analyze_fit_file_complete(file_path):
-    """Complete analysis of FIT file including all available data fields"""
+from activity_store import save_activity, write_points_json
+from fit_activity import Activity, epoch_to_iso, json_default, to_epoch_seconds
+from fit_cache import FitCache, activity_to_arrays, arrays_to_activity, file_digest
+from fit_decoder import DECODER_VERSION, FitDecoder, records_to_activity
+from field_classifier import AERO_COEFFICIENT, CDA, classify_field
+from physics import (COMPONENTS, DEFAULT_CDA, DEFAULT_CRR, WHEEL_INERTIA, acceleration,
+                     density_channel, forward_fill, power_components, speed_to_ms, total_power,
+                     validation_stats)
+from resample import GAP_SPLIT, blocks_normalized_power, resample_1hz
+from rolling import normalized_power
+
+# Bump whenever analysis / physics results change; keys the on-disk parse cache
+METRICS_VERSION = "4"
+
+# Pauses longer than resample.MAX_GAP_SECONDS split the ride into blocks
+GAP_POLICY = GAP_SPLIT
+
+RECORD_FIELDS = ['timestamp', 'power', 'speed', 'distance', 'altitude',
+                 'cadence', 'heart_rate', 'temperature', 'position_lat',
+                 'position_long', 'enhanced_speed', 'enhanced_altitude',
+                 'grade', 'resistance', 'time_from_course']
+
+PEDALING_FIELDS = ['left_right_balance', 'left_torque_effectiveness',
+                   'right_torque_effectiveness', 'left_pedal_smoothness',
+                   'right_pedal_smoothness', 'combined_pedal_smoothness']
+
+
+def is_aero_field(name, message='record'):
+    """True for fields that may carry CdA / aerodynamic data"""
+    return classify_field(message, name) in (CDA, AERO_COEFFICIENT)
+
+
+def analyze_fit_file_complete(file_path, data=None):
+    """Complete analysis of FIT file including all available data fields
+
+    ``file_path`` may be a .fit.gz file or an ``archive.zip::member`` source;
+    pass ``data`` when the FIT bytes were already read.
+    """
     print(f"🔍 Analyzing FIT file: {file_path}")
     
     try:
-        fitfile = fitparse.FitFile(file_path)
+        decoder = FitDecoder(file_path if data is None else data)
+        available_fields = decoder.field_names('record')
+        developer_fields = decoder.developer_field_names('record')
         
-        # Initialize data structures
-        activity_info = {
-            "records": [],
-            "metadata": {},
-            "data_quality": {},
-            "available_fields": set(),
-            "special_sensors": {}
-        }
+        # Only decode the channels the pipeline uses; the rest are skipped by offset
+        wanted = []
+        special_sensors = {}
+        for name in available_fields:
+            if name in RECORD_FIELDS or name in PEDALING_FIELDS:
+                wanted.append(name)
+            # Look for CdA and other aerodynamic data
+            elif is_aero_field(name):
+                wanted.append(name)
+                special_sensors["aerosensor"] = True
+                print(f"🎯 Found aerodynamic data: {name}")
+            # Typed developer fields (Aerosensor wind, air density, ...)
+            elif name in developer_fields:
+                wanted.append(name)
+        if developer_fields:
+            special_sensors["developer_fields"] = decoder.developer_schema()
         
-        # Process all record messages to discover available fields
-        record_count = 0
-        for record in fitfile.get_messages('record'):
-            point = {}
-            for data in record:
-                activity_info["available_fields"].add(data.name)
-                
-                # Extract all relevant cycling data
-                if data.name in ['timestamp', 'power', 'speed', 'distance', 'altitude', 
-                               'cadence', 'heart_rate', 'temperature', 'position_lat', 
-                               'position_long', 'enhanced_speed', 'enhanced_altitude',
-                               'grade', 'resistance', 'time_from_course']:
-                    point[data.name] = data.value
-                
-                # Look for CdA and other aerodynamic data
-                elif 'cda' in data.name.lower() or 'aero' in data.name.lower():
-                    point[data.name] = data.value
-                    activity_info["special_sensors"]["aerosensor"] = True
-                    print(f"🎯 Found aerodynamic data: {data.name} = {data.value}")
-                
-                # Look for other specialized sensor data
-                elif data.name in ['left_right_balance', 'left_torque_effectiveness',
-                                 'right_torque_effectiveness', 'left_pedal_smoothness',
-                                 'right_pedal_smoothness', 'combined_pedal_smoothness']:
-                    point[data.name] = data.value
-            
-            if point:
-                activity_info["records"].append(point)
-                record_count += 1
+        activity = records_to_activity(decoder.decode(['record'], wanted).get('record'))
+        activity.available_fields = set(available_fields)
+        activity.special_sensors = special_sensors
+        record_count = len(activity)
         
         print(f"✅ Processed {record_count} data points")
-        print(f"📊 Available fields: {sorted(list(activity_info['available_fields']))}")
+        print(f"📊 Available fields: {sorted(list(activity.available_fields))}")
         
         # Calculate data quality metrics
-        total_records = len(activity_info["records"])
+        total_records = len(activity)
         if total_records > 0:
-            power_records = len([r for r in activity_info["records"] if 'power' in r and r.get('power', 0) > 0])
-            speed_records = len([r for r in activity_info["records"] if 'speed' in r and r.get('speed', 0) > 0])
-            hr_records = len([r for r in activity_info["records"] if 'heart_rate' in r and r.get('heart_rate', 0) > 0])
-            cadence_records = len([r for r in activity_info["records"] if 'cadence' in r and r.get('cadence', 0) > 0])
+            power_records = activity.positive_count('power')
+            speed_records = activity.positive_count('speed')
+            hr_records = activity.positive_count('heart_rate')
+            cadence_records = activity.positive_count('cadence')
+            
+            # Durations and windowed metrics run on a uniform 1 Hz grid, so smart
+            # recording and pauses are accounted for by timestamp
+            blocks = resample_1hz(activity, GAP_POLICY, channels=['power'])
+            if blocks:
+                sampling = blocks[0].metadata["sampling"]
+            else:
+                sampling = {"native_sample_rate_hz": None, "smart_recording": False,
+                            "elapsed_seconds": total_records, "recorded_seconds": total_records,
+                            "pauses": 0}
+                blocks = [activity]  # No timestamps: records are taken as 1 Hz
             
-            activity_info["data_quality"] = {
+            activity.data_quality = {
                 "total_records": total_records,
                 "power_coverage": power_records / total_records,
                 "speed_coverage": speed_records / total_records,
                 "hr_coverage": hr_records / total_records,
                 "cadence_coverage": cadence_records / total_records,
-                "duration_minutes": total_records / 60,  # Assuming 1Hz recording
+                "duration_minutes": sampling["recorded_seconds"] / 60,
+                "elapsed_minutes": sampling["elapsed_seconds"] / 60,
+                "native_sample_rate_hz": sampling["native_sample_rate_hz"],
+                "smart_recording": sampling["smart_recording"],
+                "pauses": sampling["pauses"],
+                "gap_policy": GAP_POLICY,
                 "has_power": power_records > 0,
                 "has_speed": speed_records > 0,
-                "has_gps": any('position_lat' in r for r in activity_info["records"]),
-                "has_elevation": any('altitude' in r for r in activity_info["records"]),
-                "has_aerosensor": "aerosensor" in activity_info["special_sensors"]
+                "has_gps": activity.has_data('position_lat'),
+                "has_elevation": activity.has_data('altitude'),
+                "has_aerosensor": "aerosensor" in activity.special_sensors
             }
             
             # Calculate basic statistics
             if power_records > 0:
-                powers = [r.get('power', 0) for r in activity_info["records"] if r.get('power', 0) > 0]
-                activity_info["metadata"]["avg_power"] = np.mean(powers)
-                activity_info["metadata"]["max_power"] = np.max(powers)
-                activity_info["metadata"]["normalized_power"] = calculate_normalized_power(powers)
+                power = activity.channels['power']
+                powers = power[activity.masks['power'] & (power > 0)]
+                activity.metadata["avg_power"] = np.mean(powers)
+                activity.metadata["max_power"] = np.max(powers)
+                activity.metadata["normalized_power"] = blocks_normalized_power(blocks)
             
             if speed_records > 0:
-                speeds = [r.get('speed', 0) for r in activity_info["records"] if r.get('speed', 0) > 0]
-                activity_info["metadata"]["avg_speed_ms"] = np.mean(speeds)
-                activity_info["metadata"]["avg_speed_kmh"] = np.mean(speeds) * 3.6
-                activity_info["metadata"]["max_speed_kmh"] = np.max(speeds) * 3.6
+                speed = activity.channels['speed']
+                speeds = speed[activity.masks['speed'] & (speed > 0)]
+                activity.metadata["avg_speed_ms"] = np.mean(speeds)
+                activity.metadata["avg_speed_kmh"] = np.mean(speeds) * 3.6
+                activity.metadata["max_speed_kmh"] = np.max(speeds) * 3.6
         
-        return activity_info
+        return activity
         
     except Exception as e:
         print(f"❌ Error analyzing FIT file: {e}")
@@ -104,162 +141,168 @@ def analyze_fit_file_complete(file_path):
 
 def calculate_normalized_power(powers):
     """Calculate Normalized Power (NP) - 30-second rolling average to 4th power"""
-    if len(powers) < 30:
-        return np.mean(powers)
-    
-    # 30-second rolling average
-    rolling_avg = []
-    for i in range(len(powers) - 29):
-        rolling_avg.append(np.mean(powers[i:i+30]))
-    
-    # Fourth power and then fourth root
-    fourth_power = np.power(rolling_avg, 4)
-    return np.power(np.mean(fourth_power), 0.25)
+    return normalized_power(powers)
 
 def convert_to_lukspeed_format(fit_data):
-    """Convert FIT data to LukSpeed ActivityPoint[] format with all available data"""
+    """Convert a FIT Activity to the LukSpeed ActivityPoint channel layout"""
     print("🔄 Converting to LukSpeed format...")
     
-    activity_points = []
-    base_timestamp = datetime.now()
+    n = len(fit_data)
+    activity = Activity(n)
+    activity.metadata = dict(fit_data.metadata)
+    activity.available_fields = set(fit_data.available_fields)
+    activity.special_sensors = dict(fit_data.special_sensors)
     
-    for i, record in enumerate(fit_data["records"]):
-        # Handle timestamp conversion
-        timestamp = record.get("timestamp")
-        if timestamp:
-            if hasattr(timestamp, 'isoformat'):
-                timestamp_str = timestamp.isoformat()
-            else:
-                timestamp_str = str(timestamp)
-        else:
-            # Create synthetic timestamp
-            synthetic_time = base_timestamp.replace(second=i % 60, minute=(i // 60) % 60)
-            timestamp_str = synthetic_time.isoformat()
-        
-        # Build ActivityPoint with comprehensive data
-        point = {
-            "timestamp": timestamp_str,
-            "power": record.get("power", 0) or 0,
-            "speed": (record.get("speed", 0) or record.get("enhanced_speed", 0) or 0),
-            "distance": record.get("distance", i * 10),  # Approximate if missing
-            "elevation": record.get("altitude", 0) or record.get("enhanced_altitude", 0) or 0,
-            "cadence": record.get("cadence", 0) or 0,
-            "heart_rate": record.get("heart_rate", 0) or 0,
-            "temperature": record.get("temperature", 20) or 20,
-            "grade": 0,  # Will be calculated later
-            
-            # GPS coordinates if available
-            "latitude": record.get("position_lat", 0) or 0,
-            "longitude": record.get("position_long", 0) or 0,
-            
-            # Additional cycling metrics
-            "left_right_balance": record.get("left_right_balance", 50),
-            "left_torque_effectiveness": record.get("left_torque_effectiveness", 0),
-            "right_torque_effectiveness": record.get("right_torque_effectiveness", 0),
-            "left_pedal_smoothness": record.get("left_pedal_smoothness", 0),
-            "right_pedal_smoothness": record.get("right_pedal_smoothness", 0)
-        }
-        
-        # Add CdA data if available from Aerosensor
-        for key in record:
-            if 'cda' in key.lower() or 'aero' in key.lower():
-                point[f"aerosensor_{key}"] = record[key]
-        
-        activity_points.append(point)
+    # Handle timestamp conversion
+    if fit_data.has_data("timestamp"):
+        timestamps = fit_data.channels["timestamp"]
+        ts_mask = fit_data.masks["timestamp"]
+    else:
+        timestamps = np.zeros(n, dtype=np.int64)
+        ts_mask = np.zeros(n, dtype=bool)
+    if not ts_mask.all():
+        # Create synthetic timestamps
+        now = datetime.now()
+        base = to_epoch_seconds(now.replace(second=0, minute=0, microsecond=0))
+        index = np.arange(n, dtype=np.int64)
+        synthetic = base + (index // 60) % 60 * 60 + index % 60
+        timestamps = np.where(ts_mask, timestamps, synthetic)
+    activity.set_channel("timestamp", timestamps)
+    
+    # "value or fallback or 0": zero / missing samples take the enhanced channel
+    speed = fit_data.channel("speed", 0)
+    speed_out = np.where(speed != 0, speed, fit_data.channel("enhanced_speed", 0))
+    altitude = fit_data.channel("altitude", 0)
+    elevation_out = np.where(altitude != 0, altitude, fit_data.channel("enhanced_altitude", 0))
+    # Approximate 10 m per sample where distance is missing
+    distance_out = np.where(fit_data.mask("distance"), fit_data.channel("distance", 0),
+                            np.arange(n) * 10.0)
+    
+    activity.set_channel("power", fit_data.channel("power", 0))
+    activity.set_channel("speed", speed_out)
+    activity.set_channel("distance", distance_out)
+    # ActivityPoint.elevation is numeric: 0 without an altitude source, flagged by has_elevation
+    activity.set_channel("elevation", elevation_out)
+    activity.data_quality = dict(fit_data.data_quality, has_elevation=bool(
+        (fit_data.mask("altitude") | fit_data.mask("enhanced_altitude")).any()))
+    activity.set_channel("cadence", fit_data.channel("cadence", 0))
+    activity.set_channel("heart_rate", fit_data.channel("heart_rate", 0))
+    temperature = fit_data.channel("temperature", 20)
+    activity.set_channel("temperature", np.where(temperature == 0, 20, temperature))
+    activity.set_channel("grade", np.zeros(n))  # Will be calculated later
+    
+    # GPS coordinates if available
+    activity.set_channel("latitude", fit_data.channel("position_lat", 0))
+    activity.set_channel("longitude", fit_data.channel("position_long", 0))
+    
+    # Additional cycling metrics
+    activity.set_channel("left_right_balance", fit_data.channel("left_right_balance", 50))
+    for name in PEDALING_FIELDS[1:5]:
+        activity.set_channel(name, fit_data.channel(name, 0))
+    
+    # Add CdA data if available from Aerosensor; typed developer channels
+    # (aero_cda, aero_wind_speed, ...) keep their names
+    for name in fit_data.channel_names:
+        if name.startswith("aero_"):
+            activity.set_channel(name, fit_data.channels[name], fit_data.masks[name])
+        elif is_aero_field(name):
+            activity.set_channel(f"aerosensor_{name}", fit_data.channels[name], fit_data.masks[name])
     
     # Calculate grade from elevation changes
     print("📐 Calculating grade from elevation data...")
-    for i in range(1, len(activity_points)):
-        prev_point = activity_points[i-1]
-        curr_point = activity_points[i]
-        
-        elevation_change = curr_point["elevation"] - prev_point["elevation"]
-        distance_change = curr_point["distance"] - prev_point["distance"]
-        
-        if distance_change > 0:
-            grade = (elevation_change / distance_change) * 100
-            curr_point["grade"] = max(-25, min(25, grade))  # Limit to realistic grades
+    grade = np.zeros(n)
+    if n > 1:
+        elevation_change = np.diff(elevation_out)
+        distance_change = np.diff(distance_out)
+        moving = distance_change > 0
+        grade[1:][moving] = elevation_change[moving] / distance_change[moving] * 100
+        grade = np.clip(grade, -25, 25)  # Limit to realistic grades
+    activity.set_channel("grade", grade)
     
-    print(f"✅ Converted {len(activity_points)} points to LukSpeed format")
-    return activity_points
+    print(f"✅ Converted {len(activity)} points to LukSpeed format")
+    return activity
 
 def calculate_physical_power_components(activity_data):
     """Calculate physical power components with enhanced CdA detection"""
     print("⚡ Calculating physical power components...")
     
-    # Physical constants
-    AIR_DENSITY = 1.225  # kg/m³ at sea level, 15°C
-    GRAVITY = 9.81       # m/s²
-    RIDER_MASS = 75      # kg (typical)
-    BIKE_MASS = 8        # kg (typical road bike)
-    TOTAL_MASS = RIDER_MASS + BIKE_MASS
-    
     results = {
-        "components": {
-            "power_aero": [],
-            "power_rr": [],
-            "power_gravity": [],
-            "power_total_measured": [],
-            "cda_values": [],
-            "speeds": [],
-            "grades": []
-        },
+        "components": {},
         "estimates": {},
         "validation": {},
         "aerosensor_data": []
     }
     
-    # Process each data point
-    valid_power_points = 0
-    cda_from_sensor = None
+    n = len(activity_data)
+    powers = activity_data.channel("power", 0)
+    speeds = activity_data.channel("speed", 0)
+    grades = activity_data.channel("grade", 0) / 100  # Convert % to decimal
+    densities = density_channel(activity_data)  # From temperature + altitude
     
-    for point in activity_data:
-        power = point.get("power", 0)
-        speed = point.get("speed", 0)
-        grade = point.get("grade", 0) / 100  # Convert % to decimal
-        
-        # Check for CdA from Aerosensor
-        for key, value in point.items():
-            if 'cda' in key.lower() and value and value > 0:
-                cda_from_sensor = value
-                results["aerosensor_data"].append({
-                    "timestamp": point.get("timestamp"),
-                    "cda": value,
-                    "speed": speed,
-                    "power": power
-                })
-        
-        if power > 0 and speed > 0:
-            valid_power_points += 1
-            
-            # Use CdA from sensor if available, otherwise estimate
-            if cda_from_sensor:
-                CdA = cda_from_sensor
-            else:
-                CdA = 0.3  # Default estimate
-            
-            # Calculate power components
-            speed_ms = speed if speed < 50 else speed / 3.6  # Handle unit conversion
-            
-            # 1. Aerodynamic power: P_aero = 0.5 * ρ * CdA * v³
-            power_aero = 0.5 * AIR_DENSITY * CdA * (speed_ms ** 3)
-            
-            # 2. Rolling resistance: P_rr = Crr * m * g * v * cos(θ)
-            Crr = 0.005  # Typical road tire
-            power_rr = Crr * TOTAL_MASS * GRAVITY * speed_ms * np.cos(np.arctan(grade))
-            
-            # 3. Gravitational power: P_gravity = m * g * v * sin(θ)
-            power_gravity = TOTAL_MASS * GRAVITY * speed_ms * np.sin(np.arctan(grade))
-            
-            # Store results
-            results["components"]["power_aero"].append(power_aero)
-            results["components"]["power_rr"].append(power_rr)
-            results["components"]["power_gravity"].append(power_gravity)
-            results["components"]["power_total_measured"].append(power)
-            results["components"]["cda_values"].append(CdA)
-            results["components"]["speeds"].append(speed_ms)
-            results["components"]["grades"].append(grade * 100)
+    # CdA from Aerosensor: the latest positive reading of any CdA channel
+    # (later channels win on the same record), held until the next one
+    sensor_cda = np.full(n, np.nan)
+    readings = []
+    for position, name in enumerate(activity_data.channel_names):
+        if classify_field('record', name) != CDA:
+            continue
+        values = activity_data.channel(name, 0).astype(np.float64)
+        positive = values > 0
+        sensor_cda = np.where(positive, values, sensor_cda)
+        readings.append((np.flatnonzero(positive), position, values[positive]))
+    sensor_cda = forward_fill(sensor_cda, ~np.isnan(sensor_cda))
+    
+    if readings:
+        rows = np.concatenate([r[0] for r in readings])
+        channel_order = np.concatenate([np.full(len(r[0]), r[1]) for r in readings])
+        values = np.concatenate([r[2] for r in readings])
+        order = np.lexsort((channel_order, rows))
+        rows, values = rows[order], values[order]
+        timestamps = epoch_to_iso(activity_data.channel("timestamp", 0)[rows]).tolist()
+        results["aerosensor_data"] = [
+            {"timestamp": timestamp, "cda": cda, "speed": speed, "power": power}
+            for timestamp, cda, speed, power in zip(
+                timestamps, values.tolist(), speeds[rows].tolist(), powers[rows].tolist())
+        ]
+    
+    # Use CdA from sensor if available, otherwise the default estimate
+    valid = (powers > 0) & (speeds > 0)
+    cda = np.where(np.isnan(sensor_cda), DEFAULT_CDA, sensor_cda)[valid]
+    all_speeds_ms = speed_to_ms(speeds)  # Handle unit conversion
+    # Smoothed dv/dt over the whole ride (stopped samples included) for the inertial term
+    accel = acceleration(all_speeds_ms, activity_data.channel("timestamp", 0))
+    speeds_ms = all_speeds_ms[valid]
+    components = power_components(speeds_ms, grades[valid], cda, DEFAULT_CRR,
+                                  air_density=densities[valid], accel=accel[valid],
+                                  wheel_inertia=WHEEL_INERTIA)
+    
+    # Store the components as channels of the activity itself
+    def scatter(values):
+        full = np.zeros(n)
+        full[valid] = values
+        return full
+    
+    for name in COMPONENTS:
+        activity_data.set_channel(name, scatter(components[name]), valid)
+    activity_data.set_channel("cda", scatter(cda), valid)
+    activity_data.set_channel("speed_ms", scatter(speeds_ms), valid)
+    activity_data.set_channel("acceleration", accel)
+    
+    results["components"] = {
+        "power_aero": activity_data.channels["power_aero"][valid],
+        "power_rr": activity_data.channels["power_rr"][valid],
+        "power_gravity": activity_data.channels["power_gravity"][valid],
+        "power_kinetic": activity_data.channels["power_kinetic"][valid],
+        "power_total_measured": activity_data.channels["power"][valid],
+        "cda_values": activity_data.channels["cda"][valid],
+        "speeds": activity_data.channels["speed_ms"][valid],
+        "grades": activity_data.channels["grade"][valid],
+        "air_density": densities[valid],
+        "acceleration": accel[valid]
+    }
     
+    cda_from_sensor = float(sensor_cda[-1]) if n and not np.isnan(sensor_cda[-1]) else None
+    valid_power_points = int(np.count_nonzero(valid))
     print(f"✅ Processed {valid_power_points} valid power points")
     
     # Calculate estimates and validation
@@ -268,43 +311,36 @@ def calculate_physical_power_components(activity_data):
         avg_power_aero = np.mean(results["components"]["power_aero"])
         avg_power_rr = np.mean(results["components"]["power_rr"])
         avg_power_gravity = np.mean(results["components"]["power_gravity"])
+        avg_power_kinetic = np.mean(results["components"]["power_kinetic"])
         avg_power_total = np.mean(results["components"]["power_total_measured"])
         
         results["estimates"] = {
             "avg_power_aero_watts": avg_power_aero,
             "avg_power_rr_watts": avg_power_rr,
             "avg_power_gravity_watts": avg_power_gravity,
+            "avg_power_kinetic_watts": avg_power_kinetic,
             "avg_power_total_watts": avg_power_total,
             "aero_percentage": (avg_power_aero / avg_power_total * 100) if avg_power_total > 0 else 0,
             "rr_percentage": (avg_power_rr / avg_power_total * 100) if avg_power_total > 0 else 0,
             "gravity_percentage": (avg_power_gravity / avg_power_total * 100) if avg_power_total > 0 else 0,
+            "kinetic_percentage": (avg_power_kinetic / avg_power_total * 100) if avg_power_total > 0 else 0,
             "cda_sensor_available": cda_from_sensor is not None,
-            "cda_used": cda_from_sensor if cda_from_sensor else 0.3,
+            "cda_used": cda_from_sensor if cda_from_sensor else DEFAULT_CDA,
+            "avg_air_density": float(np.mean(results["components"]["air_density"])),
             "aerosensor_points": len(results["aerosensor_data"])
         }
         
         # Validation: compare calculated vs measured power
-        calculated_total = np.array(results["components"]["power_aero"]) + \
-                          np.array(results["components"]["power_rr"]) + \
-                          np.array(results["components"]["power_gravity"])
-        
-        measured_total = np.array(results["components"]["power_total_measured"])
-        errors = np.abs(calculated_total - measured_total)
-        
-        results["validation"] = {
-            "mean_absolute_error_watts": np.mean(errors),
-            "max_error_watts": np.max(errors),
-            "rmse_watts": np.sqrt(np.mean(errors**2)),
-            "points_within_5w": np.sum(errors < 5) / len(errors) * 100,
-            "points_within_10w": np.sum(errors < 10) / len(errors) * 100,
-            "points_within_20w": np.sum(errors < 20) / len(errors) * 100,
-            "correlation_coefficient": np.corrcoef(calculated_total, measured_total)[0,1]
-        }
+        calculated_total = total_power({name: results["components"][name] for name in COMPONENTS})
+        results["validation"] = validation_stats(calculated_total,
+                                                 results["components"]["power_total_measured"])
         
         print(f"🎯 Average Power Breakdown:")
         print(f"   - Aerodynamic: {avg_power_aero:.1f}W ({results['estimates']['aero_percentage']:.1f}%)")
         print(f"   - Rolling Resistance: {avg_power_rr:.1f}W ({results['estimates']['rr_percentage']:.1f}%)")
         print(f"   - Gravity: {avg_power_gravity:.1f}W ({results['estimates']['gravity_percentage']:.1f}%)")
+        print(f"   - Kinetic: {avg_power_kinetic:.1f}W ({results['estimates']['kinetic_percentage']:.1f}%)")
+        print(f"   - Air density: {results['estimates']['avg_air_density']:.3f} kg/m³")
         print(f"🔍 Validation Results:")
         print(f"   - Mean Absolute Error: {results['validation']['mean_absolute_error_watts']:.1f}W")
         print(f"   - Points within ±10W: {results['validation']['points_within_10w']:.1f}%")
@@ -315,6 +351,56 @@ def calculate_physical_power_components(activity_data):
     
     return results
 
+PHYSICS_CHANNELS = ["power_aero", "power_rr", "power_gravity", "power_kinetic", "cda", "speed_ms",
+                    "air_density", "acceleration"]
+
+
+def open_parse_cache(root=None):
+    """Parse cache for the current decoder + metrics code version"""
+    return FitCache(root, version=f"{DECODER_VERSION}.{METRICS_VERSION}")
+
+
+def analyze_fit_file_cached(file_path, cache):
+    """analyze_fit_file_complete, served from the parse cache on repeat runs"""
+    digest = file_digest(file_path)
+    entry = cache.load(digest, "analysis")
+    if entry is not None:
+        print(f"⚡ Parse cache hit: {file_path}")
+        activity = arrays_to_activity(*entry)
+    else:
+        activity = analyze_fit_file_complete(file_path)
+        if activity is None:
+            return None
+        cache.store(digest, "analysis", *activity_to_arrays(activity))
+    activity.metadata["source_sha256"] = digest
+    return activity
+
+
+def calculate_physical_power_components_cached(activity_data, digest, cache):
+    """calculate_physical_power_components, served from the parse cache on repeat runs"""
+    entry = cache.load(digest, "physics")
+    if entry is None:
+        results = calculate_physical_power_components(activity_data)
+        arrays = {}
+        for name in PHYSICS_CHANNELS:
+            arrays[name] = activity_data.channels[name]
+            arrays[f"{name}__mask"] = activity_data.masks[name]
+        for name, values in results["components"].items():
+            arrays[f"components__{name}"] = values
+        header = {key: results[key] for key in ("estimates", "validation", "aerosensor_data")}
+        cache.store(digest, "physics", arrays, header)
+        return results
+
+    print("⚡ Physics cache hit")
+    arrays, header = entry
+    for name in PHYSICS_CHANNELS:
+        activity_data.set_channel(name, arrays[name], arrays[f"{name}__mask"])
+    return {
+        "components": {name[len("components__"):]: values
+                       for name, values in arrays.items() if name.startswith("components__")},
+        **header
+    }
+
 def generate_comprehensive_report(fit_analysis, lukspeed_data, physical_results):
     """Generate comprehensive validation report"""
     
@@ -339,29 +425,29 @@ def generate_comprehensive_report(fit_analysis, lukspeed_data, physical_results)
 ## 🔍 CARACTERÍSTICAS DEL DATASET REAL
 
 ### Información General
-- **Duración total:** {fit_analysis['data_quality']['duration_minutes']:.1f} minutos
-- **Puntos de datos:** {fit_analysis['data_quality']['total_records']:,} registros
-- **Frecuencia de muestreo:** ~{60/fit_analysis['data_quality']['duration_minutes']*fit_analysis['data_quality']['total_records']:.1f} Hz
+- **Duración total:** {fit_analysis.data_quality['duration_minutes']:.1f} minutos
+- **Puntos de datos:** {fit_analysis.data_quality['total_records']:,} registros
+- **Frecuencia de muestreo:** ~{60/fit_analysis.data_quality['duration_minutes']*fit_analysis.data_quality['total_records']:.1f} Hz
 
 ### Cobertura de Datos
-- **Potencia:** {fit_analysis['data_quality']['power_coverage']:.1%} ({fit_analysis['data_quality']['power_coverage']*fit_analysis['data_quality']['total_records']:.0f} puntos)
-- **Velocidad:** {fit_analysis['data_quality']['speed_coverage']:.1%} ({fit_analysis['data_quality']['speed_coverage']*fit_analysis['data_quality']['total_records']:.0f} puntos)
-- **Frecuencia cardíaca:** {fit_analysis['data_quality']['hr_coverage']:.1%} ({fit_analysis['data_quality']['hr_coverage']*fit_analysis['data_quality']['total_records']:.0f} puntos)
-- **Cadencia:** {fit_analysis['data_quality']['cadence_coverage']:.1%} ({fit_analysis['data_quality']['cadence_coverage']*fit_analysis['data_quality']['total_records']:.0f} puntos)
-- **GPS/Elevación:** {'✅' if fit_analysis['data_quality']['has_gps'] else '❌'} GPS | {'✅' if fit_analysis['data_quality']['has_elevation'] else '❌'} Elevación
+- **Potencia:** {fit_analysis.data_quality['power_coverage']:.1%} ({fit_analysis.data_quality['power_coverage']*fit_analysis.data_quality['total_records']:.0f} puntos)
+- **Velocidad:** {fit_analysis.data_quality['speed_coverage']:.1%} ({fit_analysis.data_quality['speed_coverage']*fit_analysis.data_quality['total_records']:.0f} puntos)
+- **Frecuencia cardíaca:** {fit_analysis.data_quality['hr_coverage']:.1%} ({fit_analysis.data_quality['hr_coverage']*fit_analysis.data_quality['total_records']:.0f} puntos)
+- **Cadencia:** {fit_analysis.data_quality['cadence_coverage']:.1%} ({fit_analysis.data_quality['cadence_coverage']*fit_analysis.data_quality['total_records']:.0f} puntos)
+- **GPS/Elevación:** {'✅' if fit_analysis.data_quality['has_gps'] else '❌'} GPS | {'✅' if fit_analysis.data_quality['has_elevation'] else '❌'} Elevación
 
 ### Sensores Especializados
-- **Aerosensor (CdA):** {'✅ DETECTADO' if fit_analysis['data_quality']['has_aerosensor'] else '❌ No disponible'}
+- **Aerosensor (CdA):** {'✅ DETECTADO' if fit_analysis.data_quality['has_aerosensor'] else '❌ No disponible'}
 """
 
-    if 'avg_power' in fit_analysis['metadata']:
+    if 'avg_power' in fit_analysis.metadata:
         report += f"""
 ### Métricas de Rendimiento
-- **Potencia promedio:** {fit_analysis['metadata']['avg_power']:.0f}W
-- **Potencia máxima:** {fit_analysis['metadata']['max_power']:.0f}W  
-- **Potencia normalizada:** {fit_analysis['metadata']['normalized_power']:.0f}W
-- **Velocidad promedio:** {fit_analysis['metadata']['avg_speed_kmh']:.1f} km/h
-- **Velocidad máxima:** {fit_analysis['metadata']['max_speed_kmh']:.1f} km/h
+- **Potencia promedio:** {fit_analysis.metadata['avg_power']:.0f}W
+- **Potencia máxima:** {fit_analysis.metadata['max_power']:.0f}W  
+- **Potencia normalizada:** {fit_analysis.metadata['normalized_power']:.0f}W
+- **Velocidad promedio:** {fit_analysis.metadata['avg_speed_kmh']:.1f} km/h
+- **Velocidad máxima:** {fit_analysis.metadata['max_speed_kmh']:.1f} km/h
 """
 
     if physical_results['estimates']:
@@ -374,11 +460,13 @@ def generate_comprehensive_report(fit_analysis, lukspeed_data, physical_results)
 - **Potencia Aerodinámica:** {physical_results['estimates']['avg_power_aero_watts']:.1f}W ({physical_results['estimates']['aero_percentage']:.1f}% del total)
 - **Resistencia al Rodamiento:** {physical_results['estimates']['avg_power_rr_watts']:.1f}W ({physical_results['estimates']['rr_percentage']:.1f}% del total)
 - **Potencia Gravitacional:** {physical_results['estimates']['avg_power_gravity_watts']:.1f}W ({physical_results['estimates']['gravity_percentage']:.1f}% del total)
+- **Potencia Cinética (aceleraciones):** {physical_results['estimates']['avg_power_kinetic_watts']:.1f}W ({physical_results['estimates']['kinetic_percentage']:.1f}% del total)
 
 ### Parámetros Aerodinámicos
 - **CdA Utilizado:** {physical_results['estimates']['cda_used']:.4f} m²
 - **Fuente CdA:** {'Aerosensor' if physical_results['estimates']['cda_sensor_available'] else 'Estimación por defecto'}
 - **Puntos con Aerosensor:** {physical_results['estimates']['aerosensor_points']} registros
+- **Densidad del Aire Media:** {physical_results['estimates']['avg_air_density']:.3f} kg/m³ (temperatura + altitud)
 
 ### Validación Científica de Cálculos
 - **Error Medio Absoluto:** {physical_results['validation']['mean_absolute_error_watts']:.1f}W
@@ -428,7 +516,7 @@ def generate_comprehensive_report(fit_analysis, lukspeed_data, physical_results)
 |---------|----------|---------------|------|----------------|
 | Precisión CdA | ±{mae/100:.3f} m² | ±0.020 m² | ±0.018 m² | ±0.025 m² |
 | Tiempo procesamiento | <2s | ~5-8s | ~3-5s | ~4-6s |
-| Cobertura datos | {fit_analysis['data_quality']['power_coverage']:.1%} | Variable | Variable | Variable |
+| Cobertura datos | {fit_analysis.data_quality['power_coverage']:.1%} | Variable | Variable | Variable |
 | Aerosensor support | {'✅' if physical_results['estimates']['cda_sensor_available'] else '⚠️'} | ❌ | ⚠️ | ❌ |
 
 ---
@@ -476,11 +564,11 @@ def generate_comprehensive_report(fit_analysis, lukspeed_data, physical_results)
 ## 📈 DATOS TÉCNICOS DETALLADOS
 
 ### Campos Disponibles en FIT
-{', '.join(sorted(list(fit_analysis['available_fields'])))}
+{', '.join(sorted(list(fit_analysis.available_fields)))}
 
 ### Estadísticas de Procesamiento
 - **Puntos válidos procesados:** {len(physical_results['components']['power_aero']):,}
-- **Tasa de éxito:** {len(physical_results['components']['power_aero'])/fit_analysis['data_quality']['total_records']*100:.1f}%
+- **Tasa de éxito:** {len(physical_results['components']['power_aero'])/fit_analysis.data_quality['total_records']*100:.1f}%
 - **Tiempo de procesamiento:** <2 segundos
 - **Memoria utilizada:** <50MB
 
@@ -498,12 +586,13 @@ def main():
     print("=" * 60)
     
     fit_file_path = "/workspace/shadcn-ui/test_activity.fit"
+    cache = open_parse_cache()
     
     # Step 1: Analyze FIT file
     print("\n📁 PASO 1: ANÁLISIS COMPLETO DEL ARCHIVO FIT")
-    fit_analysis = analyze_fit_file_complete(fit_file_path)
+    fit_analysis = analyze_fit_file_cached(fit_file_path, cache)
     
-    if not fit_analysis:
+    if fit_analysis is None:
         print("❌ Error: No se pudo procesar el archivo FIT")
         return
     
@@ -511,18 +600,20 @@ def main():
     print("\n🔄 PASO 2: CONVERSIÓN A FORMATO LUKSPEED")
     lukspeed_data = convert_to_lukspeed_format(fit_analysis)
     
-    # Save converted data
-    with open("/workspace/shadcn-ui/test_real_activity.json", "w") as f:
-        json.dump(lukspeed_data, f, indent=2, default=str)
-    print("✅ Datos guardados en test_real_activity.json")
+    # Save converted data: columnar file, plus the ActivityPoint JSON view
+    save_activity("/workspace/shadcn-ui/test_real_activity.npz", lukspeed_data)
+    print("✅ Datos guardados en test_real_activity.npz")
+    write_points_json("/workspace/shadcn-ui/test_real_activity.json", lukspeed_data)
+    print("✅ Vista JSON guardada en test_real_activity.json")
     
     # Step 3: Physical power analysis
     print("\n⚡ PASO 3: ANÁLISIS FÍSICO DE COMPONENTES DE POTENCIA")
-    physical_results = calculate_physical_power_components(lukspeed_data)
+    physical_results = calculate_physical_power_components_cached(
+        lukspeed_data, fit_analysis.metadata["source_sha256"], cache)
     
     # Save physical analysis results
     with open("/workspace/shadcn-ui/physical_analysis_results.json", "w") as f:
-        json.dump(physical_results, f, indent=2, default=str)
+        json.dump(physical_results, f, indent=2, default=json_default)
     print("✅ Resultados físicos guardados en physical_analysis_results.json")
     
     # Step 4: Generate comprehensive report
@@ -537,7 +628,8 @@ def main():
     print("\n🎉 ANÁLISIS COMPLETADO EXITOSAMENTE")
     print("=" * 60)
     print("✅ Archivos generados:")
-    print("   - test_real_activity.json (datos convertidos)")
+    print("   - test_real_activity.npz (datos convertidos, columnar)")
+    print("   - test_real_activity.json (datos convertidos, vista JSON)")
     print("   - physical_analysis_results.json (resultados físicos)")
     print("   - LUKSPEED_VALIDATION_REPORT.md (reporte completo)")
     print("\n🚀 LukSpeed sistema validado y listo para producción!")
@@ -3,338 +3,16 @@
 Simple FIT File Analyzer for LukSpeed Validation - No pandas dependency
 """
 
-import fitparse
 import json
-import numpy as np
 from datetime import datetime
-import sys
-import os
 
-def analyze_fit_file_complete(file_path):
-    """Complete analysis of FIT file including all available data fields"""
-    print(f"🔍 Analyzing FIT file: {file_path}")
-    
-    try:
-        fitfile = fitparse.FitFile(file_path)
-        
-        # Initialize data structures
-        activity_info = {
-            "records": [],
-            "metadata": {},
-            "data_quality": {},
-            "available_fields": set(),
-            "special_sensors": {}
-        }
-        
-        # Process all record messages to discover available fields
-        record_count = 0
-        for record in fitfile.get_messages('record'):
-            point = {}
-            for data in record:
-                activity_info["available_fields"].add(data.name)
-                
-                # Extract all relevant cycling data
-                if data.name in ['timestamp', 'power', 'speed', 'distance', 'altitude', 
-                               'cadence', 'heart_rate', 'temperature', 'position_lat', 
-                               'position_long', 'enhanced_speed', 'enhanced_altitude',
-                               'grade', 'resistance', 'time_from_course']:
-                    point[data.name] = data.value
-                
-                # Look for CdA and other aerodynamic data
-                elif 'cda' in data.name.lower() or 'aero' in data.name.lower():
-                    point[data.name] = data.value
-                    activity_info["special_sensors"]["aerosensor"] = True
-                    print(f"🎯 Found aerodynamic data: {data.name} = {data.value}")
-                
-                # Look for other specialized sensor data
-                elif data.name in ['left_right_balance', 'left_torque_effectiveness',
-                                 'right_torque_effectiveness', 'left_pedal_smoothness',
-                                 'right_pedal_smoothness', 'combined_pedal_smoothness']:
-                    point[data.name] = data.value
-            
-            if point:
-                activity_info["records"].append(point)
-                record_count += 1
-        
-        print(f"✅ Processed {record_count} data points")
-        print(f"📊 Available fields: {sorted(list(activity_info['available_fields']))}")
-        
-        # Calculate data quality metrics
-        total_records = len(activity_info["records"])
-        if total_records > 0:
-            power_records = len([r for r in activity_info["records"] if 'power' in r and r.get('power', 0) > 0])
-            speed_records = len([r for r in activity_info["records"] if 'speed' in r and r.get('speed', 0) > 0])
-            hr_records = len([r for r in activity_info["records"] if 'heart_rate' in r and r.get('heart_rate', 0) > 0])
-            cadence_records = len([r for r in activity_info["records"] if 'cadence' in r and r.get('cadence', 0) > 0])
-            
-            activity_info["data_quality"] = {
-                "total_records": total_records,
-                "power_coverage": power_records / total_records,
-                "speed_coverage": speed_records / total_records,
-                "hr_coverage": hr_records / total_records,
-                "cadence_coverage": cadence_records / total_records,
-                "duration_minutes": total_records / 60,  # Assuming 1Hz recording
-                "has_power": power_records > 0,
-                "has_speed": speed_records > 0,
-                "has_gps": any('position_lat' in r for r in activity_info["records"]),
-                "has_elevation": any('altitude' in r for r in activity_info["records"]),
-                "has_aerosensor": "aerosensor" in activity_info["special_sensors"]
-            }
-            
-            # Calculate basic statistics
-            if power_records > 0:
-                powers = [r.get('power', 0) for r in activity_info["records"] if r.get('power', 0) > 0]
-                activity_info["metadata"]["avg_power"] = sum(powers) / len(powers)
-                activity_info["metadata"]["max_power"] = max(powers)
-                activity_info["metadata"]["normalized_power"] = calculate_normalized_power(powers)
-            
-            if speed_records > 0:
-                speeds = [r.get('speed', 0) for r in activity_info["records"] if r.get('speed', 0) > 0]
-                activity_info["metadata"]["avg_speed_ms"] = sum(speeds) / len(speeds)
-                activity_info["metadata"]["avg_speed_kmh"] = sum(speeds) / len(speeds) * 3.6
-                activity_info["metadata"]["max_speed_kmh"] = max(speeds) * 3.6
-        
-        return activity_info
-        
-    except Exception as e:
-        print(f"❌ Error analyzing FIT file: {e}")
-        return None
-
-def calculate_normalized_power(powers):
-    """Calculate Normalized Power (NP) - 30-second rolling average to 4th power"""
-    if len(powers) < 30:
-        return sum(powers) / len(powers)
-    
-    # 30-second rolling average
-    rolling_avg = []
-    for i in range(len(powers) - 29):
-        rolling_avg.append(sum(powers[i:i+30]) / 30)
-    
-    # Fourth power and then fourth root
-    fourth_power = [p**4 for p in rolling_avg]
-    return (sum(fourth_power) / len(fourth_power)) ** 0.25
-
-def convert_to_lukspeed_format(fit_data):
-    """Convert FIT data to LukSpeed ActivityPoint[] format with all available data"""
-    print("🔄 Converting to LukSpeed format...")
-    
-    activity_points = []
-    base_timestamp = datetime.now()
-    
-    for i, record in enumerate(fit_data["records"]):
-        # Handle timestamp conversion
-        timestamp = record.get("timestamp")
-        if timestamp:
-            if hasattr(timestamp, 'isoformat'):
-                timestamp_str = timestamp.isoformat()
-            else:
-                timestamp_str = str(timestamp)
-        else:
-            # Create synthetic timestamp
-            synthetic_time = base_timestamp.replace(second=i % 60, minute=(i // 60) % 60)
-            timestamp_str = synthetic_time.isoformat()
-        
-        # Build ActivityPoint with comprehensive data
-        point = {
-            "timestamp": timestamp_str,
-            "power": record.get("power", 0) or 0,
-            "speed": (record.get("speed", 0) or record.get("enhanced_speed", 0) or 0),
-            "distance": record.get("distance", i * 10),  # Approximate if missing
-            "elevation": record.get("altitude", 0) or record.get("enhanced_altitude", 0) or 0,
-            "cadence": record.get("cadence", 0) or 0,
-            "heart_rate": record.get("heart_rate", 0) or 0,
-            "temperature": record.get("temperature", 20) or 20,
-            "grade": 0,  # Will be calculated later
-            
-            # GPS coordinates if available
-            "latitude": record.get("position_lat", 0) or 0,
-            "longitude": record.get("position_long", 0) or 0,
-            
-            # Additional cycling metrics
-            "left_right_balance": record.get("left_right_balance", 50),
-            "left_torque_effectiveness": record.get("left_torque_effectiveness", 0),
-            "right_torque_effectiveness": record.get("right_torque_effectiveness", 0),
-            "left_pedal_smoothness": record.get("left_pedal_smoothness", 0),
-            "right_pedal_smoothness": record.get("right_pedal_smoothness", 0)
-        }
-        
-        # Add CdA data if available from Aerosensor
-        for key in record:
-            if 'cda' in key.lower() or 'aero' in key.lower():
-                point[f"aerosensor_{key}"] = record[key]
-        
-        activity_points.append(point)
-    
-    # Calculate grade from elevation changes
-    print("📐 Calculating grade from elevation data...")
-    for i in range(1, len(activity_points)):
-        prev_point = activity_points[i-1]
-        curr_point = activity_points[i]
-        
-        elevation_change = curr_point["elevation"] - prev_point["elevation"]
-        distance_change = curr_point["distance"] - prev_point["distance"]
-        
-        if distance_change > 0:
-            grade = (elevation_change / distance_change) * 100
-            curr_point["grade"] = max(-25, min(25, grade))  # Limit to realistic grades
-    
-    print(f"✅ Converted {len(activity_points)} points to LukSpeed format")
-    return activity_points
-
-def calculate_physical_power_components(activity_data):
-    """Calculate physical power components with enhanced CdA detection"""
-    print("⚡ Calculating physical power components...")
-    
-    # Physical constants
-    AIR_DENSITY = 1.225  # kg/m³ at sea level, 15°C
-    GRAVITY = 9.81       # m/s²
-    RIDER_MASS = 75      # kg (typical)
-    BIKE_MASS = 8        # kg (typical road bike)
-    TOTAL_MASS = RIDER_MASS + BIKE_MASS
-    
-    results = {
-        "components": {
-            "power_aero": [],
-            "power_rr": [],
-            "power_gravity": [],
-            "power_total_measured": [],
-            "cda_values": [],
-            "speeds": [],
-            "grades": []
-        },
-        "estimates": {},
-        "validation": {},
-        "aerosensor_data": []
-    }
-    
-    # Process each data point
-    valid_power_points = 0
-    cda_from_sensor = None
-    
-    for point in activity_data:
-        power = point.get("power", 0)
-        speed = point.get("speed", 0)
-        grade = point.get("grade", 0) / 100  # Convert % to decimal
-        
-        # Check for CdA from Aerosensor
-        for key, value in point.items():
-            if 'cda' in key.lower() and value and value > 0:
-                cda_from_sensor = value
-                results["aerosensor_data"].append({
-                    "timestamp": point.get("timestamp"),
-                    "cda": value,
-                    "speed": speed,
-                    "power": power
-                })
-        
-        if power > 0 and speed > 0:
-            valid_power_points += 1
-            
-            # Use CdA from sensor if available, otherwise estimate
-            if cda_from_sensor:
-                CdA = cda_from_sensor
-            else:
-                CdA = 0.3  # Default estimate
-            
-            # Calculate power components
-            speed_ms = speed if speed < 50 else speed / 3.6  # Handle unit conversion
-            
-            # 1. Aerodynamic power: P_aero = 0.5 * ρ * CdA * v³
-            power_aero = 0.5 * AIR_DENSITY * CdA * (speed_ms ** 3)
-            
-            # 2. Rolling resistance: P_rr = Crr * m * g * v * cos(θ)
-            Crr = 0.005  # Typical road tire
-            power_rr = Crr * TOTAL_MASS * GRAVITY * speed_ms * np.cos(np.arctan(grade))
-            
-            # 3. Gravitational power: P_gravity = m * g * v * sin(θ)
-            power_gravity = TOTAL_MASS * GRAVITY * speed_ms * np.sin(np.arctan(grade))
-            
-            # Store results
-            results["components"]["power_aero"].append(power_aero)
-            results["components"]["power_rr"].append(power_rr)
-            results["components"]["power_gravity"].append(power_gravity)
-            results["components"]["power_total_measured"].append(power)
-            results["components"]["cda_values"].append(CdA)
-            results["components"]["speeds"].append(speed_ms)
-            results["components"]["grades"].append(grade * 100)
-    
-    print(f"✅ Processed {valid_power_points} valid power points")
-    
-    # Calculate estimates and validation
-    if len(results["components"]["power_aero"]) > 0:
-        # Power statistics
-        power_aero_array = results["components"]["power_aero"]
-        power_rr_array = results["components"]["power_rr"]
-        power_gravity_array = results["components"]["power_gravity"]
-        power_total_array = results["components"]["power_total_measured"]
-        
-        avg_power_aero = sum(power_aero_array) / len(power_aero_array)
-        avg_power_rr = sum(power_rr_array) / len(power_rr_array)
-        avg_power_gravity = sum(power_gravity_array) / len(power_gravity_array)
-        avg_power_total = sum(power_total_array) / len(power_total_array)
-        
-        results["estimates"] = {
-            "avg_power_aero_watts": avg_power_aero,
-            "avg_power_rr_watts": avg_power_rr,
-            "avg_power_gravity_watts": avg_power_gravity,
-            "avg_power_total_watts": avg_power_total,
-            "aero_percentage": (avg_power_aero / avg_power_total * 100) if avg_power_total > 0 else 0,
-            "rr_percentage": (avg_power_rr / avg_power_total * 100) if avg_power_total > 0 else 0,
-            "gravity_percentage": (avg_power_gravity / avg_power_total * 100) if avg_power_total > 0 else 0,
-            "cda_sensor_available": cda_from_sensor is not None,
-            "cda_used": cda_from_sensor if cda_from_sensor else 0.3,
-            "aerosensor_points": len(results["aerosensor_data"])
-        }
-        
-        # Validation: compare calculated vs measured power
-        calculated_total = [results["components"]["power_aero"][i] + 
-                          results["components"]["power_rr"][i] + 
-                          results["components"]["power_gravity"][i] 
-                          for i in range(len(results["components"]["power_aero"]))]
-        
-        measured_total = results["components"]["power_total_measured"]
-        errors = [abs(calculated_total[i] - measured_total[i]) for i in range(len(calculated_total))]
-        
-        results["validation"] = {
-            "mean_absolute_error_watts": sum(errors) / len(errors),
-            "max_error_watts": max(errors),
-            "rmse_watts": (sum([e**2 for e in errors]) / len(errors)) ** 0.5,
-            "points_within_5w": sum([1 for e in errors if e < 5]) / len(errors) * 100,
-            "points_within_10w": sum([1 for e in errors if e < 10]) / len(errors) * 100,
-            "points_within_20w": sum([1 for e in errors if e < 20]) / len(errors) * 100,
-        }
-        
-        # Calculate correlation coefficient manually
-        if len(calculated_total) > 1:
-            mean_calc = sum(calculated_total) / len(calculated_total)
-            mean_meas = sum(measured_total) / len(measured_total)
-            
-            numerator = sum([(calculated_total[i] - mean_calc) * (measured_total[i] - mean_meas) 
-                           for i in range(len(calculated_total))])
-            
-            sum_sq_calc = sum([(calculated_total[i] - mean_calc)**2 for i in range(len(calculated_total))])
-            sum_sq_meas = sum([(measured_total[i] - mean_meas)**2 for i in range(len(measured_total))])
-            
-            denominator = (sum_sq_calc * sum_sq_meas) ** 0.5
-            correlation = numerator / denominator if denominator > 0 else 0
-            
-            results["validation"]["correlation_coefficient"] = correlation
-        else:
-            results["validation"]["correlation_coefficient"] = 0
-        
-        print(f"🎯 Average Power Breakdown:")
-        print(f"   - Aerodynamic: {avg_power_aero:.1f}W ({results['estimates']['aero_percentage']:.1f}%)")
-        print(f"   - Rolling Resistance: {avg_power_rr:.1f}W ({results['estimates']['rr_percentage']:.1f}%)")
-        print(f"   - Gravity: {avg_power_gravity:.1f}W ({results['estimates']['gravity_percentage']:.1f}%)")
-        print(f"🔍 Validation Results:")
-        print(f"   - Mean Absolute Error: {results['validation']['mean_absolute_error_watts']:.1f}W")
-        print(f"   - Points within ±10W: {results['validation']['points_within_10w']:.1f}%")
-        print(f"   - Correlation: {results['validation']['correlation_coefficient']:.3f}")
-        
-        if cda_from_sensor:
-            print(f"🎯 CdA from Aerosensor: {cda_from_sensor:.4f} m² ({len(results['aerosensor_data'])} points)")
-    
-    return results
+from activity_store import write_points_json
+from fit_activity import json_default
+from fit_analyzer import (
+    analyze_fit_file_complete,
+    convert_to_lukspeed_format,
+    calculate_physical_power_components,
+)
 
 def generate_comprehensive_report(fit_analysis, lukspeed_data, physical_results):
     """Generate comprehensive validation report"""
@@ -360,29 +38,29 @@ def generate_comprehensive_report(fit_analysis, lukspeed_data, physical_results)
 ## 🔍 CARACTERÍSTICAS DEL DATASET REAL
 
 ### Información General
-- **Duración total:** {fit_analysis['data_quality']['duration_minutes']:.1f} minutos
-- **Puntos de datos:** {fit_analysis['data_quality']['total_records']:,} registros
-- **Frecuencia de muestreo:** ~{60/fit_analysis['data_quality']['duration_minutes']*fit_analysis['data_quality']['total_records']:.1f} Hz
+- **Duración total:** {fit_analysis.data_quality['duration_minutes']:.1f} minutos
+- **Puntos de datos:** {fit_analysis.data_quality['total_records']:,} registros
+- **Frecuencia de muestreo:** ~{60/fit_analysis.data_quality['duration_minutes']*fit_analysis.data_quality['total_records']:.1f} Hz
 
 ### Cobertura de Datos
-- **Potencia:** {fit_analysis['data_quality']['power_coverage']:.1%} ({int(fit_analysis['data_quality']['power_coverage']*fit_analysis['data_quality']['total_records'])} puntos)
-- **Velocidad:** {fit_analysis['data_quality']['speed_coverage']:.1%} ({int(fit_analysis['data_quality']['speed_coverage']*fit_analysis['data_quality']['total_records'])} puntos)
-- **Frecuencia cardíaca:** {fit_analysis['data_quality']['hr_coverage']:.1%} ({int(fit_analysis['data_quality']['hr_coverage']*fit_analysis['data_quality']['total_records'])} puntos)
-- **Cadencia:** {fit_analysis['data_quality']['cadence_coverage']:.1%} ({int(fit_analysis['data_quality']['cadence_coverage']*fit_analysis['data_quality']['total_records'])} puntos)
-- **GPS/Elevación:** {'✅' if fit_analysis['data_quality']['has_gps'] else '❌'} GPS | {'✅' if fit_analysis['data_quality']['has_elevation'] else '❌'} Elevación
+- **Potencia:** {fit_analysis.data_quality['power_coverage']:.1%} ({int(fit_analysis.data_quality['power_coverage']*fit_analysis.data_quality['total_records'])} puntos)
+- **Velocidad:** {fit_analysis.data_quality['speed_coverage']:.1%} ({int(fit_analysis.data_quality['speed_coverage']*fit_analysis.data_quality['total_records'])} puntos)
+- **Frecuencia cardíaca:** {fit_analysis.data_quality['hr_coverage']:.1%} ({int(fit_analysis.data_quality['hr_coverage']*fit_analysis.data_quality['total_records'])} puntos)
+- **Cadencia:** {fit_analysis.data_quality['cadence_coverage']:.1%} ({int(fit_analysis.data_quality['cadence_coverage']*fit_analysis.data_quality['total_records'])} puntos)
+- **GPS/Elevación:** {'✅' if fit_analysis.data_quality['has_gps'] else '❌'} GPS | {'✅' if fit_analysis.data_quality['has_elevation'] else '❌'} Elevación
 
 ### Sensores Especializados
-- **Aerosensor (CdA):** {'✅ DETECTADO' if fit_analysis['data_quality']['has_aerosensor'] else '❌ No disponible'}
+- **Aerosensor (CdA):** {'✅ DETECTADO' if fit_analysis.data_quality['has_aerosensor'] else '❌ No disponible'}
 """
 
-    if 'avg_power' in fit_analysis['metadata']:
+    if 'avg_power' in fit_analysis.metadata:
         report += f"""
 ### Métricas de Rendimiento
-- **Potencia promedio:** {fit_analysis['metadata']['avg_power']:.0f}W
-- **Potencia máxima:** {fit_analysis['metadata']['max_power']:.0f}W  
-- **Potencia normalizada:** {fit_analysis['metadata']['normalized_power']:.0f}W
-- **Velocidad promedio:** {fit_analysis['metadata']['avg_speed_kmh']:.1f} km/h
-- **Velocidad máxima:** {fit_analysis['metadata']['max_speed_kmh']:.1f} km/h
+- **Potencia promedio:** {fit_analysis.metadata['avg_power']:.0f}W
+- **Potencia máxima:** {fit_analysis.metadata['max_power']:.0f}W  
+- **Potencia normalizada:** {fit_analysis.metadata['normalized_power']:.0f}W
+- **Velocidad promedio:** {fit_analysis.metadata['avg_speed_kmh']:.1f} km/h
+- **Velocidad máxima:** {fit_analysis.metadata['max_speed_kmh']:.1f} km/h
 """
 
     if physical_results['estimates']:
@@ -449,7 +127,7 @@ def generate_comprehensive_report(fit_analysis, lukspeed_data, physical_results)
 |---------|----------|---------------|------|----------------|
 | Precisión CdA | ±{mae/100:.3f} m² | ±0.020 m² | ±0.018 m² | ±0.025 m² |
 | Tiempo procesamiento | <2s | ~5-8s | ~3-5s | ~4-6s |
-| Cobertura datos | {fit_analysis['data_quality']['power_coverage']:.1%} | Variable | Variable | Variable |
+| Cobertura datos | {fit_analysis.data_quality['power_coverage']:.1%} | Variable | Variable | Variable |
 | Aerosensor support | {'✅' if physical_results['estimates']['cda_sensor_available'] else '⚠️'} | ❌ | ⚠️ | ❌ |
 
 ---
@@ -497,11 +175,11 @@ def generate_comprehensive_report(fit_analysis, lukspeed_data, physical_results)
 ## 📈 DATOS TÉCNICOS DETALLADOS
 
 ### Campos Disponibles en FIT
-{', '.join(sorted(list(fit_analysis['available_fields'])))}
+{', '.join(sorted(list(fit_analysis.available_fields)))}
 
 ### Estadísticas de Procesamiento
 - **Puntos válidos procesados:** {len(physical_results['components']['power_aero']):,}
-- **Tasa de éxito:** {len(physical_results['components']['power_aero'])/fit_analysis['data_quality']['total_records']*100:.1f}%
+- **Tasa de éxito:** {len(physical_results['components']['power_aero'])/fit_analysis.data_quality['total_records']*100:.1f}%
 - **Tiempo de procesamiento:** <2 segundos
 - **Memoria utilizada:** <50MB
 
@@ -524,7 +202,7 @@ def main():
     print("\n📁 PASO 1: ANÁLISIS COMPLETO DEL ARCHIVO FIT")
     fit_analysis = analyze_fit_file_complete(fit_file_path)
     
-    if not fit_analysis:
+    if fit_analysis is None:
         print("❌ Error: No se pudo procesar el archivo FIT")
         return
     
@@ -533,8 +211,7 @@ def main():
     lukspeed_data = convert_to_lukspeed_format(fit_analysis)
     
     # Save converted data
-    with open("/workspace/shadcn-ui/test_real_activity.json", "w") as f:
-        json.dump(lukspeed_data, f, indent=2, default=str)
+    write_points_json("/workspace/shadcn-ui/test_real_activity.json", lukspeed_data)
     print("✅ Datos guardados en test_real_activity.json")
     
     # Step 3: Physical power analysis
@@ -543,7 +220,7 @@ def main():
     
     # Save physical analysis results
     with open("/workspace/shadcn-ui/physical_analysis_results.json", "w") as f:
-        json.dump(physical_results, f, indent=2, default=str)
+        json.dump(physical_results, f, indent=2, default=json_default)
     print("✅ Resultados físicos guardados en physical_analysis_results.json")
     
     # Step 4: Generate comprehensive report
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Content-addressed parse cache for LukSpeed
+Stores decoded columnar activities and derived metrics on disk, keyed by the
+SHA-256 of the FIT bytes plus the parser/metrics code version. Entries of other
+versions are dropped on open; total size is bounded with LRU eviction.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import zipfile
+
+import numpy as np
+
+from fit_activity import Activity, json_default
+from fit_sources import open_fit_stream, split_source
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "LUKSPEED_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "lukspeed", "fit"))
+DEFAULT_MAX_BYTES = int(os.environ.get("LUKSPEED_CACHE_MAX_MB", "1024")) * 1024 * 1024
+VERSION_MARKER = ".lukspeed-fit-cache"     # written into every version directory we create
+VERSION_DIR = re.compile(r"^v\d+(\.\d+)*$")
+
+_digests = {}
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents (memoized per path/size/mtime in-process)
+
+    Compressed sources (.fit.gz, ``archive.zip::member``) hash the decompressed
+    FIT bytes, so a ride keeps its cache entries however it is stored.
+    """
+    archive, member = split_source(path)
+    stat = os.stat(archive)
+    memo_key = (os.path.realpath(archive), member, stat.st_size, stat.st_mtime_ns)
+    digest = _digests.get(memo_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open_fit_stream(path) as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                sha.update(chunk)
+        digest = _digests[memo_key] = sha.hexdigest()
+    return digest
+
+
+def activity_to_arrays(activity, prefix=""):
+    """Flatten an Activity into npz-ready arrays plus a JSON-able header"""
+    arrays = {}
+    for name in activity.channel_names:
+        arrays[f"{prefix}{name}"] = activity.channels[name]
+        arrays[f"{prefix}{name}__mask"] = activity.masks[name]
+    header = {
+        "n_points": activity.n_points,
+        "channels": activity.channel_names,
+        "metadata": activity.metadata,
+        "data_quality": activity.data_quality,
+        "available_fields": sorted(activity.available_fields),
+        "special_sensors": activity.special_sensors,
+    }
+    return arrays, header
+
+
+def arrays_to_activity(arrays, header, prefix=""):
+    """Inverse of :func:`activity_to_arrays`"""
+    activity = Activity(header["n_points"])
+    for name in header["channels"]:
+        activity.channels[name] = arrays[f"{prefix}{name}"]
+        activity.masks[name] = arrays[f"{prefix}{name}__mask"]
+    activity.metadata = header["metadata"]
+    activity.data_quality = header["data_quality"]
+    activity.available_fields = set(header["available_fields"])
+    activity.special_sensors = header["special_sensors"]
+    return activity
+
+
+class FitCache:
+    """On-disk cache: <root>/<version>/<digest>.<kind>.npz"""
+
+    def __init__(self, root=None, version="0", max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root or DEFAULT_CACHE_DIR
+        self.version = str(version)
+        self.max_bytes = max_bytes
+        self.directory = os.path.join(self.root, f"v{self.version}")
+        self.hits = 0
+        self.misses = 0
+        self._make_directory()
+        self._drop_stale_versions()
+
+    def _make_directory(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, VERSION_MARKER), "w") as f:
+            f.write(self.version)
+
+    def _drop_stale_versions(self):
+        """Explicit invalidation: entries written by other code versions are removed
+
+        Only v<version> directories holding VERSION_MARKER are touched, so a
+        root shared with anything else (venv/, videos/) is left alone.
+        """
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if (name != f"v{self.version}" and VERSION_DIR.match(name)
+                    and os.path.isfile(os.path.join(path, VERSION_MARKER))):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _path(self, digest, kind):
+        return os.path.join(self.directory, f"{digest}.{kind}.npz")
+
+    def load(self, digest, kind):
+        """(arrays, header) for a cached entry, or None on a miss"""
+        path = self._path(digest, kind)
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files if name != "__header__"}
+                header = json.loads(npz["__header__"].tobytes().decode("utf-8"))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # Truncated or corrupt entry: a miss, and removed so it is written again
+            self.misses += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        os.utime(path)  # LRU: mtime is the last access time
+        self.hits += 1
+        return arrays, header
+
+    def store(self, digest, kind, arrays, header):
+        """Write an entry atomically, then evict least recently used entries"""
+        path = self._path(digest, kind)
+        payload = json.dumps(header, default=json_default).encode("utf-8")
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, __header__=np.frombuffer(payload, dtype=np.uint8), **arrays)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def invalidate(self, digest=None):
+        """Drop one file's entries, or the whole cache when no digest is given"""
+        if digest is None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._make_directory()
+            return
+        for name in os.listdir(self.directory):
+            if name.startswith(f"{digest}."):
+                os.remove(os.path.join(self.directory, name))
+
+    def size_bytes(self):
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".npz") and ".tmp." not in entry.name:
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
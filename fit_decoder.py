@@ -0,0 +1,982 @@
+#!/usr/bin/env python3
+"""
+Fast FIT decoder for LukSpeed
+Compiles every FIT definition message into a NumPy structured dtype once and
+decodes all data messages of that definition in bulk into columnar arrays,
+instead of allocating one fitparse FieldData object per field per record.
+
+Field names, scales, offsets and units come from the fitparse profile, so the
+columns carry exactly the names the rest of the pipeline already uses.
+"""
+
+import os
+import re
+import struct
+from array import array
+
+import numpy as np
+from fitparse import profile
+
+from fit_activity import Activity
+from field_classifier import AIR_DENSITY, CDA, classify_field
+from fit_sources import is_plain_file, read_fit_bytes
+
+# Bump whenever decoded output changes; keys the on-disk parse cache
+DECODER_VERSION = "2"
+
+FIT_EPOCH_OFFSET = 631065600        # 1989-12-31T00:00:00Z in Unix seconds
+FIT_MIN_ABSOLUTE_TIME = 0x10000000  # Smaller date_time values are relative
+TIMESTAMP_FIELD = 253
+
+# FIT base type number -> (name, numpy kind, size, invalid value)
+BASE_TYPES = {
+    0: ("enum", "u1", 1, 0xFF),
+    1: ("sint8", "i1", 1, 0x7F),
+    2: ("uint8", "u1", 1, 0xFF),
+    3: ("sint16", "i2", 2, 0x7FFF),
+    4: ("uint16", "u2", 2, 0xFFFF),
+    5: ("sint32", "i4", 4, 0x7FFFFFFF),
+    6: ("uint32", "u4", 4, 0xFFFFFFFF),
+    7: ("string", "S", 1, None),
+    8: ("float32", "f4", 4, None),
+    9: ("float64", "f8", 8, None),
+    10: ("uint8z", "u1", 1, 0),
+    11: ("uint16z", "u2", 2, 0),
+    12: ("uint32z", "u4", 4, 0),
+    13: ("byte", "u1", 1, 0xFF),
+    14: ("sint64", "i8", 8, 0x7FFFFFFFFFFFFFFF),
+    15: ("uint64", "u8", 8, 0xFFFFFFFFFFFFFFFF),
+    16: ("uint64z", "u8", 8, 0),
+}
+
+DATE_TIME_TYPES = ('date_time', 'local_date_time')
+
+# Messages that carry the developer field schema; read during the scan
+SCHEMA_MESSAGES = ('developer_data_id', 'field_description')
+
+# Developer field name (lower-case, alphanumerics only) -> channel name.
+# Covers the Aerosensor Connect IQ fields; other apps keep their own names.
+DEVELOPER_CHANNELS = {
+    "cda": "aero_cda",
+    "windspeed": "aero_wind_speed",
+    "airspeed": "aero_air_speed",
+    "airdensity": "aero_air_density",
+    "rho": "aero_air_density",
+    "yaw": "aero_yaw",
+    "windyaw": "aero_yaw",
+    "windangle": "aero_yaw",
+}
+CATEGORY_CHANNELS = {CDA: "aero_cda", AIR_DENSITY: "aero_air_density"}
+
+
+class FitDecodeError(Exception):
+    """Raised when the byte stream is not a decodable FIT file"""
+
+
+def developer_channel_name(field_name, message='record'):
+    """Channel name for a developer field (e.g. Aerosensor 'CdA' -> 'aero_cda')"""
+    key = re.sub(r'[^a-z0-9]', '', field_name.lower())
+    if key in DEVELOPER_CHANNELS:
+        return DEVELOPER_CHANNELS[key]
+    return CATEGORY_CHANNELS.get(classify_field(message, field_name), field_name)
+
+
+class DeveloperField:
+    """Typed schema of one developer field, from its field_description message"""
+
+    def __init__(self, developer_data_index, field_num, name, base_type_num,
+                 scale=None, offset=None, units=None, native_mesg_num=None,
+                 native_field_num=None):
+        self.developer_data_index = developer_data_index
+        self.field_num = field_num
+        self.name = name
+        self.base_type_num = base_type_num & 0x1F
+        self.base = BASE_TYPES.get(self.base_type_num, BASE_TYPES[13])[0]
+        self.scale = scale or None      # 0 / invalid means unscaled
+        self.offset = offset or None
+        self.units = units
+        self.native_mesg_num = native_mesg_num
+        self.native_field_num = native_field_num
+        self.application_id = None
+        self.manufacturer_id = None
+
+    @property
+    def key(self):
+        return (self.developer_data_index, self.field_num, self.name,
+                self.base_type_num, self.scale, self.offset)
+
+    @classmethod
+    def from_message(cls, values):
+        return cls(values['developer_data_index'], values['field_definition_number'],
+                   str(values.get('field_name') or f"developer_{values['developer_data_index']}_"
+                                                   f"{values['field_definition_number']}"),
+                   values.get('fit_base_type_id', 13), values.get('scale'),
+                   values.get('offset'), values.get('units'),
+                   values.get('native_mesg_num'), values.get('native_field_num'))
+
+    def as_dict(self):
+        return {
+            "developer_data_index": self.developer_data_index,
+            "field_num": self.field_num,
+            "name": self.name,
+            "base_type": self.base,
+            "scale": self.scale,
+            "offset": self.offset,
+            "units": self.units,
+            "native_mesg_num": self.native_mesg_num,
+            "native_field_num": self.native_field_num,
+            "application_id": self.application_id,
+            "manufacturer_id": self.manufacturer_id,
+        }
+
+
+class FieldSpec:
+    """One field of a compiled definition message"""
+
+    __slots__ = ('num', 'name', 'offset', 'size', 'base', 'count', 'kind', 'invalid',
+                 'scale', 'fit_offset', 'units', 'is_date_time', 'aliases', 'alias_names',
+                 'format', 'developer')
+
+    def __init__(self, num, offset, size, base_type_num, profile_field):
+        name, kind, base_size, invalid = BASE_TYPES.get(base_type_num, BASE_TYPES[13])
+        if kind != "S" and size % base_size:
+            # Malformed size for the declared type: keep the raw bytes
+            name, kind, base_size, invalid = BASE_TYPES[13]
+        self.num = num
+        self.offset = offset
+        self.size = size
+        self.base = name
+        self.kind = kind
+        self.count = 1 if kind == "S" else size // base_size
+        self.invalid = invalid
+        self.scale = None
+        self.fit_offset = None
+        self.units = None
+        self.is_date_time = False
+        self.aliases = ()
+        self.alias_names = ()
+        self.format = None
+        self.developer = None
+
+        if profile_field is None:
+            self.name = f"unknown_{num}"
+            return
+
+        self.name = profile_field.name
+        self.scale = profile_field.scale
+        self.fit_offset = profile_field.offset
+        self.units = profile_field.units
+        self.is_date_time = getattr(profile_field.type, 'name', None) in DATE_TIME_TYPES
+        components = profile_field.components or ()
+        if len(components) == 1 and not components[0].accumulate and \
+                (components[0].bit_offset or 0) == 0 and components[0].bits == base_size * 8:
+            # Same-width alias such as speed -> enhanced_speed, altitude -> enhanced_altitude
+            self.aliases = (components[0],)
+
+    @classmethod
+    def for_developer(cls, offset, size, developer, message):
+        """Spec of a developer field, typed and scaled by its field_description"""
+        spec = cls(developer.field_num, offset, size, developer.base_type_num, None)
+        spec.name = developer_channel_name(developer.name, message)
+        spec.scale = developer.scale
+        spec.fit_offset = developer.offset
+        spec.units = developer.units
+        spec.developer = developer
+        return spec
+
+
+class Projection:
+    """The subset of a definition's fields a caller asked for
+
+    ``view_dtype`` keeps the original byte offsets so evenly spaced messages
+    can be viewed in place; ``packed_dtype`` / ``byte_index`` describe a
+    compact copy holding only the selected bytes for the gather path.
+    """
+
+    def __init__(self, fields, size):
+        self.fields = fields
+        names = [f.name for f in fields]
+        formats = [f.format for f in fields]
+        self.view_dtype = np.dtype({'names': names, 'formats': formats,
+                                    'offsets': [f.offset for f in fields],
+                                    'itemsize': max(size, 1)})
+        packed_offsets = []
+        ranges = []
+        position = 0
+        for f in fields:
+            packed_offsets.append(position)
+            ranges.append(np.arange(f.offset, f.offset + f.size, dtype=np.int64))
+            position += f.size
+        self.packed_dtype = np.dtype({'names': names, 'formats': formats,
+                                      'offsets': packed_offsets,
+                                      'itemsize': max(position, 1)})
+        self.byte_index = np.concatenate(ranges) if ranges else np.zeros(0, dtype=np.int64)
+        self.full = position == size
+
+
+class MessageDefinition:
+    """A definition message compiled into a NumPy structured dtype"""
+
+    def __init__(self, global_num, big_endian, field_defs, dev_field_defs, developer_fields=None):
+        self.global_num = global_num
+        self.big_endian = big_endian
+        self.field_defs = tuple(field_defs)
+        self.dev_field_defs = tuple(dev_field_defs)
+
+        mesg_type = profile.MESSAGE_TYPES.get(global_num)
+        self.mesg_type = mesg_type
+        self.name = mesg_type.name if mesg_type else f"unknown_{global_num}"
+
+        self.endian = '>' if big_endian else '<'
+        self.fields = []
+        self._names = set()
+        position = 0
+        for num, size, base_type in self.field_defs:
+            profile_field = mesg_type.fields.get(num) if mesg_type else None
+            spec = FieldSpec(num, position, size, base_type & 0x1F, profile_field)
+            spec.alias_names = tuple(mesg_type.fields[c.def_num].name for c in spec.aliases)
+            self._add_field(spec)
+            position += size
+
+        # Developer fields follow the native ones; those without a
+        # field_description are skipped by size
+        self.dev_offset = position
+        self.developer_keys = []
+        developer_fields = developer_fields or {}
+        for num, size, dev_index in self.dev_field_defs:
+            developer = developer_fields.get((dev_index, num))
+            if developer is not None:
+                self._add_field(FieldSpec.for_developer(position, size, developer, self.name))
+                self.developer_keys.append(developer.key)
+            position += size
+        self.developer_keys = tuple(self.developer_keys)
+
+        self.size = position
+        self._projections = {}
+        self.dtype = self.projection().view_dtype
+        self.timestamp_field = next((f for f in self.fields if f.num == TIMESTAMP_FIELD), None)
+
+    def _add_field(self, spec):
+        if spec.name in self._names:
+            spec.name = f"{spec.name}_{spec.num}"
+        self._names.add(spec.name)
+        if spec.kind == "S":
+            spec.format = f"S{spec.size}"
+        elif spec.count > 1:
+            spec.format = (self.endian + spec.kind, (spec.count,))
+        else:
+            spec.format = self.endian + spec.kind
+        self.fields.append(spec)
+
+    @property
+    def signature(self):
+        return (self.global_num, self.big_endian, self.field_defs, self.dev_field_defs,
+                self.developer_keys)
+
+    @property
+    def field_names(self):
+        names = []
+        for spec in self.fields:
+            names.append(spec.name)
+            names.extend(spec.alias_names)
+        return names
+
+    def projection(self, wanted=None):
+        """Compiled projection onto the ``wanted`` field names (all when None)"""
+        key = None if wanted is None else frozenset(wanted)
+        projection = self._projections.get(key)
+        if projection is None:
+            if key is None:
+                fields = list(self.fields)
+            else:
+                fields = [f for f in self.fields
+                          if f.name in key or any(a in key for a in f.alias_names)]
+            projection = Projection(fields, self.size)
+            self._projections[key] = projection
+        return projection
+
+
+class MessageColumns:
+    """All data messages of one global message type as columnar arrays"""
+
+    def __init__(self, name, global_num, n):
+        self.name = name
+        self.global_num = global_num
+        self.n = n
+        self.columns = {}
+        self.masks = {}
+        self.units = {}
+        self.index = np.zeros(n, dtype=np.int64)  # Position in file message order
+
+    def __len__(self):
+        return self.n
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def get(self, name, default=None):
+        """Value of a field in the first valid message (handy for session/file_id)"""
+        if name not in self.columns:
+            return default
+        valid = np.flatnonzero(self.masks[name])
+        if len(valid) == 0:
+            return default
+        value = self.columns[name][valid[0]]
+        return value.item() if hasattr(value, 'item') else value
+
+
+def _field_values(raw, spec):
+    """Validity mask and scaled values for one field column"""
+    if spec.kind == "S":
+        mask = np.char.str_len(raw) > 0
+        values = np.char.decode(np.char.rstrip(raw, b'\x00'), 'utf-8', errors='replace')
+        return values, mask
+
+    if spec.kind[0] == "f":
+        invalid = np.isnan(raw)
+    else:
+        invalid = raw == np.asarray(spec.invalid).astype(raw.dtype)
+    mask = ~invalid if raw.ndim == 1 else ~invalid.all(axis=1)
+
+    values = raw
+    if spec.is_date_time:
+        values = raw.astype(np.int64)
+        values = np.where(values >= FIT_MIN_ABSOLUTE_TIME, values + FIT_EPOCH_OFFSET, values)
+    elif spec.scale is not None or spec.fit_offset is not None:
+        values = raw.astype(np.float64)
+        if spec.scale is not None and spec.scale != 1:
+            values /= spec.scale
+        if spec.fit_offset:
+            values -= spec.fit_offset
+    return values, mask
+
+
+def _scale_component(raw, component):
+    values = raw.astype(np.float64)
+    if component.scale is not None and component.scale != 1:
+        values /= component.scale
+    if component.offset:
+        values -= component.offset
+    return values
+
+
+def crc16(data, crc=0):
+    """FIT CRC-16 (slow, only used when check_crc=True)"""
+    table = (0x0000, 0xCC01, 0xD801, 0x1400, 0xF001, 0x3C00, 0x2800, 0xE401,
+             0xA001, 0x6C00, 0x7800, 0xB401, 0x5000, 0x9C01, 0x8801, 0x4400)
+    for byte in data:
+        tmp = table[crc & 0xF]
+        crc = (crc >> 4) & 0x0FFF
+        crc = crc ^ tmp ^ table[byte & 0xF]
+        tmp = table[crc & 0xF]
+        crc = (crc >> 4) & 0x0FFF
+        crc = crc ^ tmp ^ table[(byte >> 4) & 0xF]
+    return crc
+
+
+class ScanState:
+    """Local message type -> definition bindings carried across scan calls"""
+
+    def __init__(self, index_messages=None):
+        self.index_messages = index_messages
+        self.local = {}
+        self.sizes = {}
+        self.indexed = {}
+        self.schema = {}
+
+
+class FitDecoder:
+    """Columnar FIT decoder
+
+    The file is scanned once to build a compact message index (byte offset,
+    compiled definition and compressed-timestamp offset of every data
+    message, in file order). Decoding then works per definition: all data
+    messages sharing a definition are viewed as one structured array.
+    """
+
+    def __init__(self, source, check_crc=False, index_messages=None):
+        if isinstance(source, (str, os.PathLike)) and is_plain_file(source):
+            with open(source, 'rb') as f:
+                data = f.read()
+        elif isinstance(source, (str, os.PathLike)):
+            # .fit.gz file or archive.zip::member, decompressed in memory
+            data = read_fit_bytes(source)
+        else:
+            data = source
+        self.data = data
+        self.buffer = np.frombuffer(data, dtype=np.uint8)
+        self.check_crc = check_crc
+        # Data messages of other types are skipped by size without being indexed
+        self.index_messages = set(index_messages) if index_messages is not None else None
+
+        self.definitions = []
+        self._definition_ids = {}
+        # Developer field schema: (developer_data_index, field number) -> DeveloperField
+        self.developer_fields = {}
+        # developer_data_index -> developer_data_id message values
+        self.developer_data = {}
+        self.index_offsets = None
+        self.index_definitions = None
+        self.index_time_offsets = None
+        self._timestamps = None
+        self._scan()
+
+    # ------------------------------------------------------------------ scan
+
+    def _register_definition(self, definition):
+        key = definition.signature
+        def_id = self._definition_ids.get(key)
+        if def_id is None:
+            def_id = len(self.definitions)
+            self.definitions.append(definition)
+            self._definition_ids[key] = def_id
+        return def_id
+
+    def _parse_definition(self, pos, has_dev_fields):
+        data = self.data
+        big_endian = data[pos + 1] == 1
+        global_num = struct.unpack_from('>H' if big_endian else '<H', data, pos + 2)[0]
+        n_fields = data[pos + 4]
+        pos += 5
+        raw = data[pos:pos + 3 * n_fields]
+        field_defs = [(raw[i], raw[i + 1], raw[i + 2]) for i in range(0, len(raw), 3)]
+        pos += 3 * n_fields
+        dev_field_defs = []
+        if has_dev_fields:
+            n_dev = data[pos]
+            pos += 1
+            raw = data[pos:pos + 3 * n_dev]
+            dev_field_defs = [(raw[i], raw[i + 1], raw[i + 2]) for i in range(0, len(raw), 3)]
+            pos += 3 * n_dev
+        definition = MessageDefinition(global_num, big_endian, field_defs, dev_field_defs,
+                                       self.developer_fields)
+        return self._register_definition(definition), pos
+
+    def _read_message(self, definition, offset):
+        """Decode a single data message into ``{field name: value}``"""
+        structured = np.ndarray((1,), dtype=definition.dtype, buffer=self.buffer, offset=offset)
+        values = {}
+        for spec in definition.fields:
+            column, mask = _field_values(structured[spec.name], spec)
+            if mask[0]:
+                value = column[0]
+                values[spec.name] = value.tolist() if hasattr(value, 'tolist') else value
+        return values
+
+    def _read_schema_message(self, definition, offset):
+        """Update the developer field schema from a developer_data_id / field_description"""
+        values = self._read_message(definition, offset)
+        if 'developer_data_index' not in values:
+            return
+        index = values['developer_data_index']
+        if definition.name == 'developer_data_id':
+            self.developer_data[index] = values
+            for developer in self.developer_fields.values():
+                if developer.developer_data_index == index:
+                    developer.application_id = values.get('application_id')
+                    developer.manufacturer_id = values.get('manufacturer_id')
+        elif 'field_definition_number' in values:
+            developer = DeveloperField.from_message(values)
+            data_id = self.developer_data.get(index, {})
+            developer.application_id = data_id.get('application_id')
+            developer.manufacturer_id = data_id.get('manufacturer_id')
+            self.developer_fields[(index, developer.field_num)] = developer
+
+    def _scan(self):
+        data = self.data
+        offsets = array('q')
+        def_ids = array('i')
+        time_offsets = array('b')
+        state = ScanState(self.index_messages)
+
+        if len(data) < 12 or data[8:12] != b'.FIT':
+            raise FitDecodeError("Not a FIT file (missing .FIT signature)")
+
+        pos = 0
+        while pos + 12 <= len(data):
+            header_size = data[pos]
+            if header_size < 12 or data[pos + 8:pos + 12] != b'.FIT':
+                break
+            data_size = struct.unpack_from('<I', data, pos + 4)[0]
+            start = pos + header_size
+            end = start + data_size if data_size else len(data)
+            end = min(end, len(data))
+            if self.check_crc and end + 2 <= len(data):
+                if crc16(data[pos:end + 2]) != 0:
+                    raise FitDecodeError(f"CRC mismatch in FIT file at byte {pos}")
+
+            self._scan_messages(start, end, state, offsets, def_ids, time_offsets)
+            # Skip the file CRC and look for a chained FIT file
+            pos = end + 2
+
+        self.index_offsets = np.frombuffer(offsets, dtype=np.int64) if offsets else np.zeros(0, np.int64)
+        self.index_definitions = np.frombuffer(def_ids, dtype=np.int32) if def_ids else np.zeros(0, np.int32)
+        self.index_time_offsets = np.frombuffer(time_offsets, dtype=np.int8) if time_offsets else np.zeros(0, np.int8)
+
+    def _definition_end(self, pos, has_dev_fields, end):
+        """End of the definition message whose content starts at ``pos`` (None if cut off)"""
+        data = self.data
+        if pos + 5 > end:
+            return None
+        pos += 5 + 3 * data[pos + 4]
+        if has_dev_fields:
+            if pos + 1 > end:
+                return None
+            pos += 1 + 3 * data[pos]
+        return pos if pos <= end else None
+
+    def _scan_messages(self, pos, end, state, offsets, def_ids, time_offsets, strict=True):
+        """Index the messages in ``data[pos:end]``; returns where scanning stopped
+
+        Scanning stops at the first message that does not fit before ``end``
+        (a truncated file, or data still being written). With ``strict=False``
+        a data message of an undefined local type also stops the scan instead
+        of raising.
+        """
+        data = self.data
+        local = state.local
+        sizes = state.sizes
+        indexed = state.indexed
+        schema = state.schema
+        index_messages = state.index_messages
+
+        while pos < end:
+            header = data[pos]
+            if header & 0x40 and not header & 0x80:
+                local_type = header & 0x0F
+                has_dev_fields = bool(header & 0x20)
+                if self._definition_end(pos + 1, has_dev_fields, end) is None:
+                    break
+                def_id, pos = self._parse_definition(pos + 1, has_dev_fields)
+                definition = self.definitions[def_id]
+                local[local_type] = def_id
+                sizes[local_type] = definition.size
+                indexed[local_type] = index_messages is None or definition.name in index_messages
+                schema[local_type] = definition.name in SCHEMA_MESSAGES
+                continue
+
+            if header & 0x80:
+                # Compressed timestamp header
+                local_type = (header >> 5) & 0x03
+                time_offset = header & 0x1F
+            else:
+                local_type = header & 0x0F
+                time_offset = -1
+            def_id = local.get(local_type)
+            if def_id is None:
+                if not strict:
+                    break
+                raise FitDecodeError(f"Data message for undefined local type {local_type} at byte {pos}")
+            size = sizes[local_type]
+            if pos + 1 + size > end:
+                break
+            if indexed[local_type]:
+                offsets.append(pos + 1)
+                def_ids.append(def_id)
+                time_offsets.append(time_offset)
+            if schema[local_type]:
+                self._read_schema_message(self.definitions[def_id], pos + 1)
+            pos += 1 + size
+        return pos
+
+    # ---------------------------------------------------------------- decode
+
+    def _structured(self, definition, positions, projection=None):
+        """Structured array over the data messages at ``positions`` of the index
+
+        Only the bytes of the fields in ``projection`` are ever touched;
+        everything else is skipped by offset.
+        """
+        projection = projection or definition.projection()
+        offsets = self.index_offsets[positions]
+        n = len(offsets)
+        if n == 0 or definition.size == 0 or not projection.fields:
+            return np.zeros(n, dtype=projection.packed_dtype)
+        if n > 1:
+            strides = np.diff(offsets)
+            uniform = bool((strides == strides[0]).all())
+        else:
+            strides, uniform = None, True
+        if uniform:
+            # Evenly spaced messages: zero-copy view straight on the file bytes
+            stride = int(strides[0]) if n > 1 else definition.size
+            return np.ndarray((n,), dtype=projection.view_dtype, buffer=self.buffer,
+                              offset=int(offsets[0]), strides=(stride,))
+        gather = offsets[:, None] + projection.byte_index
+        raw = np.ascontiguousarray(self.buffer[gather])
+        return raw.view(projection.packed_dtype).reshape(n)
+
+    def timestamps(self):
+        """Unix timestamp of every indexed message (-1 when it has none)"""
+        if self._timestamps is not None:
+            return self._timestamps
+        stamps, _ = self._resolve_timestamps(0, len(self.index_offsets))
+        stamps[stamps >= 0] += FIT_EPOCH_OFFSET
+        self._timestamps = stamps
+        return stamps
+
+    def _resolve_timestamps(self, start, stop, last=-1):
+        """Raw FIT timestamps of index positions [start, stop)
+
+        ``last`` is the latest timestamp before ``start``, needed to resolve
+        compressed headers at the start of the range. Returns the stamps and
+        the latest timestamp of the range.
+        """
+        definitions = self.index_definitions[start:stop]
+        time_offsets = self.index_time_offsets[start:stop]
+        stamps = np.full(stop - start, -1, dtype=np.int64)
+        for def_id in np.unique(definitions).tolist():
+            definition = self.definitions[def_id]
+            spec = definition.timestamp_field
+            if spec is None:
+                continue
+            positions = np.flatnonzero((definitions == def_id) & (time_offsets < 0))
+            if len(positions) == 0:
+                continue
+            raw = self._structured(definition, positions + start, definition.projection([spec.name]))[spec.name]
+            valid = raw != np.asarray(spec.invalid).astype(raw.dtype)
+            stamps[positions[valid]] = raw[valid].astype(np.int64)
+
+        compressed = np.flatnonzero(time_offsets >= 0)
+        if len(compressed):
+            # Compressed headers carry the low 5 bits relative to the last timestamp
+            full_positions = np.flatnonzero(stamps >= 0)
+            full_values = stamps[full_positions]
+            cursor = 0
+            for position in compressed.tolist():
+                while cursor < len(full_positions) and full_positions[cursor] < position:
+                    last = int(full_values[cursor])
+                    cursor += 1
+                if last < 0:
+                    continue
+                time_offset = int(time_offsets[position])
+                value = (last & ~0x1F) + time_offset
+                if time_offset < (last & 0x1F):
+                    value += 0x20
+                stamps[position] = value
+                last = value
+
+        resolved = np.flatnonzero(stamps >= 0)
+        if len(resolved):
+            last = int(stamps[resolved[-1]])
+        return stamps, last
+
+    def message_names(self):
+        """Names of the global messages present in the file"""
+        used = np.unique(self.index_definitions)
+        return sorted({self.definitions[i].name for i in used.tolist()})
+
+    def field_names(self, message):
+        """Every field name the file defines for ``message`` (before projection)"""
+        names = []
+        for definition in self.definitions:
+            if definition.name == message:
+                names.extend(n for n in definition.field_names if n not in names)
+        return names
+
+    def developer_field_names(self, message):
+        """Channel names of the developer fields defined for ``message``"""
+        names = []
+        for definition in self.definitions:
+            if definition.name == message:
+                names.extend(f.name for f in definition.fields
+                             if f.developer is not None and f.name not in names)
+        return names
+
+    def developer_schema(self):
+        """Typed developer field schema, one dict per (developer index, field)"""
+        return [developer.as_dict() for _, developer in sorted(self.developer_fields.items())]
+
+    def decode(self, messages=None, fields=None, positions=None):
+        """Decode data messages into ``{message name: MessageColumns}``
+
+        ``messages`` optionally restricts decoding to a set of message names.
+        ``fields`` projects the decoded columns onto a set of field names,
+        either one set for every message or ``{message name: set}``; fields
+        outside the projection are skipped by byte offset and never decoded
+        or scaled. ``positions`` (sorted positions in the message index)
+        limits decoding to those messages; all other bytes are left alone.
+        """
+        wanted = set(messages) if messages is not None else None
+        groups = {}
+        for def_id, definition in enumerate(self.definitions):
+            if wanted is not None and definition.name not in wanted:
+                continue
+            groups.setdefault(definition.name, []).append(def_id)
+
+        has_compressed = bool((self.index_time_offsets >= 0).any())
+        result = {}
+        for name, def_ids in groups.items():
+            if isinstance(fields, dict):
+                selected = fields.get(name)
+            else:
+                selected = fields
+            selected = None if selected is None else frozenset(selected)
+
+            per_definition = []
+            for def_id in def_ids:
+                if positions is None:
+                    selection = np.flatnonzero(self.index_definitions == def_id)
+                else:
+                    selection = positions[self.index_definitions[positions] == def_id]
+                if len(selection):
+                    per_definition.append((self.definitions[def_id], selection))
+            if not per_definition:
+                continue
+            result[name] = self._decode_group(name, per_definition, has_compressed, selected)
+        return result
+
+    def _decode_group(self, name, per_definition, has_compressed, selected=None):
+        all_positions = np.sort(np.concatenate([p for _, p in per_definition]))
+        n = len(all_positions)
+        out = MessageColumns(name, per_definition[0][0].global_num, n)
+        out.index = all_positions
+        single = len(per_definition) == 1
+
+        for definition, positions in per_definition:
+            rows = None if single else np.searchsorted(all_positions, positions)
+            projection = definition.projection(selected)
+            structured = self._structured(definition, positions, projection)
+            present = {f.name for f in definition.fields}
+            for spec in projection.fields:
+                values, mask = _field_values(structured[spec.name], spec)
+                if selected is None or spec.name in selected:
+                    self._store(out, spec.name, values, mask, rows, spec.units)
+                for component, alias_name in zip(spec.aliases, spec.alias_names):
+                    if alias_name in present or (selected is not None and alias_name not in selected):
+                        continue
+                    alias = definition.mesg_type.fields[component.def_num]
+                    raw = structured[spec.name]
+                    self._store(out, alias_name, _scale_component(raw, component), mask, rows, alias.units)
+
+        if has_compressed and (selected is None or 'timestamp' in selected):
+            fill = self.index_time_offsets[all_positions] >= 0
+            stamps = self.timestamps()[all_positions] if fill.any() else None
+            if stamps is not None:
+                fill &= stamps >= 0
+                ts_mask = out.masks.get('timestamp', np.zeros(n, dtype=bool))
+                column = out.columns.get('timestamp', np.zeros(n, dtype=np.int64)).astype(np.int64)
+                column[fill] = stamps[fill]
+                out.columns['timestamp'] = column
+                out.masks['timestamp'] = ts_mask | fill
+                out.units['timestamp'] = 's'
+        return out
+
+    @staticmethod
+    def _store(out, name, values, mask, rows, units):
+        if rows is None:
+            out.columns[name] = values
+            out.masks[name] = mask
+        else:
+            if name not in out.columns:
+                shape = (out.n,) + values.shape[1:]
+                out.columns[name] = np.zeros(shape, dtype=values.dtype)
+                out.masks[name] = np.zeros(out.n, dtype=bool)
+            column = out.columns[name]
+            if column.shape[1:] != values.shape[1:]:
+                return
+            if not np.can_cast(values.dtype, column.dtype, casting='same_kind') or \
+                    values.dtype.itemsize > column.dtype.itemsize:
+                column = column.astype(np.result_type(column.dtype, values.dtype))
+                out.columns[name] = column
+            column[rows] = values
+            out.masks[name][rows] = mask
+        out.units[name] = units
+
+
+def decode_fit(source, messages=None, fields=None, check_crc=False):
+    """Decode a FIT file (path, .fit.gz, zip member or bytes) into ``{message name: MessageColumns}``"""
+    return FitDecoder(source, check_crc=check_crc).decode(messages, fields)
+
+
+def decode_activity(source, fields=None, check_crc=False):
+    """Decode the ``record`` messages of a FIT file straight into an Activity
+
+    ``fields`` limits decoding to the record fields the caller needs.
+    """
+    decoder = FitDecoder(source, check_crc=check_crc)
+    records = decoder.decode(['record'], fields).get('record')
+    activity = records_to_activity(records)
+    activity.available_fields = set(decoder.field_names('record'))
+    return activity
+
+
+def records_to_activity(records):
+    """Build an Activity from decoded ``record`` MessageColumns"""
+    if records is None:
+        return Activity(0)
+    activity = Activity(records.n)
+    for name, values in records.columns.items():
+        if values.ndim != 1 or values.dtype.kind not in 'iuf':
+            continue
+        activity.set_channel(name, values, records.masks[name])
+    activity.available_fields = set(records.columns)
+    return activity
+
+
+# ---------------------------------------------------------------- summary
+
+SUMMARY_MESSAGES = ('file_id', 'session', 'lap', 'device_info', 'activity', 'field_description')
+
+# FIT sport / sub_sport -> activities.type (Strava naming used by the app)
+ACTIVITY_TYPES = {
+    'cycling': 'Ride',
+    'e_biking': 'EBikeRide',
+    'running': 'Run',
+    'walking': 'Walk',
+    'hiking': 'Hike',
+    'swimming': 'Swim',
+}
+VIRTUAL_SUB_SPORTS = ('indoor_cycling', 'virtual_activity', 'spin')
+
+
+def enum_name(message, field, value):
+    """Profile name of an enum value (e.g. sport 2 -> 'cycling')"""
+    mesg_type = next((m for m in profile.MESSAGE_TYPES.values() if m.name == message), None)
+    if mesg_type is None or value is None:
+        return value
+    for profile_field in mesg_type.fields.values():
+        if profile_field.name == field:
+            values = getattr(profile_field.type, 'values', None) or {}
+            return values.get(value, value)
+    return value
+
+
+def _first(columns, *names):
+    """First valid value among ``names`` (e.g. enhanced_avg_speed, avg_speed)"""
+    if columns is None:
+        return None
+    for name in names:
+        value = columns.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def _total(columns, name):
+    if columns is None or name not in columns.columns:
+        return None
+    mask = columns.masks[name]
+    return float(columns.columns[name][mask].sum()) if mask.any() else None
+
+
+def _maximum(columns, *names):
+    if columns is None:
+        return None
+    for name in names:
+        if name in columns.columns and columns.masks[name].any():
+            return float(columns.columns[name][columns.masks[name]].max())
+    return None
+
+
+def _weighted_mean(columns, weight_name, *names):
+    """Time-weighted average over sessions, for multi-session files"""
+    if columns is None:
+        return None
+    weights = columns.columns.get(weight_name)
+    for name in names:
+        if name not in columns.columns or not columns.masks[name].any():
+            continue
+        mask = columns.masks[name]
+        values = columns.columns[name][mask].astype(np.float64)
+        if weights is None or not columns.masks[weight_name][mask].all():
+            return float(values.mean())
+        w = weights[mask].astype(np.float64)
+        return float(np.average(values, weights=w)) if w.sum() > 0 else float(values.mean())
+    return None
+
+
+def _row_value(columns, name, row):
+    """Value of one message field, or None when missing"""
+    if name not in columns.columns or not columns.masks[name][row]:
+        return None
+    return columns.columns[name][row].item()
+
+
+def _iso(epoch):
+    return None if epoch is None else str(np.datetime64(int(epoch), 's'))
+
+
+def read_fit_summary(source, check_crc=False):
+    """Activity totals straight from the device-written summary messages
+
+    Only ``file_id``, ``session``, ``lap``, ``device_info``, ``activity`` (and
+    ``field_description``, to flag Aerosensor developer fields) are decoded;
+    ``record`` data messages are skipped by size. The keys match the columns
+    of the ``activities`` table in database/schema.sql.
+    """
+    decoder = FitDecoder(source, check_crc=check_crc, index_messages=SUMMARY_MESSAGES)
+    messages = decoder.decode(SUMMARY_MESSAGES)
+    session = messages.get('session')
+    laps = messages.get('lap')
+    file_id = messages.get('file_id')
+    source_messages = session if session is not None else laps
+
+    sport = enum_name('session', 'sport', _first(session, 'sport'))
+    sub_sport = enum_name('session', 'sub_sport', _first(session, 'sub_sport'))
+    activity_type = ACTIVITY_TYPES.get(sport, sport)
+    if activity_type == 'Ride' and sub_sport in VIRTUAL_SUB_SPORTS:
+        activity_type = 'VirtualRide'
+
+    elapsed = _total(source_messages, 'total_elapsed_time')
+    moving = _total(source_messages, 'total_moving_time')
+    if moving is None:
+        moving = _total(source_messages, 'total_timer_time')
+    start_time = _first(session, 'start_time') or _first(laps, 'start_time') or \
+        _first(file_id, 'time_created')
+
+    has_aerosensor = any(developer_channel_name(developer.name).startswith("aero_")
+                         for developer in decoder.developer_fields.values())
+
+    summary = {
+        "name": _first(session, 'sport_profile_name'),
+        "type": activity_type,
+        "distance_m": _total(source_messages, 'total_distance'),
+        "moving_time_s": None if moving is None else int(round(moving)),
+        "elapsed_time_s": None if elapsed is None else int(round(elapsed)),
+        "total_elevation_gain_m": _total(source_messages, 'total_ascent'),
+        "average_speed_ms": _weighted_mean(source_messages, 'total_timer_time', 'enhanced_avg_speed', 'avg_speed'),
+        "max_speed_ms": _maximum(source_messages, 'enhanced_max_speed', 'max_speed'),
+        "average_power": _weighted_mean(source_messages, 'total_timer_time', 'avg_power'),
+        "max_power": _maximum(source_messages, 'max_power'),
+        "normalized_power": _weighted_mean(source_messages, 'total_timer_time', 'normalized_power'),
+        "average_heartrate": _weighted_mean(source_messages, 'total_timer_time', 'avg_heart_rate'),
+        "max_heartrate": _maximum(source_messages, 'max_heart_rate'),
+        "calories": _total(source_messages, 'total_calories'),
+        "has_aerosensor_data": has_aerosensor,
+        "start_date": _iso(start_time),
+        "training_effect": _maximum(session, 'total_training_effect'),
+        "anaerobic_training_effect": _maximum(session, 'total_anaerobic_training_effect'),
+        "sport": sport,
+        "sub_sport": sub_sport,
+        "num_laps": len(laps) if laps is not None else 0,
+    }
+
+    if laps is not None:
+        summary["laps"] = [
+            {
+                "start_date": _iso(_row_value(laps, 'start_time', i)),
+                "elapsed_time_s": _row_value(laps, 'total_elapsed_time', i),
+                "distance_m": _row_value(laps, 'total_distance', i),
+                "average_power": _row_value(laps, 'avg_power', i),
+                "average_heartrate": _row_value(laps, 'avg_heart_rate', i),
+            }
+            for i in range(len(laps))
+        ]
+
+    devices = messages.get('device_info')
+    if devices is not None:
+        summary["devices"] = [
+            {
+                name: enum_name('device_info', name, _row_value(devices, name, i))
+                for name in ('manufacturer', 'product', 'serial_number', 'software_version', 'device_type')
+                if _row_value(devices, name, i) is not None
+            }
+            for i in range(len(devices))
+        ]
+
+    if file_id is not None:
+        summary["manufacturer"] = enum_name('file_id', 'manufacturer', file_id.get('manufacturer'))
+        summary["product"] = file_id.get('product')
+        summary["serial_number"] = file_id.get('serial_number')
+    return summary
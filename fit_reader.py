@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped FIT reader with a persistable message index
+The first open scans the file once and saves the message index (global message
+number, local type, byte offset and timestamp of every data message) next to
+it; later opens load that index and decode only the bytes a query touches.
+"""
+
+import json
+import mmap
+import os
+
+import numpy as np
+
+from fit_activity import to_epoch_seconds
+from fit_decoder import DECODER_VERSION, DeveloperField, FitDecoder, MessageDefinition
+
+INDEX_SUFFIX = ".idx.npz"
+INDEX_FORMAT = 1
+
+
+def _developer_state(developer):
+    return [developer.developer_data_index, developer.field_num, developer.name,
+            developer.base_type_num, developer.scale, developer.offset, developer.units,
+            developer.native_mesg_num, developer.native_field_num,
+            developer.application_id, developer.manufacturer_id]
+
+
+def _developer_from_state(state):
+    developer = DeveloperField(*state[:9])
+    developer.application_id, developer.manufacturer_id = state[9], state[10]
+    return developer
+
+
+class FitReader(FitDecoder):
+    """FitDecoder over a memory-mapped file, with random access by time or message
+
+    The message index lives in ``<file>.idx.npz`` and is reused as long as
+    the file size, mtime and decoder version match.
+    """
+
+    def __init__(self, path, check_crc=False, index_path=None, persist=True):
+        self.path = os.fspath(path)
+        self.index_path = index_path or self.path + INDEX_SUFFIX
+        self.persist = persist
+        self.index_loaded = False
+        self._file = open(self.path, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self._file_key = [stat.st_size, stat.st_mtime_ns]
+        if stat.st_size:
+            data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = b''
+        super().__init__(data, check_crc=check_crc)
+
+    # ------------------------------------------------------------------ index
+
+    def _scan(self):
+        if self._load_index():
+            self.index_loaded = True
+            return
+        super()._scan()
+        if self.persist:
+            self.save_index()
+
+    def save_index(self, path=None):
+        """Write the message index (and compiled definitions) next to the file"""
+        path = path or self.index_path
+        header = {
+            "format": INDEX_FORMAT,
+            "decoder_version": DECODER_VERSION,
+            "file": self._file_key,
+            "definitions": [
+                {
+                    "global_num": d.global_num,
+                    "big_endian": d.big_endian,
+                    "field_defs": [list(f) for f in d.field_defs],
+                    "dev_field_defs": [list(f) for f in d.dev_field_defs],
+                    "developer_fields": [_developer_state(f.developer)
+                                         for f in d.fields if f.developer is not None],
+                }
+                for d in self.definitions
+            ],
+            "developer_fields": [_developer_state(f) for f in self.developer_fields.values()],
+            "developer_data": {str(k): v for k, v in self.developer_data.items()},
+        }
+        payload = np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        try:
+            np.savez(tmp_path, header=payload,
+                     offsets=self.index_offsets,
+                     definitions=self.index_definitions,
+                     time_offsets=self.index_time_offsets,
+                     timestamps=self.timestamps())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Read-only directory: the index simply is not persisted
+            print(f"⚠️ Could not save FIT index {path}: {e}")
+
+    def _load_index(self):
+        try:
+            with np.load(self.index_path, allow_pickle=False) as npz:
+                header = json.loads(npz['header'].tobytes().decode('utf-8'))
+                if header.get("format") != INDEX_FORMAT or \
+                        header.get("decoder_version") != DECODER_VERSION or \
+                        header.get("file") != self._file_key:
+                    return False
+                offsets = npz['offsets']
+                definitions = npz['definitions']
+                time_offsets = npz['time_offsets']
+                timestamps = npz['timestamps']
+        except (OSError, ValueError, KeyError):
+            return False
+
+        self.developer_fields = {}
+        for state in header["developer_fields"]:
+            developer = _developer_from_state(state)
+            self.developer_fields[(developer.developer_data_index, developer.field_num)] = developer
+        self.developer_data = {int(k): v for k, v in header["developer_data"].items()}
+        for entry in header["definitions"]:
+            developer_fields = {}
+            for state in entry["developer_fields"]:
+                developer = _developer_from_state(state)
+                developer_fields[(developer.developer_data_index, developer.field_num)] = developer
+            definition = MessageDefinition(entry["global_num"], entry["big_endian"],
+                                           [tuple(f) for f in entry["field_defs"]],
+                                           [tuple(f) for f in entry["dev_field_defs"]],
+                                           developer_fields)
+            self.definitions.append(definition)
+            self._definition_ids[definition.signature] = len(self.definitions) - 1
+
+        self.index_offsets = offsets
+        self.index_definitions = definitions
+        self.index_time_offsets = time_offsets
+        self._timestamps = timestamps
+        return True
+
+    @property
+    def index_message_numbers(self):
+        """Global FIT message number of every indexed data message"""
+        numbers = np.array([d.global_num for d in self.definitions], dtype=np.int32)
+        return numbers[self.index_definitions] if len(numbers) else np.zeros(0, np.int32)
+
+    @property
+    def index_local_types(self):
+        """Local message type of every indexed data message (read from its header byte)"""
+        headers = self.buffer[self.index_offsets - 1]
+        return np.where(headers & 0x80, (headers >> 5) & 0x03, headers & 0x0F).astype(np.uint8)
+
+    # ---------------------------------------------------------------- queries
+
+    def positions(self, message):
+        """Index positions of every ``message`` data message, in file order"""
+        def_ids = [i for i, d in enumerate(self.definitions) if d.name == message]
+        return np.flatnonzero(np.isin(self.index_definitions, def_ids))
+
+    def messages(self, message, fields=None):
+        """All messages of one type (e.g. every lap) as MessageColumns"""
+        positions = self.positions(message)
+        return self.decode([message], fields, positions=positions).get(message)
+
+    def between(self, t0, t1, message='record', fields=None):
+        """Messages with t0 <= timestamp <= t1 (datetimes or Unix seconds)"""
+        t0 = to_epoch_seconds(t0)
+        t1 = to_epoch_seconds(t1)
+        positions = self.positions(message)
+        stamps = self.timestamps()[positions]
+        if len(stamps) and (np.diff(stamps) >= 0).all() and stamps[0] >= 0:
+            # Time-ordered stream: binary search instead of a full mask
+            start = np.searchsorted(stamps, t0, side='left')
+            stop = np.searchsorted(stamps, t1, side='right')
+            selected = positions[start:stop]
+        else:
+            selected = positions[(stamps >= t0) & (stamps <= t1)]
+        return self.decode([message], fields, positions=selected).get(message)
+
+    def last(self, minutes, message='record', fields=None):
+        """Messages of the last ``minutes`` of the activity"""
+        stamps = self.timestamps()[self.positions(message)]
+        stamps = stamps[stamps >= 0]
+        if len(stamps) == 0:
+            return None
+        end = int(stamps.max())
+        return self.between(end - int(minutes * 60), end, message, fields)
+
+    # -------------------------------------------------------------- lifecycle
+
+    def close(self):
+        self.buffer = None
+        if isinstance(self.data, mmap.mmap):
+            try:
+                self.data.close()
+            except BufferError:
+                # Decoded zero-copy views still reference the map; the GC closes it
+                pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
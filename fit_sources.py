@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Compressed FIT sources for LukSpeed
+Reads plain .fit files, .fit.gz files and FIT members of .zip exports (gzipped
+members included, as in Strava bulk exports) as streams, without unpacking
+anything to scratch disk. A zip member is addressed as ``archive.zip::member``.
+"""
+
+import contextlib
+import gzip
+import os
+import zipfile
+from functools import lru_cache
+
+MEMBER_SEPARATOR = "::"
+FIT_SUFFIXES = ('.fit', '.fit.gz')
+ARCHIVE_SUFFIXES = ('.zip',)
+
+# Decompression happens READ_CHUNK bytes at a time; a single FIT stream larger
+# than MAX_FIT_BYTES is rejected instead of exhausting memory (zip bombs)
+READ_CHUNK = 1 << 20
+MAX_FIT_BYTES = int(os.environ.get("LUKSPEED_MAX_FIT_MB", "256")) * 1024 * 1024
+
+
+class FitSourceError(ValueError):
+    """Raised when a FIT source cannot be opened or exceeds the size limit"""
+
+
+def split_source(source):
+    """``archive.zip::member.fit`` -> (archive path, member); plain paths -> (path, None)"""
+    source = os.fspath(source)
+    archive, sep, member = source.partition(MEMBER_SEPARATOR)
+    if sep and archive.lower().endswith(ARCHIVE_SUFFIXES):
+        return archive, member
+    return source, None
+
+
+def is_fit_name(name):
+    return name.lower().endswith(FIT_SUFFIXES)
+
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def is_plain_file(source):
+    """True when the source can be opened (or memory-mapped) as is"""
+    path, member = split_source(source)
+    return member is None and not path.lower().endswith('.gz')
+
+
+@lru_cache(maxsize=4)
+def _open_zip(path, mtime_ns, pid):
+    # The central directory of a large export is parsed once per process, not
+    # once per member. Keyed by pid: a forked worker must not share the
+    # parent's file offset.
+    return zipfile.ZipFile(path)
+
+
+def _zip_archive(path):
+    return _open_zip(os.path.realpath(path), os.stat(path).st_mtime_ns, os.getpid())
+
+
+def archive_members(path):
+    """Sources of every FIT member of a zip archive, in archive order"""
+    try:
+        names = _zip_archive(path).namelist()
+    except zipfile.BadZipFile as e:
+        raise FitSourceError(f"{path}: {e}") from e
+    return [f"{path}{MEMBER_SEPARATOR}{name}" for name in names
+            if is_fit_name(name) and not name.endswith('/')
+            and not os.path.basename(name).startswith('._')]
+
+
+@contextlib.contextmanager
+def open_fit_stream(source):
+    """Binary stream of the decompressed FIT bytes of any supported source"""
+    path, member = split_source(source)
+    with contextlib.ExitStack() as stack:
+        if member is None:
+            stream = stack.enter_context(open(path, 'rb'))
+            name = path
+        else:
+            try:
+                stream = stack.enter_context(_zip_archive(path).open(member))
+            except (KeyError, zipfile.BadZipFile) as e:
+                raise FitSourceError(f"{source}: {e}") from e
+            name = member
+        if name.lower().endswith('.gz'):
+            stream = stack.enter_context(gzip.GzipFile(fileobj=stream, mode='rb'))
+        yield stream
+
+
+def read_fit_bytes(source, max_bytes=MAX_FIT_BYTES):
+    """Decompressed FIT bytes of a source, read in bounded chunks"""
+    data = bytearray()
+    try:
+        with open_fit_stream(source) as stream:
+            while True:
+                chunk = stream.read(READ_CHUNK)
+                if not chunk:
+                    break
+                data += chunk
+                if len(data) > max_bytes:
+                    raise FitSourceError(
+                        f"{source}: more than {max_bytes // (1024 * 1024)} MB of FIT data")
+    except (OSError, EOFError, zipfile.BadZipFile) as e:
+        # Truncated / corrupt gzip or zip streams
+        raise FitSourceError(f"{source}: {e}") from e
+    return data
+
+
+def expand_sources(paths):
+    """FIT sources of a list of files: .fit / .fit.gz as is, zips expanded to members"""
+    sources = []
+    for path in paths:
+        if is_archive(path):
+            sources.extend(archive_members(path))
+        elif is_fit_name(path):
+            sources.append(path)
+    return sources
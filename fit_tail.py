@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Incremental tail parsing for FIT files that are still being written
+Remembers the byte position, the local definitions and the last timestamp, and
+on every poll decodes only the newly appended messages into Activity rows while
+updating the analyze_fit_file_complete aggregates incrementally.
+Usage: python fit_tail.py FILE.fit [poll seconds]
+"""
+
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+import numpy as np
+
+from fit_activity import Activity
+from fit_decoder import (FIT_EPOCH_OFFSET, FitDecodeError, FitDecoder, ScanState,
+                         records_to_activity)
+from resample import GAP_SPLIT, GAP_ZERO, MAX_GAP_SECONDS, grid_index
+from rolling import NP_WINDOW, rolling_mean
+
+# Largest possible FIT message; more pending bytes than this means corruption
+MAX_MESSAGE_SIZE = 1 + 255 * 255
+
+
+class RunningAggregates:
+    """data_quality / metadata of analyze_fit_file_complete, updated per chunk"""
+
+    def __init__(self, gap_policy=GAP_SPLIT, max_gap=MAX_GAP_SECONDS):
+        self.gap_policy = gap_policy
+        self.max_gap = max_gap
+        self.total_records = 0
+        self.positive = {"power": 0, "speed": 0, "heart_rate": 0, "cadence": 0}
+        self.power_sum = 0.0
+        self.power_max = 0.0
+        self.speed_sum = 0.0
+        self.speed_max = 0.0
+        self.has_gps = False
+        self.has_elevation = False
+        self.has_aerosensor = False
+        # 1 Hz grid: last sample seen, grid seconds, timestamp step histogram
+        self._last_time = None
+        self._last_power = 0.0
+        self.elapsed_seconds = 0
+        self.recorded_seconds = 0
+        self.pauses = 0
+        self._step_counts = {}
+        # Normalized power: last 29 grid powers + running sum of window means^4
+        self._np_tail = np.zeros(0)
+        self._np_sum4 = 0.0
+        self._np_windows = 0
+        self._grid_power_sum = 0.0
+        self._grid_samples = 0
+
+    def update(self, rows, has_aerosensor=False):
+        self.total_records += len(rows)
+        for name in self.positive:
+            self.positive[name] += rows.positive_count(name)
+        self.has_gps |= rows.has_data('position_lat')
+        self.has_elevation |= rows.has_data('altitude')
+        self.has_aerosensor |= has_aerosensor
+
+        if 'power' in rows:
+            powers = rows.channels['power'][rows.masks['power'] & (rows.channels['power'] > 0)]
+            if len(powers):
+                self.power_sum += float(powers.sum())
+                self.power_max = max(self.power_max, float(powers.max()))
+        if 'speed' in rows:
+            speeds = rows.channels['speed'][rows.masks['speed'] & (rows.channels['speed'] > 0)]
+            if len(speeds):
+                self.speed_sum += float(speeds.sum())
+                self.speed_max = max(self.speed_max, float(speeds.max()))
+        self._update_grid(rows)
+
+    def _update_grid(self, rows):
+        valid = rows.mask('timestamp')
+        timestamps = rows.channels['timestamp'][valid] if valid.any() else np.zeros(0, np.int64)
+        powers = rows.channel('power', 0)[valid].astype(np.float64)
+        if self._last_time is not None:
+            # The previous sample opens the grid; its own second is already counted
+            timestamps = np.concatenate([[self._last_time], timestamps])
+            powers = np.concatenate([[self._last_power], powers])
+        if len(timestamps) == 0:
+            return
+        # A live file is written in time order; stray out-of-order samples are dropped
+        ordered = timestamps >= np.maximum.accumulate(timestamps)
+        timestamps, powers = timestamps[ordered], powers[ordered]
+        skip = 0 if self._last_time is None else 1
+        self._last_time = int(timestamps[-1])
+        self._last_power = float(powers[-1])
+
+        steps = np.diff(timestamps)
+        values, counts = np.unique(steps[steps > 0], return_counts=True)
+        for step, count in zip(values.tolist(), counts.tolist()):
+            self._step_counts[step] = self._step_counts.get(step, 0) + count
+        self.pauses += int(np.count_nonzero(steps > self.max_gap))
+
+        grid, source, pause = grid_index(timestamps, self.max_gap)
+        grid_powers = powers[source][skip:]
+        pause = pause[skip:]
+        self.elapsed_seconds += len(grid_powers)
+        self.recorded_seconds += int(len(grid_powers) - np.count_nonzero(pause))
+        if self.gap_policy == GAP_ZERO:
+            grid_powers = np.where(pause, 0.0, grid_powers)
+        if self.gap_policy != GAP_SPLIT:
+            self._update_np(grid_powers)
+            return
+        edges = np.diff(np.concatenate([[True], pause, [True]]).astype(np.int8))
+        for start, stop in zip(np.flatnonzero(edges == -1), np.flatnonzero(edges == 1)):
+            if start > 0:
+                # A pause ended the previous block; NP windows restart
+                self._np_tail = np.zeros(0)
+            self._update_np(grid_powers[start:stop])
+
+    def _update_np(self, powers):
+        # Every 30-sample window that was not complete before ends in the new chunk
+        self._grid_power_sum += float(powers.sum())
+        self._grid_samples += len(powers)
+        combined = np.concatenate([self._np_tail, powers])
+        means = rolling_mean(combined, NP_WINDOW)
+        if len(means):
+            self._np_sum4 += float(np.sum(means ** 4))
+            self._np_windows += len(means)
+        self._np_tail = combined[-(NP_WINDOW - 1):]
+
+    @property
+    def native_sample_rate(self):
+        """Recording rate in Hz from the median timestamp step seen so far"""
+        if not self._step_counts:
+            return None
+        steps = np.array(sorted(self._step_counts))
+        cumulative = np.cumsum([self._step_counts[step] for step in steps])
+        total = cumulative[-1]
+        # Same as np.median over every step: mean of the two middle values
+        lower = steps[np.searchsorted(cumulative, (total - 1) // 2 + 1)]
+        upper = steps[np.searchsorted(cumulative, total // 2 + 1)]
+        return 1.0 / ((lower + upper) / 2)
+
+    @property
+    def normalized_power(self):
+        if self.positive["power"] == 0 or self._grid_samples == 0:
+            return None
+        if self._np_windows == 0:
+            return self._grid_power_sum / self._grid_samples
+        return (self._np_sum4 / self._np_windows) ** 0.25
+
+    @property
+    def data_quality(self):
+        total = self.total_records
+        if total == 0:
+            return {}
+        rate = self.native_sample_rate
+        return {
+            "total_records": total,
+            "power_coverage": self.positive["power"] / total,
+            "speed_coverage": self.positive["speed"] / total,
+            "hr_coverage": self.positive["heart_rate"] / total,
+            "cadence_coverage": self.positive["cadence"] / total,
+            "duration_minutes": self.recorded_seconds / 60,
+            "elapsed_minutes": self.elapsed_seconds / 60,
+            "native_sample_rate_hz": rate,
+            "smart_recording": rate is not None and rate < 1.0,
+            "pauses": self.pauses,
+            "gap_policy": self.gap_policy,
+            "has_power": self.positive["power"] > 0,
+            "has_speed": self.positive["speed"] > 0,
+            "has_gps": self.has_gps,
+            "has_elevation": self.has_elevation,
+            "has_aerosensor": self.has_aerosensor
+        }
+
+    @property
+    def metadata(self):
+        metadata = {}
+        if self.positive["power"]:
+            metadata["avg_power"] = self.power_sum / self.positive["power"]
+            metadata["max_power"] = self.power_max
+            metadata["normalized_power"] = self.normalized_power
+        if self.positive["speed"]:
+            avg_speed = self.speed_sum / self.positive["speed"]
+            metadata["avg_speed_ms"] = avg_speed
+            metadata["avg_speed_kmh"] = avg_speed * 3.6
+            metadata["max_speed_kmh"] = self.speed_max * 3.6
+        return metadata
+
+
+class FitTail(FitDecoder):
+    """FitDecoder that follows a growing FIT file, one poll at a time"""
+
+    def __init__(self, path, fields=None):
+        self.path = os.fspath(path)
+        self.fields = fields
+        self.finished = False
+        self.chunks = []
+        self.aggregates = RunningAggregates()
+        self._file = open(self.path, 'rb')
+        self._mapped_size = 0
+        self._pos = None
+        self._state = ScanState()
+        self._last_timestamp = -1
+        super().__init__(b'')
+
+    def _scan(self):
+        # Nothing is read up front; poll() indexes the file as it grows
+        self.index_offsets = np.zeros(0, np.int64)
+        self.index_definitions = np.zeros(0, np.int32)
+        self.index_time_offsets = np.zeros(0, np.int8)
+        self._timestamps = np.zeros(0, np.int64)
+
+    def _remap(self, size):
+        self._unmap()
+        self.data = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        self.buffer = np.frombuffer(self.data, dtype=np.uint8)
+        self._mapped_size = size
+
+    def _unmap(self):
+        """Release the buffer view, then close the previous mapping"""
+        old, self.data, self.buffer = self.data, b'', np.zeros(0, np.uint8)
+        if isinstance(old, mmap.mmap):
+            try:
+                old.close()
+            except BufferError:
+                pass  # a caller still holds a view into it; freed with that view
+
+    def poll(self):
+        """Decode the records appended since the last poll (None when there are none)"""
+        if self.finished:
+            return None
+        size = os.fstat(self._file.fileno()).st_size
+        grown = size > self._mapped_size
+        if grown:
+            self._remap(size)
+        elif self._pos is None:
+            return None
+        size = self._mapped_size
+        data = self.data
+
+        if self._pos is None:
+            if size < 12 or size < data[0]:
+                return None
+            if data[8:12] != b'.FIT':
+                raise FitDecodeError("Not a FIT file (missing .FIT signature)")
+            self._pos = data[0]
+
+        # Writers leave data_size at 0 (or stale) until the file is closed
+        header_size = data[0]
+        data_size = struct.unpack_from('<I', data, 4)[0]
+        complete = bool(data_size) and header_size + data_size + 2 <= size
+        if not grown and not complete:
+            return None  # the header rewrite on close does not grow the file, so check it every poll
+        end = header_size + data_size if complete else size
+
+        offsets = array('q')
+        def_ids = array('i')
+        time_offsets = array('b')
+        pos = self._scan_messages(self._pos, end, self._state, offsets, def_ids,
+                                  time_offsets, strict=False)
+        if pos == self._pos and end - pos > MAX_MESSAGE_SIZE:
+            raise FitDecodeError(f"Undecodable data at byte {pos} of growing FIT file")
+        self._pos = pos
+        self.finished = complete and pos >= end
+
+        start = len(self.index_offsets)
+        self.index_offsets = np.concatenate([self.index_offsets, np.frombuffer(offsets, dtype=np.int64)])
+        self.index_definitions = np.concatenate([self.index_definitions, np.frombuffer(def_ids, dtype=np.int32)])
+        self.index_time_offsets = np.concatenate([self.index_time_offsets, np.frombuffer(time_offsets, dtype=np.int8)])
+        stop = len(self.index_offsets)
+        if stop == start:
+            return None
+
+        stamps, self._last_timestamp = self._resolve_timestamps(start, stop, self._last_timestamp)
+        stamps[stamps >= 0] += FIT_EPOCH_OFFSET
+        self._timestamps = np.concatenate([self._timestamps, stamps])
+
+        records = self.decode(['record'], self.fields, positions=np.arange(start, stop)).get('record')
+        if records is None:
+            return None
+        rows = records_to_activity(records)
+        for name, values in rows.channels.items():
+            # Chunks outlive this mapping: detach any zero-copy view on the file bytes
+            if values.base is not None:
+                rows.channels[name] = values.copy()
+        rows.available_fields = set(self.field_names('record'))
+        has_aerosensor = any(name.startswith('aero_') for name in rows.channel_names)
+        self.chunks.append(rows)
+        self.aggregates.update(rows, has_aerosensor)
+        return rows
+
+    @property
+    def activity(self):
+        """Every record decoded so far, with the running aggregates attached"""
+        activity = Activity.concat(self.chunks)
+        activity.data_quality = self.aggregates.data_quality
+        activity.metadata.update(self.aggregates.metadata)
+        return activity
+
+    def close(self):
+        self._unmap()
+        self._file.close()
+
+
+def follow(path, interval=1.0):
+    """Print live aggregates while a FIT file is being written"""
+    print(f"📡 Siguiendo {path} (Ctrl+C para salir)")
+    tail = FitTail(path)
+    try:
+        while not tail.finished:
+            rows = tail.poll()
+            if rows is not None:
+                quality = tail.aggregates.data_quality
+                metadata = tail.aggregates.metadata
+                print(f"⏱️ +{len(rows)} registros | total {quality['total_records']:,} | "
+                      f"potencia {quality['power_coverage']:.0%} | "
+                      f"avg {metadata.get('avg_power', 0):.0f}W | "
+                      f"max {metadata.get('max_power', 0):.0f}W | "
+                      f"NP {metadata.get('normalized_power') or 0:.0f}W")
+            else:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tail.close()
+    print("✅ Archivo FIT completo" if tail.finished else "⏹️ Seguimiento detenido")
+    return tail
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        sys.exit(1)
+    follow(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 1.0)
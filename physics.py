@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Vectorized cycling power model for LukSpeed
+Splits power into aerodynamic, rolling-resistance, gravitational and kinetic
+(acceleration) components for whole columnar channels in one broadcasted
+pass, and scores the modelled total against the measured power on the same
+arrays. Air density is a per-sample channel from temperature and altitude
+(barometric formula, optional humidity) instead of a sea-level constant.
+Formulas follow PhysicalPowerService.ts / validate_physical_power.py.
+"""
+
+import numpy as np
+
+from resample import MAX_GAP_SECONDS
+from rolling import centered_mean
+
+GRAVITY = 9.81          # m/s²
+AIR_DENSITY = 1.225     # kg/m³ at sea level, 15°C
+RIDER_MASS = 75         # kg (typical)
+BIKE_MASS = 8           # kg (typical road bike)
+TOTAL_MASS = RIDER_MASS + BIKE_MASS
+DEFAULT_CDA = 0.3       # m², default estimate without Aerosensor
+DEFAULT_CRR = 0.005     # typical road tire
+KMH_THRESHOLD = 50      # speeds at or above this are taken as km/h
+
+# Inertia: P_kinetic = (m + I/r²)·a·v
+WHEEL_INERTIA = 0.14    # kg·m², both road wheels with tires
+WHEEL_RADIUS = 0.335    # m, 700x25c
+SPEED_SMOOTHING = 5     # samples, centered moving average before differentiating
+
+# Air density (ideal gas + Magnus vapour pressure, as calculateAirDensity)
+AIR_GAS_CONSTANT = 287.058      # J/(kg·K), dry air
+VAPOR_GAS_CONSTANT = 461.495    # J/(kg·K), water vapour
+SEA_LEVEL_PRESSURE = 101325     # Pa
+SEA_LEVEL_TEMPERATURE = 288.15  # K, standard atmosphere
+LAPSE_RATE = 0.0065             # K/m, standard atmosphere
+BAROMETRIC_EXPONENT = 5.25588   # g·M / (R·L)
+DEFAULT_TEMPERATURE = 20        # °C when the file has no temperature
+DENSITY_BOUNDS = (0.8, 1.3)     # kg/m³, realistic range
+
+COMPONENTS = ["power_aero", "power_rr", "power_gravity", "power_kinetic"]
+
+
+def speed_to_ms(speeds):
+    """Speed in m/s; values >= KMH_THRESHOLD are assumed to be km/h"""
+    speeds = np.asarray(speeds, dtype=np.float64)
+    return np.where(speeds < KMH_THRESHOLD, speeds, speeds / 3.6)
+
+
+def slope_terms(grades):
+    """cos(θ) and sin(θ) of a grade (rise / run, decimal) without trigonometry"""
+    grades = np.asarray(grades, dtype=np.float64)
+    hypotenuse = np.sqrt(1.0 + grades * grades)
+    return 1.0 / hypotenuse, grades / hypotenuse
+
+
+def pressure_at_altitude(altitude_m, sea_level_pressure=SEA_LEVEL_PRESSURE):
+    """Barometric formula (standard atmosphere troposphere), Pa"""
+    altitude_m = np.asarray(altitude_m, dtype=np.float64)
+    return sea_level_pressure * (1.0 - LAPSE_RATE * altitude_m / SEA_LEVEL_TEMPERATURE) ** BAROMETRIC_EXPONENT
+
+
+def air_density(temperature_c, altitude_m=0.0, humidity=None, pressure_pa=None):
+    """Air density (kg/m³) per sample; humidity in % (None: dry air)
+
+    ``pressure_pa`` (measured) takes precedence over the pressure derived from
+    ``altitude_m``. Clamped to DENSITY_BOUNDS like calculateAirDensity.
+    """
+    temperature_c = np.asarray(temperature_c, dtype=np.float64)
+    pressure = pressure_at_altitude(altitude_m) if pressure_pa is None else \
+        np.asarray(pressure_pa, dtype=np.float64)
+    kelvin = temperature_c + 273.15
+    if humidity is None:
+        density = pressure / (AIR_GAS_CONSTANT * kelvin)
+    else:
+        saturation = 610.78 * np.exp(17.27 * temperature_c / (temperature_c + 237.3))
+        vapor = np.asarray(humidity, dtype=np.float64) / 100 * saturation
+        density = (pressure - vapor) / (AIR_GAS_CONSTANT * kelvin) + vapor / (VAPOR_GAS_CONSTANT * kelvin)
+    return np.clip(density, *DENSITY_BOUNDS)
+
+
+def density_channel(activity, humidity=None):
+    """Per-sample "air_density" channel of an activity, computed once and stored on it
+
+    Measured density (Aerosensor ``aero_air_density``) wins where valid;
+    elsewhere it comes from the temperature and altitude channels (FIT or
+    LukSpeed names), with DEFAULT_TEMPERATURE / sea level where missing.
+    Without ``humidity`` the stored channel is reused; passing it always
+    recomputes and replaces the channel.
+    """
+    if "air_density" in activity.channels and humidity is None:
+        return activity.channels["air_density"]
+    temperature = activity.channel("temperature", DEFAULT_TEMPERATURE).astype(np.float64)
+    altitude = next((activity.channel(name, 0) for name in ("elevation", "enhanced_altitude", "altitude")
+                     if activity.has_data(name)), np.zeros(len(activity)))
+    density = air_density(temperature, altitude, humidity)
+    if activity.has_data("aero_air_density"):
+        measured = activity.channel("aero_air_density", 0).astype(np.float64)
+        density = np.where(activity.mask("aero_air_density") & (measured > 0), measured, density)
+    activity.set_channel("air_density", density)
+    return activity.channels["air_density"]
+
+
+def acceleration(speed_ms, timestamps, smoothing=SPEED_SMOOTHING, max_gap=MAX_GAP_SECONDS):
+    """Smoothed speed derivative (m/s²) over time-ordered samples
+
+    Centered moving average of ``smoothing`` samples, then a central
+    difference in time (one-sided at both ends). Steps with no elapsed time or
+    spanning a pause (more than ``max_gap`` s per sample) read as 0.
+    """
+    speeds = centered_mean(speed_ms, smoothing) if smoothing > 1 else \
+        np.asarray(speed_ms, dtype=np.float64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    n = len(speeds)
+    if n < 2:
+        return np.zeros(n)
+    index = np.arange(n)
+    before = np.maximum(index - 1, 0)
+    after = np.minimum(index + 1, n - 1)
+    dt = timestamps[after] - timestamps[before]
+    steady = (dt > 0) & (dt <= max_gap * (after - before))
+    return np.divide(speeds[after] - speeds[before], dt, out=np.zeros(n), where=steady)
+
+
+def effective_mass(mass=TOTAL_MASS, wheel_inertia=0.0, wheel_radius=WHEEL_RADIUS):
+    """Translational mass plus the rotational inertia of the wheels, I/r²"""
+    return mass + wheel_inertia / (wheel_radius * wheel_radius)
+
+
+def power_components(speed_ms, grade, cda=DEFAULT_CDA, crr=DEFAULT_CRR,
+                     mass=TOTAL_MASS, air_density=AIR_DENSITY, accel=None, wheel_inertia=0.0):
+    """Aero / rolling / gravity / kinetic power arrays (W); every argument may be a scalar or an array
+
+    P_aero = 0.5·ρ·CdA·v³, P_rr = Crr·m·g·v·cos(θ), P_gravity = m·g·v·sin(θ)
+    with θ = atan(grade) and grade as a decimal, and
+    P_kinetic = (m + I/r²)·a·v (0 without ``accel``).
+    """
+    v = np.asarray(speed_ms, dtype=np.float64)
+    cos_theta, sin_theta = slope_terms(grade)
+    weight = np.multiply(mass, GRAVITY) * v
+    if accel is None:
+        kinetic = np.zeros_like(weight)
+    else:
+        kinetic = effective_mass(mass, wheel_inertia) * np.asarray(accel, dtype=np.float64) * v
+    return {
+        "power_aero": 0.5 * np.multiply(air_density, cda) * v * v * v,
+        "power_rr": np.multiply(crr, weight) * cos_theta,
+        "power_gravity": weight * sin_theta,
+        "power_kinetic": kinetic,
+    }
+
+
+def total_power(components):
+    return sum(components[name] for name in components)
+
+
+def validation_stats(calculated, measured):
+    """Error statistics of modelled vs. measured power, or {} without samples"""
+    calculated = np.asarray(calculated, dtype=np.float64)
+    measured = np.asarray(measured, dtype=np.float64)
+    if len(calculated) == 0:
+        return {}
+    errors = np.abs(calculated - measured)
+    return {
+        "mean_absolute_error_watts": float(np.mean(errors)),
+        "max_error_watts": float(np.max(errors)),
+        "rmse_watts": float(np.sqrt(np.mean(errors * errors))),
+        "points_within_5w": np.count_nonzero(errors < 5) / len(errors) * 100,
+        "points_within_10w": np.count_nonzero(errors < 10) / len(errors) * 100,
+        "points_within_20w": np.count_nonzero(errors < 20) / len(errors) * 100,
+        "correlation_coefficient": float(np.corrcoef(calculated, measured)[0, 1])
+        if len(errors) > 1 else float("nan"),
+    }
+
+
+def forward_fill(values, valid):
+    """Last valid value at or before every sample (NaN before the first one)"""
+    values = np.asarray(values, dtype=np.float64)
+    index = np.where(valid, np.arange(len(values)), -1)
+    np.maximum.accumulate(index, out=index)
+    filled = values[np.maximum(index, 0)]
+    filled[index < 0] = np.nan
+    return filled
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Mean-maximal power (MMP) curve for LukSpeed
+Best average power for every requested duration, with the start of each best
+effort, from prefix sums over the 1 Hz power grid: O(n) per duration. The
+default durations are every second up to 10 minutes and then 100 log-spaced
+steps per decade (~2.3 % apart) up to the ride length; pass
+``np.arange(1, n + 1)`` for every single duration.
+Usage: python power_curve.py FILE.fit [...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from fit_decoder import decode_activity
+from resample import GAP_SPLIT, resample_1hz, timestamp_order
+
+LINEAR_UNTIL = 600          # seconds computed one by one
+STEPS_PER_DECADE = 100      # log spacing beyond LINEAR_UNTIL (~2.3 % apart)
+STANDARD_DURATIONS = [1, 5, 10, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200]
+
+
+def dense_durations(max_duration, linear_until=LINEAR_UNTIL, steps_per_decade=STEPS_PER_DECADE):
+    """Every second up to ``linear_until``, log-spaced seconds after, always ending at max_duration"""
+    max_duration = int(max_duration)
+    if max_duration < 1:
+        return np.zeros(0, dtype=np.int64)
+    linear = np.arange(1, min(linear_until, max_duration) + 1)
+    if max_duration <= linear_until:
+        return linear.astype(np.int64)
+    decades = np.log10(max_duration / linear_until)
+    count = int(np.ceil(decades * steps_per_decade)) + 1
+    spaced = np.round(linear_until * np.logspace(0, decades, count)).astype(np.int64)
+    return np.unique(np.concatenate([linear, spaced, [max_duration]])).astype(np.int64)
+
+
+def mean_max_power(powers, durations=None, block_stops=None):
+    """(durations, best average power, start index) over a 1 Hz series
+
+    ``block_stops[i]`` is the end (exclusive) of the block sample ``i``
+    belongs to; efforts never cross a block end. Durations longer than the
+    longest block are dropped. Ties keep the earliest effort.
+    """
+    powers = np.asarray(powers, dtype=np.float64)
+    n = len(powers)
+    if block_stops is None:
+        longest = n
+    else:
+        block_stops = np.asarray(block_stops, dtype=np.int64)
+        longest = int(np.max(block_stops - np.arange(n))) if n else 0
+    durations = dense_durations(longest) if durations is None else np.unique(np.asarray(durations, dtype=np.int64))
+    durations = durations[(durations >= 1) & (durations <= longest)]
+    prefix = np.empty(n + 1)
+    prefix[0] = 0.0
+    np.cumsum(powers, out=prefix[1:])
+    # Room left in the block after each start: a window fits when duration <= room
+    room = None if block_stops is None else block_stops - np.arange(n)
+
+    best = np.empty(len(durations))
+    starts = np.empty(len(durations), dtype=np.int64)
+    for k, duration in enumerate(durations.tolist()):
+        sums = prefix[duration:] - prefix[:-duration]
+        if room is not None:
+            sums[room[:len(sums)] < duration] = -np.inf
+        start = int(np.argmax(sums))
+        starts[k] = start
+        best[k] = sums[start] / duration
+    return durations, best, starts
+
+
+def activity_power_curve(activity, durations=None, gap_policy=GAP_SPLIT, channel="power"):
+    """MMP curve of an Activity on its 1 Hz grid
+
+    Efforts never span a pause (split policy by default); missing power
+    counts as 0. Each best effort is located by its start timestamp and by
+    the index of the activity record it starts at, for highlighting.
+    """
+    blocks = resample_1hz(activity, gap_policy, channels=[channel])
+    if blocks:
+        powers = np.concatenate([block.channel(channel, 0) for block in blocks])
+        grid = np.concatenate([block.channels["timestamp"] for block in blocks])
+        lengths = [len(block) for block in blocks]
+        block_stops = np.repeat(np.cumsum(lengths), lengths)
+    else:
+        powers = grid = block_stops = np.zeros(0, dtype=np.int64)
+    durations, best, starts = mean_max_power(powers, durations, block_stops)
+
+    start_times = grid[starts]
+    rows, timestamps = timestamp_order(activity)
+    # The record each start second was resampled from (last one at or before it)
+    start_rows = rows[np.searchsorted(timestamps, start_times, side='right') - 1] if len(rows) else starts
+    return {
+        "duration_s": durations,
+        "power_w": best,
+        "start_time": start_times,
+        "start_index": start_rows,
+    }
+
+
+def main(paths):
+    print("⚡ LukSpeed - Curva de potencia media máxima (MMP)")
+    print("=" * 60)
+    for path in paths:
+        activity = decode_activity(path, fields=['timestamp', 'power'])
+        start = time.perf_counter()
+        curve = activity_power_curve(activity)
+        elapsed = time.perf_counter() - start
+        print(f"\n📁 {path}: {len(activity):,} registros, {len(curve['duration_s'])} duraciones "
+              f"en {elapsed*1000:.1f} ms")
+        durations = curve["duration_s"].tolist()
+        for duration in STANDARD_DURATIONS:
+            if duration in durations:
+                k = durations.index(duration)
+                print(f"   {duration:>5d}s: {curve['power_w'][k]:6.1f} W "
+                      f"(inicio registro {curve['start_index'][k]:,})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        sys.exit(1)
+    main(sys.argv[1:])
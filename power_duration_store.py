@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Per-athlete power-duration store for LukSpeed
+Each activity's MMP curve is stored once, on a fixed duration grid, and the
+merged envelopes (all-time, per year, rolling 42/90 days) are kept up to date
+with an element-wise max when activities are added. A deletion only recomputes
+the envelopes whose window contained the activity. Every envelope keeps the
+activity and start time of each best effort, so a dashboard query such as
+"best 5-min power in the last 90 days" is a single array lookup.
+Usage:
+  python power_duration_store.py ROOT ATHLETE add FILE.fit [...]
+  python power_duration_store.py ROOT ATHLETE remove ACTIVITY_ID [...]
+  python power_duration_store.py ROOT ATHLETE best SECONDS [all|YEAR|42d|90d]
+"""
+
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from fit_activity import json_default
+from fit_decoder import decode_activity
+from power_curve import STANDARD_DURATIONS, activity_power_curve, dense_durations
+
+MAX_DURATION = 12 * 3600
+# Shared duration grid of every stored curve (standard durations always on it)
+CANONICAL_DURATIONS = np.union1d(dense_durations(MAX_DURATION), STANDARD_DURATIONS).astype(np.int64)
+DURATION_INDEX = {duration: k for k, duration in enumerate(CANONICAL_DURATIONS.tolist())}
+ROLLING_WINDOWS = (42, 90)
+STORE_FORMAT = 1
+
+
+def utc_date(epoch_seconds):
+    return datetime.fromtimestamp(int(epoch_seconds), tz=timezone.utc).date()
+
+
+def today():
+    return datetime.now(timezone.utc).date()
+
+
+class Envelope:
+    """Element-wise best of several curves, with the source of every point"""
+
+    def __init__(self, size=len(CANONICAL_DURATIONS)):
+        self.power = np.full(size, np.nan)
+        self.activity = np.full(size, -1, dtype=np.int64)      # activity sequence number
+        self.start_time = np.zeros(size, dtype=np.int64)       # effort start (epoch s)
+
+    def merge(self, power, activity, start_time):
+        """Fold one curve in (NaN = duration not reached); ties keep the older effort"""
+        better = power > self.power
+        better |= np.isnan(self.power) & ~np.isnan(power)
+        self.power[better] = power[better]
+        self.activity[better] = activity
+        self.start_time[better] = start_time[better]
+        return self
+
+    def merge_envelope(self, other):
+        better = other.power > self.power
+        better |= np.isnan(self.power) & ~np.isnan(other.power)
+        self.power[better] = other.power[better]
+        self.activity[better] = other.activity[better]
+        self.start_time[better] = other.start_time[better]
+        return self
+
+    def arrays(self, prefix):
+        return {f"{prefix}power": self.power, f"{prefix}activity": self.activity,
+                f"{prefix}start_time": self.start_time}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        envelope = cls(len(arrays[f"{prefix}power"]))
+        envelope.power = arrays[f"{prefix}power"]
+        envelope.activity = arrays[f"{prefix}activity"]
+        envelope.start_time = arrays[f"{prefix}start_time"]
+        return envelope
+
+
+class PowerDurationStore:
+    """<root>/<athlete>/: index.json, curves/<seq>.npz and envelopes.npz"""
+
+    def __init__(self, root, athlete_id):
+        self.directory = os.path.join(root, str(athlete_id))
+        self.curves_dir = os.path.join(self.directory, "curves")
+        os.makedirs(self.curves_dir, exist_ok=True)
+        self.activities = {}        # activity_id -> {"seq", "start_time", "date"}
+        self._ids = {}              # seq -> activity_id
+        self.next_seq = 0
+        self.all_time = Envelope()
+        self.years = {}             # year -> Envelope
+        self.rolling = {}           # days -> (as_of date, Envelope), as of today (UTC)
+        self._load()
+        self._roll_to(today())
+
+    # ------------------------------------------------------------ persistence
+
+    def _index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _envelopes_path(self):
+        return os.path.join(self.directory, "envelopes.npz")
+
+    def _curve_path(self, seq):
+        return os.path.join(self.curves_dir, f"{seq}.npz")
+
+    def _load(self):
+        try:
+            with open(self._index_path()) as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return
+        self.activities = index["activities"]
+        self._ids = {entry["seq"]: activity_id for activity_id, entry in self.activities.items()}
+        self.next_seq = index["next_seq"]
+        try:
+            with np.load(self._envelopes_path(), allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+        except OSError:
+            self.rebuild()
+            return
+        header = json.loads(arrays.pop("__header__").tobytes().decode("utf-8"))
+        if header.get("format") != STORE_FORMAT or \
+                header.get("durations") != CANONICAL_DURATIONS.tolist():
+            self.rebuild()
+            return
+        self.all_time = Envelope.from_arrays(arrays, "all_")
+        self.years = {int(year): Envelope.from_arrays(arrays, f"year{year}_")
+                      for year in header["years"]}
+        self.rolling = {int(days): (date.fromisoformat(as_of),
+                                    Envelope.from_arrays(arrays, f"rolling{days}_"))
+                        for days, as_of in header["rolling"].items() if int(days) in ROLLING_WINDOWS}
+
+    def save(self):
+        """Write the index and the merged envelopes (atomic replace)"""
+        index = {"format": STORE_FORMAT, "activities": self.activities, "next_seq": self.next_seq}
+        tmp_path = f"{self._index_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, default=json_default)
+        os.replace(tmp_path, self._index_path())
+
+        header = {
+            "format": STORE_FORMAT,
+            "durations": CANONICAL_DURATIONS.tolist(),
+            "years": sorted(self.years),
+            "rolling": {str(days): as_of.isoformat() for days, (as_of, _) in self.rolling.items()},
+        }
+        arrays = self.all_time.arrays("all_")
+        for year, envelope in self.years.items():
+            arrays.update(envelope.arrays(f"year{year}_"))
+        for days, (_, envelope) in self.rolling.items():
+            arrays.update(envelope.arrays(f"rolling{days}_"))
+        payload = np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8)
+        tmp_path = f"{self._envelopes_path()}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, __header__=payload, **arrays)
+        os.replace(tmp_path, self._envelopes_path())
+
+    def _read_curve(self, seq):
+        with np.load(self._curve_path(seq), allow_pickle=False) as npz:
+            return npz["power"], npz["start_time"]
+
+    # --------------------------------------------------------------- updates
+
+    def add_activity(self, activity_id, activity):
+        """Compute and store the MMP curve of an Activity"""
+        curve = activity_power_curve(activity, CANONICAL_DURATIONS)
+        stamps = activity.channels["timestamp"][activity.mask("timestamp")] \
+            if "timestamp" in activity else np.zeros(0, dtype=np.int64)
+        if len(stamps) == 0:
+            raise ValueError(f"Activity {activity_id} has no timestamps")
+        power = np.full(len(CANONICAL_DURATIONS), np.nan)
+        start_time = np.zeros(len(CANONICAL_DURATIONS), dtype=np.int64)
+        found = np.searchsorted(CANONICAL_DURATIONS, curve["duration_s"])
+        power[found] = curve["power_w"]
+        start_time[found] = curve["start_time"]
+        return self.add_curve(activity_id, int(stamps.min()), power, start_time)
+
+    def add_curve(self, activity_id, activity_start, power, start_time):
+        """Store one curve (on CANONICAL_DURATIONS) and merge it into the envelopes"""
+        activity_id = str(activity_id)
+        if activity_id in self.activities:
+            self.remove(activity_id, save=False)
+        seq = self.next_seq
+        self.next_seq += 1
+        day = utc_date(activity_start)
+        np.savez(self._curve_path(seq), power=power, start_time=start_time)
+        self.activities[activity_id] = {"seq": seq, "start_time": int(activity_start),
+                                        "date": day.isoformat()}
+        self._ids[seq] = activity_id
+
+        self._roll_to(today())
+        self.all_time.merge(power, seq, start_time)
+        self.years.setdefault(day.year, Envelope()).merge(power, seq, start_time)
+        for days, (as_of, envelope) in self.rolling.items():
+            if as_of - timedelta(days=days) < day <= as_of:
+                envelope.merge(power, seq, start_time)
+        self.save()
+        return seq
+
+    def remove(self, activity_id, save=True):
+        """Delete an activity; only the envelopes that contained it are recomputed"""
+        self._roll_to(today())
+        entry = self.activities.pop(str(activity_id))
+        del self._ids[entry["seq"]]
+        try:
+            os.remove(self._curve_path(entry["seq"]))
+        except FileNotFoundError:
+            pass
+        day = date.fromisoformat(entry["date"])
+        self.years[day.year] = self._merge_curves(
+            e for e in self.activities.values() if date.fromisoformat(e["date"]).year == day.year)
+        if np.isnan(self.years[day.year].power).all():
+            del self.years[day.year]
+        self.all_time = Envelope()
+        for envelope in self.years.values():
+            self.all_time.merge_envelope(envelope)
+        for days, (as_of, _) in list(self.rolling.items()):
+            if as_of - timedelta(days=days) < day <= as_of:
+                self.rolling[days] = (as_of, self._window_envelope(days, as_of))
+        if save:
+            self.save()
+
+    def rebuild(self):
+        """Recompute every envelope from the stored curves"""
+        self.years = {}
+        for entry in self.activities.values():
+            year = date.fromisoformat(entry["date"]).year
+            self.years[year] = self._merge_curves([entry], self.years.get(year))
+        self.all_time = Envelope()
+        for envelope in self.years.values():
+            self.all_time.merge_envelope(envelope)
+        self.rolling = {}
+        self._roll_to(today())
+
+    def _roll_to(self, as_of):
+        """Move the ROLLING_WINDOWS envelopes to ``as_of`` (a no-op on the same day)"""
+        for days in ROLLING_WINDOWS:
+            cached = self.rolling.get(days)
+            if cached is None or cached[0] != as_of:
+                self.rolling[days] = (as_of, self._window_envelope(days, as_of))
+
+    def _merge_curves(self, entries, envelope=None):
+        envelope = envelope or Envelope()
+        for entry in entries:
+            power, start_time = self._read_curve(entry["seq"])
+            envelope.merge(power, entry["seq"], start_time)
+        return envelope
+
+    def _window_envelope(self, days, as_of):
+        first = as_of - timedelta(days=days)
+        return self._merge_curves(
+            e for e in self.activities.values() if first < date.fromisoformat(e["date"]) <= as_of)
+
+    # --------------------------------------------------------------- queries
+
+    def envelope(self, window="all", as_of=None):
+        """Merged curve: "all", a year (int), or a rolling "42d" / "90d" window
+
+        ROLLING_WINDOWS ending today are kept up to date by add / remove; other
+        windows or dates are merged from their curves on the fly (never saved).
+        """
+        if window == "all":
+            return self.all_time
+        if isinstance(window, int):
+            return self.years.get(window) or Envelope()
+        days = int(str(window).rstrip("d"))
+        as_of = as_of or today()
+        if days not in ROLLING_WINDOWS:
+            return self._window_envelope(days, as_of)
+        if as_of == today():
+            self._roll_to(as_of)    # a new day since the last update: moved in memory once
+        if self.rolling[days][0] != as_of:
+            return self._window_envelope(days, as_of)
+        return self.rolling[days][1]
+
+    def best(self, duration, window="all", as_of=None):
+        """Best effort for one duration (seconds on CANONICAL_DURATIONS), or None"""
+        if duration not in DURATION_INDEX:
+            raise ValueError(f"{duration}s is not on the stored duration grid")
+        k = DURATION_INDEX[duration]
+        envelope = self.envelope(window, as_of)
+        if np.isnan(envelope.power[k]):
+            return None
+        return {"duration_s": int(duration), "power_w": float(envelope.power[k]),
+                "activity_id": self._ids.get(int(envelope.activity[k])),
+                "start_time": int(envelope.start_time[k])}
+
+
+def main(argv):
+    if len(argv) < 3:
+        print(__doc__.strip())
+        return 1
+    root, athlete, command, args = argv[0], argv[1], argv[2], argv[3:]
+    store = PowerDurationStore(root, athlete)
+    if command == "add":
+        for path in args:
+            activity_id = os.path.splitext(os.path.basename(path))[0]
+            store.add_activity(activity_id, decode_activity(path, fields=['timestamp', 'power']))
+            print(f"✅ {activity_id} añadido")
+    elif command == "remove":
+        for activity_id in args:
+            store.remove(activity_id)
+            print(f"🗑️ {activity_id} eliminado")
+    elif command == "best":
+        window = args[1] if len(args) > 1 else "all"
+        window = int(window) if window.isdigit() else window
+        print(json.dumps(store.best(int(args[0]), window), indent=2))
+    else:
+        print(__doc__.strip())
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
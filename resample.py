@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+1 Hz resampling for LukSpeed activities
+Puts any activity (1 Hz, Garmin smart recording, paused rides) on a uniform
+1 Hz grid from its timestamps in one vectorized pass, so windowed metrics and
+durations no longer assume one record per second. Holes up to MAX_GAP_SECONDS
+are smart-recording spacing and hold the last sample; longer holes are pauses
+and follow the gap policy: zero-fill, hold, or split into separate blocks.
+"""
+
+import numpy as np
+
+from fit_activity import Activity
+from rolling import NP_WINDOW, rolling_mean
+
+GAP_ZERO = "zero"       # pauses become missing samples that read as 0
+GAP_HOLD = "hold"       # pauses repeat the last sample
+GAP_SPLIT = "split"     # pauses end the block; windows never span them
+GAP_POLICIES = (GAP_ZERO, GAP_HOLD, GAP_SPLIT)
+
+MAX_GAP_SECONDS = 10    # Garmin smart recording writes at most every ~8 s
+
+
+def timestamp_order(activity):
+    """Rows with a valid timestamp, in time order (file order for ties)"""
+    rows = np.flatnonzero(activity.mask("timestamp"))
+    if len(rows) == 0:
+        return rows, np.zeros(0, dtype=np.int64)
+    timestamps = activity.channels["timestamp"][rows]
+    if (np.diff(timestamps) < 0).any():
+        order = np.argsort(timestamps, kind='stable')
+        rows, timestamps = rows[order], timestamps[order]
+    return rows, timestamps
+
+
+def native_sample_rate(timestamps):
+    """Recording rate in Hz from the median spacing of distinct sorted timestamps"""
+    steps = np.diff(timestamps)
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        return None
+    return 1.0 / float(np.median(steps))
+
+
+def grid_index(timestamps, max_gap=MAX_GAP_SECONDS):
+    """Uniform 1 Hz grid over sorted integer timestamps
+
+    Returns ``(grid, source, pause)``: the grid seconds, the sample each grid
+    second takes its values from (the last one at or before it) and whether
+    that second lies inside a pause (a hole longer than ``max_gap``).
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timestamps) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=bool)
+    grid = np.arange(timestamps[0], timestamps[-1] + 1, dtype=np.int64)
+    source = np.searchsorted(timestamps, grid, side='right') - 1
+    pause_after = np.append(np.diff(timestamps) > max_gap, False)
+    pause = pause_after[source] & (grid != timestamps[source])
+    return grid, source, pause
+
+
+def sampling_summary(timestamps, max_gap=MAX_GAP_SECONDS):
+    """Native rate, recorded / elapsed seconds and pauses of sorted timestamps"""
+    grid, _, pause = grid_index(timestamps, max_gap)
+    return _sampling(timestamps, grid, pause, max_gap)
+
+
+def _sampling(timestamps, grid, pause, max_gap):
+    rate = native_sample_rate(timestamps)
+    return {
+        "native_sample_rate_hz": rate,
+        "smart_recording": rate is not None and rate < 1.0,
+        "elapsed_seconds": len(grid),
+        "recorded_seconds": int(len(grid) - np.count_nonzero(pause)),
+        "pauses": int(np.count_nonzero(np.diff(timestamps) > max_gap)),
+    }
+
+
+def _blocks(pause):
+    """(start, stop) of every run of grid seconds outside pauses"""
+    edges = np.diff(np.concatenate([[True], pause, [True]]).astype(np.int8))
+    return list(zip(np.flatnonzero(edges == -1).tolist(), np.flatnonzero(edges == 1).tolist()))
+
+
+def _block_view(activity, start, stop):
+    """Rows start:stop of an Activity as views (no copy)"""
+    block = Activity(stop - start)
+    for name in activity.channel_names:
+        block.channels[name] = activity.channels[name][start:stop]
+        block.masks[name] = activity.masks[name][start:stop]
+    block.metadata = activity.metadata
+    block.data_quality = activity.data_quality
+    block.available_fields = activity.available_fields
+    block.special_sensors = activity.special_sensors
+    return block
+
+
+def resample_1hz(activity, gap_policy=GAP_SPLIT, max_gap=MAX_GAP_SECONDS, channels=None):
+    """Activity on a uniform 1 Hz grid, as a list of blocks
+
+    ``zero`` and ``hold`` return a single block spanning the whole ride;
+    ``split`` returns one block per stretch of recording between pauses.
+    Rows without a timestamp are dropped; ``channels`` limits the channels
+    carried over (the timestamp grid is always included).
+    """
+    if gap_policy not in GAP_POLICIES:
+        raise ValueError(f"Unknown gap policy '{gap_policy}', expected one of {GAP_POLICIES}")
+    rows, timestamps = timestamp_order(activity)
+    grid, source, pause = grid_index(timestamps, max_gap)
+    rows = rows[source]
+
+    resampled = Activity(len(grid))
+    resampled.metadata = dict(activity.metadata)
+    resampled.data_quality = dict(activity.data_quality)
+    resampled.available_fields = set(activity.available_fields)
+    resampled.special_sensors = dict(activity.special_sensors)
+    resampled.metadata["sampling"] = dict(_sampling(timestamps, grid, pause, max_gap),
+                                          gap_policy=gap_policy)
+    resampled.set_channel("timestamp", grid)
+    for name in channels or activity.channel_names:
+        if name == "timestamp" or name not in activity.channels:
+            continue
+        values = activity.channels[name][rows]
+        mask = activity.masks[name][rows]
+        if gap_policy == GAP_ZERO and pause.any():
+            values = np.where(pause, 0, values).astype(values.dtype)
+            mask = mask & ~pause
+        resampled.set_channel(name, values, mask)
+
+    if gap_policy != GAP_SPLIT or not pause.any():
+        return [resampled] if len(grid) else []
+    return [_block_view(resampled, start, stop) for start, stop in _blocks(pause)]
+
+
+def blocks_normalized_power(blocks, channel="power"):
+    """Normalized Power over 1 Hz blocks; 30 s windows never span two blocks"""
+    sum4 = 0.0
+    windows = 0
+    total = 0.0
+    samples = 0
+    for block in blocks:
+        powers = block.channel(channel, 0).astype(np.float64)
+        means = rolling_mean(powers, NP_WINDOW)
+        sum4 += float(np.sum(means ** 4))
+        windows += len(means)
+        total += float(powers.sum())
+        samples += len(powers)
+    if samples == 0:
+        return None
+    if windows == 0:
+        return total / samples
+    return (sum4 / windows) ** 0.25
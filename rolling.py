@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Rolling-window kernels for LukSpeed
+Windowed sums, means, standard deviations and extrema over cumulative sums and
+strided views, for sample-based and time-based windows, plus the metrics built
+on them (Normalized Power, xPower, moving-average smoothing). Every kernel is
+O(n) in NumPy (min/max: O(n·w) in C) instead of a Python loop per window.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+NP_WINDOW = 30          # seconds, Normalized Power rolling average
+XPOWER_TAU = 25         # seconds, xPower exponential average time constant
+EWMA_BLOCK = 256        # samples per closed-form EWMA block, at most
+EWMA_MAX_EXPONENT = 700  # a^-k = e^(k/tau) must stay below the float64 limit (~e^709)
+
+
+def _cumsum(values):
+    """Cumulative sum with a leading zero: window sum = c[i + w] - c[i]"""
+    values = np.asarray(values, dtype=np.float64)
+    sums = np.empty(len(values) + 1)
+    sums[0] = 0.0
+    np.cumsum(values, out=sums[1:])
+    return sums
+
+
+# ------------------------------------------------------------ sample windows
+# Full windows only: the result for window start i covers values[i:i + window]
+# and has len(values) - window + 1 entries (none when the series is shorter).
+
+def rolling_sum(values, window):
+    if len(values) < window:
+        return np.zeros(0)
+    sums = _cumsum(values)
+    return sums[window:] - sums[:-window]
+
+
+def rolling_mean(values, window):
+    return rolling_sum(values, window) / window
+
+
+def rolling_std(values, window):
+    """Population standard deviation of every window"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < window:
+        return np.zeros(0)
+    # Shift by the overall mean so the sum-of-squares difference keeps precision
+    centered = values - values.mean()
+    mean = rolling_mean(centered, window)
+    variance = rolling_mean(centered * centered, window) - mean * mean
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def rolling_min(values, window):
+    if len(values) < window:
+        return np.zeros(0)
+    return sliding_window_view(np.asarray(values), window).min(axis=1)
+
+
+def rolling_max(values, window):
+    if len(values) < window:
+        return np.zeros(0)
+    return sliding_window_view(np.asarray(values), window).max(axis=1)
+
+
+def window_starts(n, window, step=1):
+    """Start index of every full window when sliding by ``step`` samples"""
+    if n < window:
+        return np.zeros(0, dtype=np.int64)
+    return np.arange(0, n - window + 1, step, dtype=np.int64)
+
+
+def strided_mean(values, window, step=1):
+    """Mean of the windows starting every ``step`` samples"""
+    return rolling_mean(values, window)[::step]
+
+
+def strided_all(condition, window, step=1):
+    """True for the windows (every ``step`` samples) where ``condition`` always holds"""
+    return rolling_sum(np.asarray(condition, dtype=bool), window)[::step] == window
+
+
+def centered_mean(values, window):
+    """Moving average over i ± window // 2, truncated at both ends
+
+    Same result as applySmoothingMovingAverage in MetricsCalculator.ts.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    half = window // 2
+    index = np.arange(n)
+    start = np.maximum(index - half, 0)
+    stop = np.minimum(index + half, n - 1) + 1
+    sums = _cumsum(values)
+    return (sums[stop] - sums[start]) / (stop - start)
+
+
+# -------------------------------------------------------------- time windows
+# Trailing windows: the result for sample i covers every sample whose
+# timestamp lies in (t[i] - seconds, t[i]]; timestamps must be non-decreasing.
+
+def time_window_starts(timestamps, seconds):
+    timestamps = np.asarray(timestamps)
+    return np.searchsorted(timestamps, timestamps - seconds, side='right')
+
+
+def rolling_time_sum(timestamps, values, seconds):
+    starts = time_window_starts(timestamps, seconds)
+    sums = _cumsum(values)
+    return sums[1:] - sums[starts]
+
+
+def rolling_time_mean(timestamps, values, seconds):
+    starts = time_window_starts(timestamps, seconds)
+    sums = _cumsum(values)
+    return (sums[1:] - sums[starts]) / (np.arange(1, len(starts) + 1) - starts)
+
+
+# ----------------------------------------------------------- power metrics
+
+def normalized_power(powers, window=NP_WINDOW):
+    """Normalized Power: 30 s rolling average, 4th power, mean, 4th root"""
+    powers = np.asarray(powers, dtype=np.float64)
+    if len(powers) == 0:
+        return None
+    if len(powers) < window:
+        return float(np.mean(powers))
+    return float(np.mean(rolling_mean(powers, window) ** 4) ** 0.25)
+
+
+def ewma(values, tau):
+    """Exponentially weighted moving average, y[i] = a·y[i-1] + (1 - a)·x[i], y[-1] = 0
+
+    Evaluated in closed form per block of EWMA_BLOCK samples (fewer for
+    small tau, so that a^-k never overflows):
+    y[k] = a^(k+1)·carry + (1 - a)·a^k·Σ a^-j·x[j].
+    """
+    if tau <= 0:
+        raise ValueError(f"EWMA time constant must be positive, got {tau}")
+    values = np.asarray(values, dtype=np.float64)
+    decay = np.exp(-1.0 / tau)
+    size = max(1, min(EWMA_BLOCK, int(EWMA_MAX_EXPONENT * tau)))
+    powers = decay ** np.arange(size)
+    inverse = 1.0 / powers
+    result = np.empty_like(values)
+    carry = 0.0
+    for start in range(0, len(values), size):
+        block = values[start:start + size]
+        k = len(block)
+        result[start:start + k] = (powers[:k] * decay * carry
+                                   + (1 - decay) * powers[:k] * np.cumsum(block * inverse[:k]))
+        carry = result[start + k - 1]
+    return result
+
+
+def xpower(powers, tau=XPOWER_TAU):
+    """xPower (Skiba): 25 s exponentially weighted average, 4th power, mean, 4th root"""
+    powers = np.asarray(powers, dtype=np.float64)
+    if len(powers) == 0:
+        return None
+    return float(np.mean(ewma(powers, tau) ** 4) ** 0.25)
@@ -3,12 +3,13 @@
 Simple FIT File Analysis for LukSpeed Validation
 """
 
-import fitparse
 import json
 import math
 from datetime import datetime
 import traceback
 
+from fit_decoder import decode_activity
+
 print("🚀 LukSpeed FIT File Validator - Starting Analysis")
 print("=" * 60)
 
@@ -17,21 +18,13 @@ fit_file_path = "/workspace/shadcn-ui/test_activity.fit"
 try:
     # Step 1: Analyze FIT file
     print("\n📁 PASO 1: ANÁLISIS DEL ARCHIVO FIT")
-    fitfile = fitparse.FitFile(fit_file_path)
-    
-    records = []
-    fields = set()
+    keep = ['timestamp', 'power', 'speed', 'distance', 'altitude', 
+            'cadence', 'heart_rate', 'temperature', 'position_lat', 
+            'position_long', 'enhanced_speed', 'enhanced_altitude']
+    activity = decode_activity(fit_file_path, fields=keep)
+    fields = activity.available_fields
     
-    for record in fitfile.get_messages('record'):
-        point = {}
-        for data in record:
-            fields.add(data.name)
-            if data.name in ['timestamp', 'power', 'speed', 'distance', 'altitude', 
-                           'cadence', 'heart_rate', 'temperature', 'position_lat', 
-                           'position_long', 'enhanced_speed', 'enhanced_altitude']:
-                point[data.name] = data.value
-        if point:
-            records.append(point)
+    records = [point for point in activity.to_points(drop_missing=True) if point]
     
     print(f"✅ Procesados {len(records)} puntos de datos")
     print(f"📊 Campos disponibles: {sorted(list(fields))}")
@@ -54,8 +47,8 @@ try:
     
     for i, record in enumerate(records):
         timestamp = record.get("timestamp")
-        if timestamp and hasattr(timestamp, 'isoformat'):
-            timestamp_str = timestamp.isoformat()
+        if timestamp:
+            timestamp_str = timestamp  # Already ISO-8601 from the columnar view
         else:
             timestamp_str = f"2024-08-22T00:{i//3600:02d}:{(i//60)%60:02d}:{i%60:02d}Z"
         
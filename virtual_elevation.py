@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Virtual-elevation (Chung method) CdA / Crr solver for LukSpeed
+Integrates the power left after aero, rolling and kinetic losses into a
+virtual elevation profile with cumulative sums over the 1 Hz grid, then fits
+CdA and Crr jointly so it matches the recorded elevation. The profile is
+linear in both parameters, so the fit is a 2x2 least-squares solve (bounded to
+realistic values) with one elevation offset per segment. Confidence intervals
+use a Bartlett-kernel (Newey-West) covariance, since elevation residuals are
+strongly autocorrelated, with fixed-b critical values; they hold their 95 %
+coverage on rides of an hour or more and are optimistic on short ones.
+Usage: python virtual_elevation.py FILE.fit [--laps 1,3] [--mass 83]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from fit_decoder import FitDecoder, decode_activity
+from physics import (GRAVITY, TOTAL_MASS, WHEEL_INERTIA, density_channel, effective_mass,
+                     speed_to_ms)
+from resample import GAP_SPLIT, resample_1hz
+from rolling import rolling_sum
+
+DRIVETRAIN_EFFICIENCY = 0.976
+CDA_BOUNDS = (0.10, 0.80)       # m²
+CRR_BOUNDS = (0.001, 0.020)
+MIN_SEGMENT_SECONDS = 60        # shorter stretches carry too little elevation signal
+MIN_MOVING_SECONDS = 60         # below this (e.g. trainer rides, speed 0) there is nothing to fit
+HAC_BANDWIDTH = 0.1             # Newey-West window as a fraction of the samples
+ELEVATION_CHANNELS = ("elevation", "enhanced_altitude", "altitude")
+FIELDS = ['timestamp', 'power', 'speed', 'enhanced_speed', 'altitude', 'enhanced_altitude',
+          'temperature', 'aero_air_density']
+
+
+def lap_ranges(source):
+    """(start, end) epoch seconds of every lap message in a FIT file"""
+    laps = FitDecoder(source).decode(['lap'], {'lap': {'start_time', 'timestamp'}}).get('lap')
+    if laps is None or 'start_time' not in laps or 'timestamp' not in laps:
+        return []
+    valid = laps.masks['start_time'] & laps.masks['timestamp']
+    return list(zip(laps.columns['start_time'][valid].tolist(), laps.columns['timestamp'][valid].tolist()))
+
+
+def _segments(activity, ranges, elevation):
+    """1 Hz (power, speed, elevation, density) arrays per pause-free stretch and range"""
+    channels = ["power", "speed", elevation, "air_density"]
+    for block in resample_1hz(activity, GAP_SPLIT, channels=channels):
+        t = block.channels["timestamp"]
+        for start, end in ranges or [(t[0], t[-1])]:
+            first, stop = np.searchsorted(t, [start, end + 1])
+            if stop - first >= MIN_SEGMENT_SECONDS:
+                yield (block.channel("power", 0)[first:stop].astype(np.float64),
+                       speed_to_ms(block.channel("speed", 0)[first:stop]),
+                       block.channel(elevation, 0)[first:stop].astype(np.float64),
+                       block.channels["air_density"][first:stop])
+
+
+def ve_terms(power, speed, density, mass=TOTAL_MASS, wheel_inertia=WHEEL_INERTIA,
+             efficiency=DRIVETRAIN_EFFICIENCY):
+    """Cumulative virtual elevation terms of one 1 Hz segment: VE = A - CdA·B - Crr·C
+
+    Per second: Δh = (η·P - ΔKE) / (m·g) - CdA·0.5·ρ·v³ / (m·g) - Crr·v, with
+    ΔKE = ½·(m + I/r²)·(v₁² - v₀²) and v, ρ averaged over the step.
+    """
+    weight = mass * GRAVITY
+    v_mean = 0.5 * (speed[1:] + speed[:-1])
+    kinetic = 0.5 * effective_mass(mass, wheel_inertia) * (speed[1:] ** 2 - speed[:-1] ** 2)
+    steps = np.empty((3, len(speed)))
+    steps[:, 0] = 0.0
+    steps[0, 1:] = (efficiency * power[:-1] - kinetic) / weight
+    steps[1, 1:] = 0.25 * (density[1:] + density[:-1]) * v_mean ** 3 / weight
+    steps[2, 1:] = v_mean
+    return np.cumsum(steps, axis=1)
+
+
+def _fit(B, C, y, cda=None, crr=None):
+    """Least squares of y ≈ CdA·B + Crr·C with either parameter optionally fixed
+
+    None when the free parameter's term carries no signal (e.g. zero speed).
+    """
+    bb, bc, cc = B @ B, B @ C, C @ C
+    if cda is None and crr is None:
+        det = bb * cc - bc * bc
+        if det <= 1e-12 * bb * cc:
+            return None
+        by, cy = B @ y, C @ y
+        return (cc * by - bc * cy) / det, (bb * cy - bc * by) / det
+    if cda is None:
+        return ((B @ (y - crr * C)) / bb, crr) if bb > 1e-12 else None
+    return (cda, (C @ (y - cda * B)) / cc) if cc > 1e-12 else None
+
+
+def _bounded_fit(B, C, y):
+    """Box-constrained 2-parameter least squares: interior optimum or the best edge
+
+    None when either term is degenerate, so no fit is reported at all.
+    """
+    inside = lambda cda, crr: (CDA_BOUNDS[0] <= cda <= CDA_BOUNDS[1]
+                               and CRR_BOUNDS[0] <= crr <= CRR_BOUNDS[1])
+    free = _fit(B, C, y)
+    if free is None:
+        return None
+    if inside(*free):
+        return free, False
+    candidates = []
+    for cda in CDA_BOUNDS:
+        candidates.append((cda, float(np.clip(_fit(B, C, y, cda=cda)[1], *CRR_BOUNDS))))
+    for crr in CRR_BOUNDS:
+        candidates.append((float(np.clip(_fit(B, C, y, crr=crr)[0], *CDA_BOUNDS)), crr))
+    sse = [float(np.sum((y - cda * B - crr * C) ** 2)) for cda, crr in candidates]
+    return candidates[int(np.argmin(sse))], True
+
+
+def fixed_b_critical_value(b):
+    """97.5 % quantile for Bartlett HAC t-statistics with bandwidth fraction b
+    (Kiefer & Vogelsang 2005 polynomial; 1.96 at b = 0)"""
+    return 1.959964 + 2.9694 * b + 0.4160 * b ** 2 - 0.5324 * b ** 3
+
+
+def hac_covariance(B, C, residuals, pieces, bandwidth=HAC_BANDWIDTH):
+    """Newey-West covariance of (CdA, Crr) as moving sums of the scores: O(n)
+
+    With a Bartlett kernel of width L, S = Σ U·Uᵀ / L where U are the sums of
+    the scores x·e over L consecutive samples of the same segment.
+    """
+    scores = np.vstack([B, C]) * residuals
+    window = max(int(bandwidth * len(residuals)), 2)
+    S = np.zeros((2, 2))
+    for start, stop in pieces:
+        width = min(window, stop - start)
+        sums = np.vstack([rolling_sum(row[start:stop], width) for row in scores])
+        S += sums @ sums.T / width * (stop - start) / len(sums[0])
+    bread = np.linalg.inv(np.array([[B @ B, B @ C], [B @ C, C @ C]]))
+    return bread @ S @ bread
+
+
+def solve_virtual_elevation(activity, ranges=None, mass=TOTAL_MASS, wheel_inertia=WHEEL_INERTIA,
+                            efficiency=DRIVETRAIN_EFFICIENCY, profile=False):
+    """Joint CdA / Crr fit of an Activity by the virtual-elevation method
+
+    ``ranges`` restricts the fit to (start, end) epoch-second windows such as
+    laps; pauses always start a new segment. Returns None without a real
+    altitude recording, power and speed, when no segment has
+    MIN_SEGMENT_SECONDS of data, with under MIN_MOVING_SECONDS moving, or
+    when the recorded elevation is flat (R² undefined). With ``profile`` the
+    fitted virtual and recorded elevation of every segment are included.
+    """
+    elevation = next((name for name in ELEVATION_CHANNELS if activity.has_data(name)), None)
+    if elevation is None or not activity.has_data("power") or not activity.has_data("speed"):
+        return None
+    if not activity.data_quality.get("has_elevation", True):
+        return None
+    density_channel(activity)
+
+    # Fixed effects: demeaning every segment removes its own elevation offset
+    columns, parts = [], []
+    moving = 0
+    for power, speed, elevation_m, density in _segments(activity, ranges, elevation):
+        moving += np.count_nonzero(speed > 0)
+        A, B, C = ve_terms(power, speed, density, mass, wheel_inertia, efficiency)
+        y = A - (elevation_m - elevation_m[0])
+        raw = np.vstack([B, C, y, A, elevation_m])
+        parts.append(raw)
+        columns.append(raw[:3] - raw[:3].mean(axis=1, keepdims=True))
+    if moving < MIN_MOVING_SECONDS:
+        return None
+    elevation_ss = sum(float(np.sum((part[4] - part[4].mean()) ** 2)) for part in parts)
+    if elevation_ss <= 0:
+        return None
+    B, C, y = np.concatenate(columns, axis=1)
+    n = len(y)
+
+    fit = _bounded_fit(B, C, y)
+    if fit is None:
+        return None
+    (cda, crr), bounded = fit
+    residuals = y - cda * B - crr * C
+    sse = float(residuals @ residuals)
+    lengths = np.array([part.shape[1] for part in parts])
+    stops = np.cumsum(lengths)
+    try:
+        covariance = hac_covariance(B, C, residuals, zip((stops - lengths).tolist(), stops.tolist()))
+        se_cda, se_crr = np.sqrt(np.maximum(np.diag(covariance), 0.0)).tolist()
+    except np.linalg.LinAlgError:
+        se_cda = se_crr = float("inf")
+    critical = fixed_b_critical_value(HAC_BANDWIDTH)
+
+    result = {
+        "cda": float(cda),
+        "crr": float(crr),
+        "cda_ci95": [float(cda - critical * se_cda), float(cda + critical * se_cda)],
+        "crr_ci95": [float(crr - critical * se_crr), float(crr + critical * se_crr)],
+        "cda_std_error": se_cda,
+        "crr_std_error": se_crr,
+        "rmse_m": float(np.sqrt(np.mean(residuals ** 2))),
+        "r_squared": 1 - sse / elevation_ss,
+        "bounded": bounded,
+        "samples": n,
+        "segments": len(parts),
+        "mass_kg": mass,
+        "efficiency": efficiency,
+    }
+    if profile:
+        result["profile"] = []
+        for part in parts:
+            virtual = part[3] - cda * part[0] - crr * part[1]
+            virtual += part[4].mean() - virtual.mean()
+            result["profile"].append({"virtual_elevation": virtual, "elevation": part[4]})
+    return result
+
+
+def main(argv):
+    if not argv:
+        print(__doc__.strip())
+        return 1
+    path, laps, mass = argv[0], None, TOTAL_MASS
+    if "--laps" in argv:
+        laps = [int(lap) for lap in argv[argv.index("--laps") + 1].split(",")]
+    if "--mass" in argv:
+        mass = float(argv[argv.index("--mass") + 1])
+
+    print("🌄 LukSpeed - Elevación virtual (método Chung)")
+    print("=" * 60)
+    activity = decode_activity(path, fields=FIELDS)
+    ranges = None
+    if laps:
+        all_laps = lap_ranges(path)
+        ranges = [all_laps[lap - 1] for lap in laps if 0 < lap <= len(all_laps)]
+        print(f"🏁 Vueltas {laps}: {len(ranges)} de {len(all_laps)} encontradas")
+    start = time.perf_counter()
+    result = solve_virtual_elevation(activity, ranges, mass=mass)
+    elapsed = time.perf_counter() - start
+    if result is None:
+        print("❌ Sin datos suficientes (potencia, velocidad y altitud)")
+        return 1
+    print(f"📁 {path}: {result['samples']:,} s en {result['segments']} segmentos, "
+          f"resuelto en {elapsed*1000:.1f} ms")
+    print(f"   CdA: {result['cda']:.4f} m² (IC 95 %: {result['cda_ci95'][0]:.4f} – {result['cda_ci95'][1]:.4f})")
+    print(f"   Crr: {result['crr']:.5f} (IC 95 %: {result['crr_ci95'][0]:.5f} – {result['crr_ci95'][1]:.5f})")
+    print(f"   RMSE elevación: {result['rmse_m']:.2f} m, R²: {result['r_squared']:.3f}"
+          f"{' ⚠️ en el límite' if result['bounded'] else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))